@@ -0,0 +1,60 @@
+"""Benchmark field level deltas against full JSON images.
+
+Updates a wide record, changing a few fields per tick, and compares the
+payload size and encoding time of publishing the full record with
+publishing the delta.
+
+Usage:
+
+    python benchmarks/bench_delta.py [--fields N] [--changes N] [--ticks N]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from squawkbus import DeltaEncoder
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--fields', type=int, default=50)
+    parser.add_argument('--changes', type=int, default=2)
+    parser.add_argument('--ticks', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    names = [f"field_{i}" for i in range(args.fields)]
+    record = {name: rng.uniform(0, 1000) for name in names}
+    ticks = []
+    for _ in range(args.ticks):
+        record = dict(record)
+        for name in rng.sample(names, args.changes):
+            record[name] = rng.uniform(0, 1000)
+        ticks.append(record)
+
+    start = time.perf_counter()
+    full_bytes = sum(len(json.dumps(tick).encode('utf-8')) for tick in ticks)
+    full_elapsed = time.perf_counter() - start
+
+    encoder = DeltaEncoder()
+    start = time.perf_counter()
+    delta_bytes = 0
+    for tick in ticks:
+        packets = encoder.update('topic', tick)
+        if packets is not None:
+            delta_bytes += len(packets[0].data)
+    delta_elapsed = time.perf_counter() - start
+
+    print(f"full:  {full_bytes:,} bytes in {full_elapsed:.3f}s")
+    print(f"delta: {delta_bytes:,} bytes in {delta_elapsed:.3f}s")
+    print(
+        f"ratio: {full_bytes / delta_bytes:.1f}x bytes, "
+        f"{full_elapsed / delta_elapsed:.1f}x time"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""Benchmark the overhead of client metrics.
+
+Reads and writes a stream of small messages through a client over an
+in-process stream, with and without metrics, and compares the time per
+message.
+
+Usage:
+
+    python benchmarks/bench_metrics.py [--count N]
+"""
+
+import argparse
+import asyncio
+import time
+
+from squawkbus import ClientMetrics, DataPacket, ForwardedMulticastData
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+
+
+class LoopStream:
+    """A stream which reads the same frame forever, and discards writes"""
+
+    def __init__(self, frame: bytes) -> None:
+        self.frame = frame
+
+    async def write(self, buf: bytes) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        return self.frame
+
+    async def close(self) -> None:
+        pass
+
+
+async def run(count: int, metrics: ClientMetrics | None) -> float:
+    packets = [DataPacket({0}, {b'content-type': b'application/json'}, b'{"bid":100.5}')]
+    frame = bytes(ForwardedMulticastData('host', 'user', 'topic', packets).serialize())
+    client = CallbackClient(LoopStream(frame), options=ClientOptions(metrics=metrics))
+    read_queue = client._read_queue  # pylint: disable=protected-access
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await client._read()  # pylint: disable=protected-access
+        read_queue.get_nowait()
+        await client.publish('topic', packets)
+        await client._write()  # pylint: disable=protected-access
+    return time.perf_counter() - start
+
+
+async def main_async(count: int) -> None:
+    await run(count // 10, None)
+    baseline = await run(count, None)
+    metrics = ClientMetrics()
+    instrumented = await run(count, metrics)
+    assert metrics.snapshot().messages_in['FORWARDED_MULTICAST_DATA'] == count
+
+    print(f"without metrics: {baseline / count * 1e9:,.0f} ns/message")
+    print(f"with metrics:    {instrumented / count * 1e9:,.0f} ns/message")
+    print(f"overhead:        {(instrumented / baseline - 1) * 100:.1f}%")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100_000)
+    args = parser.parse_args()
+    asyncio.run(main_async(args.count))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,114 @@
+"""Benchmark the on demand publisher.
+
+Simulates a notification storm from many clients subscribing to a large
+topic space, then publishes an update on every topic, and finally
+disconnects every client.
+
+Usage:
+
+    python benchmarks/bench_on_demand_publisher.py [--topics N] [--clients N]
+"""
+
+import argparse
+import asyncio
+import random
+import time
+
+from squawkbus import (
+    DataPacket,
+    ForwardedSubscriptionRequest,
+    OnDemandPublisher,
+)
+from squawkbus.callback_client import CallbackClient
+
+
+class NullStream:
+
+    async def write(self, buf: bytes) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        raise EOFError()
+
+    async def close(self) -> None:
+        pass
+
+
+def _drain(client: CallbackClient) -> int:
+    queue = client._write_queue  # pylint: disable=protected-access
+    count = queue.qsize()
+    while not queue.empty():
+        queue.get_nowait()
+    return count
+
+
+async def run(
+        topic_count: int,
+        client_count: int,
+        topics_per_client: int,
+        seed: int
+) -> None:
+    rng = random.Random(seed)
+    topics = [f"bench.{i}" for i in range(topic_count)]
+    clients = [f"client-{i}" for i in range(client_count)]
+    subscriptions = [
+        (client_id, topic)
+        for client_id in clients
+        for topic in rng.sample(topics, topics_per_client)
+    ]
+    image = [DataPacket({0}, {}, b'image')]
+    delta = [DataPacket({0}, {}, b'delta')]
+
+    client = CallbackClient(NullStream())
+    publisher = OnDemandPublisher(client, lambda topic: image)
+    await publisher.start('bench.*')
+    _drain(client)
+
+    start = time.perf_counter()
+    await client.on_forwarded_subscription_requests([
+        ForwardedSubscriptionRequest('host', 'user', client_id, topic, 1)
+        for client_id, topic in subscriptions
+    ])
+    await publisher.flush()
+    elapsed = time.perf_counter() - start
+    images = _drain(client)
+    print(
+        f"subscribe: {len(subscriptions)} requests, {images} images "
+        f"in {elapsed:.3f}s ({len(subscriptions) / elapsed:,.0f}/s)"
+    )
+
+    start = time.perf_counter()
+    for topic in topics:
+        await publisher.publish(topic, delta)
+    elapsed = time.perf_counter() - start
+    published = _drain(client)
+    print(
+        f"publish: {topic_count} updates, {published} published "
+        f"in {elapsed:.3f}s ({topic_count / elapsed:,.0f}/s)"
+    )
+
+    start = time.perf_counter()
+    for client_id in clients:
+        publisher.remove_client(client_id)
+    elapsed = time.perf_counter() - start
+    print(
+        f"disconnect: {client_count} clients "
+        f"in {elapsed:.3f}s ({client_count / elapsed:,.0f}/s)"
+    )
+    assert len(publisher.interest) == 0
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--topics', type=int, default=100_000)
+    parser.add_argument('--clients', type=int, default=10_000)
+    parser.add_argument('--topics-per-client', type=int, default=10)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+    asyncio.run(
+        run(args.topics, args.clients, args.topics_per_client, args.seed)
+    )
+
+
+if __name__ == '__main__':
+    main()
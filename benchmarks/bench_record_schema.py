@@ -0,0 +1,82 @@
+"""Benchmark fixed layout records against JSON.
+
+Encodes a stream of quotes as JSON and as binary records, and compares the
+payload size, the encode time, and the decode time of a batch.
+
+Usage:
+
+    python benchmarks/bench_record_schema.py [--count N]
+"""
+
+import argparse
+import json
+import random
+import time
+
+from squawkbus import DataPacket, RecordSchema
+
+QUOTE = RecordSchema(
+    'quote',
+    [
+        ('ticker', 'str8'),
+        ('bid', 'float64'),
+        ('ask', 'float64'),
+        ('bid_size', 'uint32'),
+        ('ask_size', 'uint32'),
+    ]
+)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--count', type=int, default=100_000)
+    parser.add_argument('--seed', type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    quotes = [
+        {
+            'ticker': rng.choice(['AAPL', 'MSFT', 'GOOGL', 'AMZN']),
+            'bid': round(rng.uniform(100, 200), 2),
+            'ask': round(rng.uniform(200, 300), 2),
+            'bid_size': rng.randint(1, 1000),
+            'ask_size': rng.randint(1, 1000),
+        }
+        for _ in range(args.count)
+    ]
+
+    start = time.perf_counter()
+    json_packets = [
+        DataPacket({0}, {b'content-type': b'application/json'}, json.dumps(quote).encode())
+        for quote in quotes
+    ]
+    json_encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    record_packets = [QUOTE.to_data_packet(quote) for quote in quotes]
+    record_encode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    decoded = [json.loads(packet.data) for packet in json_packets]
+    bids = [quote['bid'] for quote in decoded]
+    json_decode = time.perf_counter() - start
+
+    start = time.perf_counter()
+    array = QUOTE.decode_batch(record_packets)
+    record_bids = array['bid']
+    record_decode = time.perf_counter() - start
+
+    assert len(bids) == len(record_bids)
+
+    json_bytes = sum(len(packet.data) for packet in json_packets)
+    record_bytes = sum(len(packet.data) for packet in record_packets)
+    print(f"json:   {json_bytes:,} bytes, encode {json_encode:.3f}s, decode {json_decode:.3f}s")
+    print(f"record: {record_bytes:,} bytes, encode {record_encode:.3f}s, decode {record_decode:.3f}s")
+    print(
+        f"ratio:  {json_bytes / record_bytes:.1f}x bytes, "
+        f"{json_decode / record_decode:.1f}x decode"
+    )
+
+
+if __name__ == '__main__':
+    main()
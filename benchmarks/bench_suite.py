@@ -0,0 +1,393 @@
+"""Benchmark suite.
+
+Measures three parts:
+
+* codec - serialize and deserialize throughput for each message type, over
+  a matrix of payload sizes, packet counts and header counts.
+* stream - SocketStream frame throughput over a local socket pair.
+* pipeline - client read and write throughput over an in-memory stream,
+  excluding the kernel.
+* client - end to end client throughput and latency through the stand-in
+  broker.
+
+The suite is run several times and the median of each result is kept. The
+results can be written as JSON, and compared against a stored baseline.
+Latencies are noisier than throughput, so they have a wider tolerance, and
+the maximum latency is reported but never treated as a regression.
+
+Usage:
+
+    python benchmarks/bench_suite.py [--parts codec,stream,pipeline,client] [--quick]
+        [--repeat 3] [--json results.json] [--baseline baseline.json]
+        [--tolerance 10] [--latency-tolerance 25]
+"""
+
+import argparse
+import asyncio
+import json
+import platform
+import socket
+import statistics
+import sys
+import time
+from typing import Any, Callable
+
+from squawkbus import (
+    AuthenticationRequest,
+    AuthenticationResponse,
+    DataPacket,
+    ForwardedMulticastData,
+    ForwardedSubscriptionRequest,
+    ForwardedUnicastData,
+    LatencyMonitor,
+    LatencyStamper,
+    Message,
+    MessageType,
+    MulticastData,
+    NotificationRequest,
+    SubscriptionRequest,
+    UnicastData,
+)
+from squawkbus.broker import Broker
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_reader import DataReader
+from squawkbus.memory_stream import MemoryStream
+from squawkbus.socket_client import SocketClient
+from squawkbus.socket_stream import SocketStream
+
+PAYLOAD_SIZES = (16, 1024, 64 * 1024)
+PACKET_COUNTS = (1, 10)
+HEADER_COUNTS = (0, 4)
+FRAME_SIZES = (64, 4096, 256 * 1024)
+
+Results = dict[str, dict[str, float]]
+
+# Metrics which describe the run rather than measure it.
+UNCOMPARED_METRICS = ('frame_bytes', 'received')
+# Metrics which are too noisy to gate on, and are only reported.
+REPORTED_METRICS = ('latency_max_us',)
+
+
+def measure(func: Callable[[], Any], min_time: float) -> float:
+    """Measure the number of calls per second of a function"""
+    count = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(count):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time:
+            return count / elapsed
+        count *= 2 if elapsed <= 0 else max(2, int(min_time / elapsed * 1.2))
+
+
+def make_packets(payload_size: int, packet_count: int, header_count: int) -> list[DataPacket]:
+    headers = {f'header-{i}'.encode(): f'value-{i}'.encode() for i in range(header_count)}
+    return [
+        DataPacket({1, 2}, dict(headers), bytes(payload_size))
+        for _ in range(packet_count)
+    ]
+
+
+def control_messages() -> dict[MessageType, Message]:
+    return {
+        MessageType.AUTHENTICATION_REQUEST: AuthenticationRequest('basic', b'user:password'),
+        MessageType.AUTHENTICATION_RESPONSE: AuthenticationResponse('client-id'),
+        MessageType.FORWARDED_SUBSCRIPTION_REQUEST: ForwardedSubscriptionRequest(
+            'host', 'user', 'client-id', 'topic', 1
+        ),
+        MessageType.NOTIFICATION_REQUEST: NotificationRequest('topic.*', True),
+        MessageType.SUBSCRIPTION_REQUEST: SubscriptionRequest('topic', True),
+    }
+
+
+def data_messages(packets: list[DataPacket]) -> dict[MessageType, Message]:
+    return {
+        MessageType.MULTICAST_DATA: MulticastData('topic', packets),
+        MessageType.UNICAST_DATA: UnicastData('client-id', 'topic', packets),
+        MessageType.FORWARDED_MULTICAST_DATA: ForwardedMulticastData(
+            'host', 'user', 'topic', packets
+        ),
+        MessageType.FORWARDED_UNICAST_DATA: ForwardedUnicastData(
+            'host', 'user', 'client-id', 'topic', packets
+        ),
+    }
+
+
+def bench_message(name: str, message: Message, min_time: float, results: Results) -> None:
+    buf = bytes(message.serialize())
+    serialize = measure(message.serialize, min_time)
+    deserialize = measure(lambda: Message.read(DataReader(buf)), min_time)
+    results[name] = {
+        'frame_bytes': len(buf),
+        'serialize_per_sec': serialize,
+        'deserialize_per_sec': deserialize,
+        'serialize_mb_per_sec': serialize * len(buf) / 1e6,
+        'deserialize_mb_per_sec': deserialize * len(buf) / 1e6,
+    }
+
+
+def bench_codec(min_time: float, results: Results) -> None:
+    for message_type, message in control_messages().items():
+        bench_message(f'codec/{message_type.name}', message, min_time, results)
+
+    for payload_size in PAYLOAD_SIZES:
+        for packet_count in PACKET_COUNTS:
+            for header_count in HEADER_COUNTS:
+                packets = make_packets(payload_size, packet_count, header_count)
+                for message_type, message in data_messages(packets).items():
+                    bench_message(
+                        f'codec/{message_type.name}/'
+                        f'payload={payload_size},packets={packet_count},headers={header_count}',
+                        message,
+                        min_time,
+                        results
+                    )
+
+
+async def bench_frames(frame_size: int, count: int) -> tuple[float, float]:
+    left, right = socket.socketpair()
+    reader, writer = await asyncio.open_connection(sock=left)
+    peer_reader, peer_writer = await asyncio.open_connection(sock=right)
+    sender = SocketStream(reader, writer)
+    receiver = SocketStream(peer_reader, peer_writer)
+    frame = bytes(frame_size)
+
+    async def send() -> None:
+        for _ in range(count):
+            await sender.write(frame)
+
+    start = time.perf_counter()
+    task = asyncio.create_task(send())
+    for _ in range(count):
+        await receiver.read()
+    await task
+    elapsed = time.perf_counter() - start
+
+    await sender.close()
+    await receiver.close()
+    return count / elapsed, count * frame_size / elapsed / 1e6
+
+
+def bench_stream(count: int, results: Results) -> None:
+    for frame_size in FRAME_SIZES:
+        frames = max(100, count * 64 // frame_size)
+        frames_per_sec, mb_per_sec = asyncio.run(bench_frames(frame_size, frames))
+        results[f'stream/frame={frame_size}'] = {
+            'frames_per_sec': frames_per_sec,
+            'mb_per_sec': mb_per_sec,
+        }
+
+
+async def bench_client_pipeline(count: int, payload_size: int) -> dict[str, float]:
+    client_end, server_end = MemoryStream.pair()
+    client = CallbackClient(client_end)
+    received = asyncio.Event()
+    remaining = count
+
+    async def on_data(_user, _host, _topic, _data_packets) -> None:
+        nonlocal remaining
+        remaining -= 1
+        if remaining == 0:
+            received.set()
+
+    client.data_handlers.append(on_data)
+    await server_end.write(AuthenticationResponse('client-id').serialize())
+    await client.start()
+    await server_end.read()
+
+    packets = make_packets(payload_size, 1, 1)
+    frame = bytes(ForwardedMulticastData('host', 'user', 'bench', packets).serialize())
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await server_end.write(frame)
+    await received.wait()
+    read_elapsed = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(count):
+        await client.publish('bench', packets)
+    for _ in range(count):
+        await server_end.read()
+    write_elapsed = time.perf_counter() - start
+
+    client.close()
+    await client.wait_closed()
+    return {
+        'read_per_sec': count / read_elapsed,
+        'write_per_sec': count / write_elapsed,
+    }
+
+
+def bench_pipeline(count: int, results: Results) -> None:
+    for payload_size in (64, 4096):
+        results[f'pipeline/payload={payload_size}'] = asyncio.run(
+            bench_client_pipeline(count, payload_size)
+        )
+
+
+async def bench_end_to_end(count: int, payload_size: int) -> dict[str, float]:
+    broker = Broker()
+    await broker.start('127.0.0.1', 0)
+    port = broker.port
+
+    subscriber = await SocketClient.create('127.0.0.1', port)
+    publisher = await SocketClient.create('127.0.0.1', port)
+    monitor = LatencyMonitor()
+    monitor.attach(subscriber)
+    await subscriber.add_subscription('bench')
+    await asyncio.sleep(0.1)
+
+    stamper = LatencyStamper()
+    packets = make_packets(payload_size, 1, 1)
+
+    async def wait_for(received: int) -> None:
+        deadline = time.perf_counter() + 30
+        while monitor.latency.count < received and time.perf_counter() < deadline:
+            await asyncio.sleep(0)
+
+    # Throughput, publishing as fast as possible.
+    start = time.perf_counter()
+    for i in range(count):
+        await publisher.publish('bench', stamper.stamp('bench', packets))
+        if i % 100 == 0:
+            await asyncio.sleep(0)
+    await wait_for(count)
+    elapsed = time.perf_counter() - start
+    received = monitor.latency.count
+
+    # Latency, publishing each message when the previous one has arrived.
+    monitor.reset()
+    for i in range(min(count, 1_000)):
+        await publisher.publish('bench', stamper.stamp('bench', packets))
+        await wait_for(i + 1)
+
+    publisher.close()
+    subscriber.close()
+    await publisher.wait_closed()
+    await subscriber.wait_closed()
+    await broker.stop()
+
+    latency = monitor.latency
+    return {
+        'messages_per_sec': received / elapsed,
+        'received': received,
+        'latency_p50_us': latency.percentile(50) / 1e3,
+        'latency_p99_us': latency.percentile(99) / 1e3,
+        'latency_max_us': latency.max / 1e3,
+    }
+
+
+def bench_client(count: int, results: Results) -> None:
+    for payload_size in (64, 4096):
+        results[f'client/payload={payload_size}'] = asyncio.run(
+            bench_end_to_end(count, payload_size)
+        )
+
+
+def run_suite(parts: set[str], min_time: float, count: int) -> Results:
+    """Run the chosen parts of the suite once"""
+    results: Results = {}
+    if 'codec' in parts:
+        bench_codec(min_time, results)
+    if 'stream' in parts:
+        bench_stream(count, results)
+    if 'pipeline' in parts:
+        bench_pipeline(count, results)
+    if 'client' in parts:
+        bench_client(count, results)
+    return results
+
+
+def median_results(runs: list[Results]) -> Results:
+    """The median of each result over several runs"""
+    return {
+        name: {
+            metric: statistics.median(run[name][metric] for run in runs)
+            for metric in metrics
+        }
+        for name, metrics in runs[0].items()
+    }
+
+
+def compare(
+        results: Results,
+        baseline: Results,
+        tolerance: float,
+        latency_tolerance: float
+) -> int:
+    """Print the change from the baseline, and count the regressions"""
+    regressions = 0
+    for name, metrics in results.items():
+        previous = baseline.get(name)
+        if previous is None:
+            continue
+        for metric, value in metrics.items():
+            old = previous.get(metric)
+            if not old or metric in UNCOMPARED_METRICS:
+                continue
+            change = (value / old - 1) * 100
+            # Latencies are better when lower, everything else when higher.
+            if metric in REPORTED_METRICS:
+                worse = False
+            elif 'latency' in metric:
+                worse = change > latency_tolerance
+            else:
+                worse = change < -tolerance
+            regressions += worse
+            flag = '  REGRESSION' if worse else ''
+            print(f'{name} {metric}: {old:,.1f} -> {value:,.1f} ({change:+.1f}%){flag}')
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--parts', default='codec,stream,pipeline,client')
+    parser.add_argument('--quick', action='store_true', help='shorter runs')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='the number of runs the median is taken over')
+    parser.add_argument('--json', help='write the results to this file')
+    parser.add_argument('--baseline', help='compare with the results in this file')
+    parser.add_argument('--tolerance', type=float, default=10.0,
+                        help='the percentage change treated as a regression')
+    parser.add_argument('--latency-tolerance', type=float, default=25.0,
+                        help='the percentage increase in latency treated as a regression')
+    args = parser.parse_args()
+
+    parts = set(args.parts.split(','))
+    min_time = 0.05 if args.quick else 0.5
+    count = 2_000 if args.quick else 20_000
+
+    results = median_results([
+        run_suite(parts, min_time, count)
+        for _ in range(max(args.repeat, 1))
+    ])
+
+    for name, metrics in results.items():
+        print(name, ' '.join(f'{key}={value:,.1f}' for key, value in metrics.items()))
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump(
+                {
+                    'python': sys.version,
+                    'platform': platform.platform(),
+                    'repeat': args.repeat,
+                    'results': results,
+                },
+                file,
+                indent=2
+            )
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+        regressions = compare(results, baseline, args.tolerance, args.latency_tolerance)
+        print(f'{regressions} regressions')
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
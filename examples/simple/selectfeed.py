@@ -103,8 +103,8 @@ class MarketSimulator:
 def _changes[DataT: MutableMapping](a: DataT | None, b: DataT) -> MutableMapping[str, Any]:
     return b if a is None else {
         key: value
-        for key, value in a.items()
-        if a[key] != b[key]
+        for key, value in b.items()
+        if a.get(key) != value
     }
 
 
@@ -1,7 +1,29 @@
 """SquawkBus client"""
 
-from .callback_client import DataHandler, NotificationHandler
+from .arrays import array_to_data_packet, data_packet_to_array
+from .broker import Broker
+from .callback_client import (
+    BytesDataHandler,
+    DataHandler,
+    NotificationBatchHandler,
+    NotificationHandler,
+)
+from .chunking import (
+    ChunkAssembler,
+    ChunkStream,
+    ChunkStreamer,
+    split_data_packet,
+)
+from .client_options import ClientOptions
+from .columnar_sink import ColumnarBatch, ColumnarSink
 from .data_packet import DataPacket
+from .delta import DeltaApplier, DeltaEncoder
+from .header_filters import HeaderFilter, header_equals, header_present
+from .heavy_hitters import HeavyHitter, SpaceSaving, TopTopics, TopTopicsReport
+from .interest_table import InterestTable
+from .latency import LatencyMonitor, LatencyStamper, RttProbe
+from .last_value_cache import CachedValue, LastValueCache
+from .memory_stream import MemoryStream
 from .messages import (
     AuthenticationRequest,
     AuthenticationResponse,
@@ -15,15 +37,87 @@ from .messages import (
     SubscriptionRequest,
     UnicastData,
 )
+from .metrics import (
+    ClientMetrics,
+    Histogram,
+    HistogramSnapshot,
+    LatencyHistogram,
+    MetricsSnapshot,
+    render_prometheus,
+)
+from .on_demand_publisher import ImageProvider, OnDemandPublisher
+from .payload_codecs import (
+    DEFAULT_CODECS,
+    CodecRegistry,
+    JsonCodec,
+    MsgpackCodec,
+    PayloadCodec,
+    RawCodec,
+    TextCodec,
+)
+from .payload_compression import (
+    DEFAULT_MAX_DECOMPRESSED_SIZE,
+    CompressionSnapshot,
+    CompressionStats,
+    Compressor,
+    PayloadCompression,
+    PayloadDecompression,
+    ZlibCompressor,
+    ZstdCompressor,
+)
+from .record_schema import RecordSchema
 from .socket_client import SocketClient
+from .string_cache import StringCache
+from .tracing import StageLatencyTracer, TraceStage, Tracer
+from .watchdog import SlowHandler, Watchdog, WatchdogReport
 from .websocket_client import WebsocketClient
 
 __all__ = [
+    'array_to_data_packet',
+    'data_packet_to_array',
+
+    'Broker',
+
+    'BytesDataHandler',
     'DataHandler',
+    'NotificationBatchHandler',
     'NotificationHandler',
 
+    'ChunkAssembler',
+    'ChunkStream',
+    'ChunkStreamer',
+    'split_data_packet',
+
+    'ClientOptions',
+
+    'ColumnarBatch',
+    'ColumnarSink',
+
     'DataPacket',
 
+    'DeltaApplier',
+    'DeltaEncoder',
+
+    'HeaderFilter',
+    'header_equals',
+    'header_present',
+
+    'HeavyHitter',
+    'SpaceSaving',
+    'TopTopics',
+    'TopTopicsReport',
+
+    'InterestTable',
+
+    'LatencyMonitor',
+    'LatencyStamper',
+    'RttProbe',
+
+    'CachedValue',
+    'LastValueCache',
+
+    'MemoryStream',
+
     'AuthenticationRequest',
     'AuthenticationResponse',
     'ForwardedMulticastData',
@@ -36,7 +130,46 @@ __all__ = [
     'SubscriptionRequest',
     'UnicastData',
 
+    'ClientMetrics',
+    'Histogram',
+    'HistogramSnapshot',
+    'LatencyHistogram',
+    'MetricsSnapshot',
+    'render_prometheus',
+
+    'ImageProvider',
+    'OnDemandPublisher',
+
+    'DEFAULT_CODECS',
+    'CodecRegistry',
+    'JsonCodec',
+    'MsgpackCodec',
+    'PayloadCodec',
+    'RawCodec',
+    'TextCodec',
+
+    'DEFAULT_MAX_DECOMPRESSED_SIZE',
+    'CompressionSnapshot',
+    'CompressionStats',
+    'Compressor',
+    'PayloadCompression',
+    'PayloadDecompression',
+    'ZlibCompressor',
+    'ZstdCompressor',
+
+    'RecordSchema',
+
     'SocketClient',
 
+    'StringCache',
+
+    'StageLatencyTracer',
+    'TraceStage',
+    'Tracer',
+
+    'SlowHandler',
+    'Watchdog',
+    'WatchdogReport',
+
     'WebsocketClient',
 ]
@@ -0,0 +1,109 @@
+"""NumPy array payloads"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+
+from .data_packet import DataPacket
+from .payload_codecs import CONTENT_TYPE_HEADER
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional.
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+CONTENT_TYPE_NDARRAY = b'application/x-ndarray'
+
+DTYPE_HEADER = b'x-dtype'
+SHAPE_HEADER = b'x-shape'
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "numpy is required for array payloads: install squawkbus[numpy]"
+        )
+
+
+def array_to_data_packet(
+        array: NDArray,
+        entitlements: set[int] | None = None,
+        headers: dict[bytes, bytes] | None = None
+) -> DataPacket:
+    """Create a data packet holding an array.
+
+    The data of the packet is a view over the array through the buffer
+    protocol, so a C-contiguous array is not copied until it is written to
+    the outgoing frame. The dtype and shape are carried in headers.
+
+    The array must not be modified until it has been sent.
+
+    Args:
+        array (NDArray): The array.
+        entitlements (set[int] | None, optional): The entitlements. Defaults
+            to {0}.
+        headers (dict[bytes, bytes] | None, optional): Additional headers.
+            Defaults to None.
+
+    Raises:
+        ImportError: If numpy is not installed.
+        ValueError: If the array holds objects.
+
+    Returns:
+        DataPacket: The data packet.
+    """
+    _require_numpy()
+    array = np.ascontiguousarray(array)
+    if array.dtype.hasobject:
+        raise ValueError("arrays of objects cannot be sent")
+
+    packet_headers = {
+        CONTENT_TYPE_HEADER: CONTENT_TYPE_NDARRAY,
+        DTYPE_HEADER: array.dtype.str.encode('ascii'),
+        SHAPE_HEADER: ','.join(str(size) for size in array.shape).encode('ascii'),
+    }
+    if headers is not None:
+        packet_headers.update(headers)
+
+    return DataPacket(
+        {0} if entitlements is None else entitlements,
+        packet_headers,
+        memoryview(array.reshape(-1)).cast('B')
+    )
+
+
+def data_packet_to_array(packet: DataPacket) -> NDArray:
+    """Get the array held by a data packet.
+
+    The array is a read-only view directly over the packet data. When the
+    client is created with `copy_data=False` this is a view over the
+    received frame, and no copy is made.
+
+    Args:
+        packet (DataPacket): The data packet.
+
+    Raises:
+        ImportError: If numpy is not installed.
+        ValueError: If the packet does not hold an array.
+
+    Returns:
+        NDArray: A read-only array.
+    """
+    _require_numpy()
+    if packet.headers.get(CONTENT_TYPE_HEADER) != CONTENT_TYPE_NDARRAY:
+        raise ValueError("the data packet does not hold an array")
+
+    dtype = np.dtype(packet.headers[DTYPE_HEADER].decode('ascii'))
+    shape_header = packet.headers[SHAPE_HEADER]
+    shape = tuple(
+        int(size)
+        for size in shape_header.split(b',')
+    ) if shape_header else ()
+
+    array = np.frombuffer(packet.data, dtype=dtype).reshape(shape)
+    array.flags.writeable = False
+    return array
@@ -6,9 +6,16 @@ import asyncio
 from asyncio import Event, Queue, Task
 from base64 import b64encode
 import logging
-from typing import cast
+from time import perf_counter_ns
+from typing import Any, cast
 
 from .data_packet import DataPacket
+from .chunking import DEFAULT_CHUNK_SIZE, split_data_packet
+from .client_options import ClientOptions
+from .data_reader import DataReader, decode_name, encode_name
+from .header_filters import HeaderFilter
+from .interest_table import InterestTable
+from .last_value_cache import LastValueCache
 from .messages import (
     MessageType,
     Message,
@@ -22,11 +29,31 @@ from .messages import (
     ForwardedMulticastData,
     ForwardedUnicastData
 )
+from .metrics import ClientMetrics
+from .payload_codecs import (
+    CONTENT_TYPE_HEADER,
+    CONTENT_TYPE_JSON,
+    DEFAULT_CODECS,
+)
+from .payload_compression import PayloadCompression, PayloadDecompression
+from .string_cache import StringCache
+from .topic_patterns import topic_matches
+from .tracing import TraceStage
 from .types import MessageStream
 from .utils import read_aiter
 
 LOG = logging.getLogger(__name__)
 
+# The number of topics whose header filters are remembered.
+_MAX_FILTERED_TOPICS = 10_000
+
+_DATA_MESSAGES = (
+    MulticastData,
+    UnicastData,
+    ForwardedMulticastData,
+    ForwardedUnicastData
+)
+
 
 class BaseClient(metaclass=ABCMeta):
     """Base client"""
@@ -35,21 +62,124 @@ class BaseClient(metaclass=ABCMeta):
             self,
             stream: MessageStream,
             *,
-            credentials: tuple[str, str] | None = None
+            credentials: tuple[str, str] | None = None,
+            options: ClientOptions | None = None
     ) -> None:
+        if options is None:
+            options = ClientOptions()
+        self._options = options
         self._frame_stream = stream
         self._credentials = credentials
+        self._last_value_cache = options.last_value_cache
+        self._interest = (
+            InterestTable()
+            if options.track_interest or options.suppress_uninterested
+            else None
+        )
+        self._suppress_uninterested = options.suppress_uninterested
+        self._notification_batch_window = options.notification_batch_window
+        self._pending_notifications: list[ForwardedSubscriptionRequest | None] = []
+        self._pending_indices: dict[tuple[str, str], list[int]] = {}
+        self._notification_deadline: float | None = None
+        self._compression = options.compression
+        self._copy_data = options.copy_data
+        self._bytes_mode = options.bytes_mode
+        # The header filter of each subscription, or None when it has none,
+        # and the filters which apply to each topic received.
+        self._subscription_filters: dict[str, HeaderFilter | None] = {}
+        self._has_header_filters = False
+        self._topic_filters: dict[str, list[HeaderFilter] | None] = {}
         self._read_queue: Queue[Message] = asyncio.Queue()
         self._write_queue: Queue[Message] = asyncio.Queue()
         self._stop_event = Event()
         self._process_task: Task[None] | None = None
         self._is_closed = Event()
         self._client_id: str | None = None
+        self._metrics = metrics = options.metrics
+        if metrics is not None:
+            metrics.gauges['read_queue_depth'] = lambda: self._read_queue.qsize()
+            metrics.gauges['write_queue_depth'] = lambda: self._write_queue.qsize()
+        self._string_cache = StringCache()
+        self._decompression = PayloadDecompression(
+            options.max_decompressed_size,
+            None if metrics is None else metrics.decompression
+        )
+        self._tracer = options.tracer
+        self._watchdog = options.watchdog
+        self._dispatching: Message | None = None
 
     @property
     def client_id(self) -> str | None:
         return self._client_id
 
+    @property
+    def options(self) -> ClientOptions:
+        """The options of the client"""
+        return self._options
+
+    @property
+    def last_value_cache(self) -> LastValueCache | None:
+        """The optional cache of the last data received on each topic"""
+        return self._last_value_cache
+
+    @property
+    def compression(self) -> PayloadCompression | None:
+        """The optional compression applied to published data"""
+        return self._compression
+
+    @property
+    def string_cache(self) -> StringCache:
+        """The cache of the names read by the client"""
+        return self._string_cache
+
+    @property
+    def decompression(self) -> PayloadDecompression:
+        """The decompression of received data"""
+        return self._decompression
+
+    @property
+    def metrics(self) -> ClientMetrics | None:
+        """The optional metrics of the client"""
+        return self._metrics
+
+    @property
+    def interest(self) -> InterestTable | None:
+        """The subscribers to each topic, if interest is tracked"""
+        return self._interest
+
+    def has_interest(self, topic: str) -> bool:
+        """Check if a topic has subscribers.
+
+        The interest is maintained from the forwarded subscription requests
+        for the notifications the client has added. If interest is not
+        tracked this always returns True.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            bool: True if the topic has subscribers.
+        """
+        return self._interest is None or self._interest.has_interest(topic)
+
+    def _is_suppressed(self, topic: str | bytes) -> bool:
+        return self._suppress_uninterested and not self.has_interest(decode_name(topic))
+
+    def get_last(self, topic: str) -> list[DataPacket] | None:
+        """Get the last data packets received on a topic.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            list[DataPacket] | None: The data packets, or None if there is no
+                cache, or nothing is cached for the topic.
+        """
+        if self._last_value_cache is None:
+            return None
+        entry = self._last_value_cache.get(topic)
+        return None if entry is None else entry.data_packets
+
     async def _authenticate(self) -> None:
         if self._credentials is None:
             method = "none"
@@ -89,21 +219,20 @@ class BaseClient(metaclass=ABCMeta):
         LOG.debug('Started')
 
         async for message in read_aiter(self._read, self._write, self._dequeue, self._stop_event):
-            if message.message_type == MessageType.FORWARDED_MULTICAST_DATA:
-                await self._raise_multicast_data(
-                    cast(ForwardedMulticastData, message)
-                )
-            elif message.message_type == MessageType.FORWARDED_UNICAST_DATA:
-                await self._raise_unicast_data(
-                    cast(ForwardedUnicastData, message)
-                )
-            elif message.message_type == MessageType.FORWARDED_SUBSCRIPTION_REQUEST:
-                await self._raise_forwarded_subscription_request(
-                    cast(ForwardedSubscriptionRequest, message)
-                )
-            else:
-                raise RuntimeError(
-                    f'Invalid message type {message.message_type}')
+            if message is None:
+                # The notification batch window has ended.
+                await self._flush_forwarded_subscription_requests()
+                continue
+
+            if self._tracer is None:
+                await self._dispatch(message)
+                continue
+
+            self._tracer(TraceStage.DEQUEUED, message, perf_counter_ns())
+            self._dispatching = message
+            await self._dispatch(message)
+            self._dispatching = None
+            self._tracer(TraceStage.DISPATCHED, message, perf_counter_ns())
 
         is_faulted = not self._stop_event.is_set()
         if not is_faulted:
@@ -113,6 +242,28 @@ class BaseClient(metaclass=ABCMeta):
 
         LOG.debug('Stopped')
 
+    async def _dispatch(self, message: Message) -> None:
+        if message.message_type == MessageType.FORWARDED_SUBSCRIPTION_REQUEST:
+            await self._raise_forwarded_subscription_request(
+                cast(ForwardedSubscriptionRequest, message)
+            )
+            return
+
+        if self._pending_notifications:
+            await self._flush_forwarded_subscription_requests()
+
+        if message.message_type == MessageType.FORWARDED_MULTICAST_DATA:
+            await self._raise_multicast_data(
+                cast(ForwardedMulticastData, message)
+            )
+        elif message.message_type == MessageType.FORWARDED_UNICAST_DATA:
+            await self._raise_unicast_data(
+                cast(ForwardedUnicastData, message)
+            )
+        else:
+            raise RuntimeError(
+                f'Invalid message type {message.message_type}')
+
     def stop(self) -> None:
         """Stop handling messages"""
         self._stop_event.set()
@@ -126,14 +277,22 @@ class BaseClient(metaclass=ABCMeta):
 
     async def _read_message(self) -> Message:
         buf = await self._frame_stream.read()
-        message = Message.deserialize(buf)
+        message = Message.read(
+            DataReader(
+                buf,
+                copy_data=self._copy_data,
+                string_cache=self._string_cache,
+                raw_strings=self._bytes_mode,
+                decompression=self._decompression
+            )
+        )
         return message
 
     async def _raise_multicast_data(
             self,
             message: ForwardedMulticastData
     ) -> None:
-        await self.on_data(
+        await self._raise_data(
             message.user,
             message.host,
             message.topic,
@@ -144,13 +303,44 @@ class BaseClient(metaclass=ABCMeta):
             self,
             message: ForwardedUnicastData
     ) -> None:
-        await self.on_data(
+        await self._raise_data(
             message.user,
             message.host,
             message.topic,
             message.data_packets
         )
 
+    async def _raise_data(
+            self,
+            user: str | bytes,
+            host: str | bytes,
+            topic: str | bytes,
+            data_packets: list[DataPacket]
+    ) -> None:
+        if self._last_value_cache is not None:
+            self._last_value_cache.put(
+                decode_name(topic),
+                decode_name(user),
+                decode_name(host),
+                data_packets
+            )
+        # The names are already bytes in bytes mode, and strings otherwise,
+        # so neither call converts them.
+        if self._bytes_mode:
+            await self.on_bytes_data(
+                encode_name(user),
+                encode_name(host),
+                encode_name(topic),
+                data_packets
+            )
+        else:
+            await self.on_data(
+                decode_name(user),
+                decode_name(host),
+                decode_name(topic),
+                data_packets
+            )
+
     @abstractmethod
     async def on_data(
             self,
@@ -170,17 +360,104 @@ class BaseClient(metaclass=ABCMeta):
             is_image (bool): True if the data is considered an image.
         """
 
+    async def on_bytes_data(
+            self,
+            user: bytes,
+            host: bytes,
+            topic: bytes,
+            data_packets: list[DataPacket]
+    ) -> None:
+        """Called when data is received in bytes mode.
+
+        The default implementation decodes the names and calls `on_data`.
+
+        Args:
+            user (bytes): The encoded user name of the sender.
+            host (bytes): The encoded host from which the data was sent.
+            topic (bytes): The encoded topic name.
+            data_packets (list[DataPacket]): The data packets.
+        """
+        await self.on_data(
+            decode_name(user),
+            decode_name(host),
+            decode_name(topic),
+            data_packets
+        )
+
     async def _raise_forwarded_subscription_request(
             self,
             message: ForwardedSubscriptionRequest
     ) -> None:
-        await self.on_forwarded_subscription_request(
-            message.client_id,
-            message.user,
-            message.host,
-            message.topic,
-            message.count
-        )
+        if self._interest is not None:
+            self._interest.update(message.client_id, message.topic, message.count)
+
+        if self._notification_batch_window is None:
+            await self.on_forwarded_subscription_requests([message])
+            return
+
+        if self._notification_deadline is None:
+            self._notification_deadline = (
+                asyncio.get_running_loop().time() + self._notification_batch_window
+            )
+
+        # Net the requests, so a request supersedes the previous one for the
+        # client and topic, unless it re-adds a subscription that was
+        # removed. The removal and the re-add are both kept, so the re-add is
+        # seen as a new subscription.
+        key = (message.client_id, message.topic)
+        pending = self._pending_notifications
+        indices = self._pending_indices.setdefault(key, [])
+        if indices:
+            previous = cast(ForwardedSubscriptionRequest, pending[indices[-1]])
+            if previous.count != 0 or message.count == 0:
+                pending[indices.pop()] = None
+                if indices and message.count == 0:
+                    # Removing the re-added subscription nets to the removal.
+                    return
+        indices.append(len(pending))
+        pending.append(message)
+
+    async def _flush_forwarded_subscription_requests(self) -> None:
+        self._notification_deadline = None
+        if not self._pending_notifications:
+            return
+
+        messages = [
+            message
+            for message in self._pending_notifications
+            if message is not None
+        ]
+        self._pending_notifications = []
+        self._pending_indices.clear()
+        await self.on_forwarded_subscription_requests(messages)
+
+    async def on_forwarded_subscription_requests(
+            self,
+            messages: list[ForwardedSubscriptionRequest]
+    ) -> None:
+        """Called for a batch of notifications.
+
+        When the client batches notifications, the requests received within
+        the batch window are delivered together, netted so there is only the
+        latest request for each client and topic, except that when a
+        subscription is removed and added again both requests are kept. The
+        batch is delivered from the dispatch loop, before any data received
+        after it. Otherwise each request is delivered in a batch of its own.
+
+        The default implementation calls `on_forwarded_subscription_request`
+        for each request.
+
+        Args:
+            messages (list[ForwardedSubscriptionRequest]): The requests.
+        """
+        for message in messages:
+            await self.on_forwarded_subscription_request(
+                message.client_id,
+                message.user,
+                message.host,
+                message.topic,
+                message.count
+            )
 
     @abstractmethod
     async def on_forwarded_subscription_request(
@@ -211,16 +488,23 @@ class BaseClient(metaclass=ABCMeta):
 
     async def publish(
             self,
-            topic: str,
+            topic: str | bytes,
             data_packets: list[DataPacket]
     ) -> None:
         """Publish data to subscribers
 
+        If the client suppresses uninterested publishing, data for topics
+        with no subscribers is discarded without being serialized or sent.
+
         Args:
-            topic (str): The topic name.
+            topic (str | bytes): The topic name. Bytes are written unchanged.
             data_packets (Optional[List[DataPacket]]): Th data packets.
         """
-        await self._write_queue.put(
+        if self._is_suppressed(topic):
+            return
+        if self._compression is not None:
+            data_packets = self._compress(data_packets)
+        await self._enqueue(
             MulticastData(
                 topic,
                 data_packets
@@ -229,18 +513,23 @@ class BaseClient(metaclass=ABCMeta):
 
     async def send(
             self,
-            client_id: str,
-            topic: str,
+            client_id: str | bytes,
+            topic: str | bytes,
             data_packets: list[DataPacket]
     ) -> None:
         """Send data to a client
 
+        Data sent to a client is never suppressed, as the recipient asked
+        for it without subscribing.
+
         Args:
             client_id (UUID): The clint id.
-            topic (str): The topic name.
+            topic (str | bytes): The topic name. Bytes are written unchanged.
             data_packets (Optional[List[DataPacket]]): Th data packets.
         """
-        await self._write_queue.put(
+        if self._compression is not None:
+            data_packets = self._compress(data_packets)
+        await self._enqueue(
             UnicastData(
                 client_id,
                 topic,
@@ -248,12 +537,145 @@ class BaseClient(metaclass=ABCMeta):
             )
         )
 
-    async def add_subscription(self, topic: str) -> None:
-        """Add a subscription
+    async def _enqueue(self, message: Message) -> None:
+        if self._tracer is not None:
+            self._tracer(TraceStage.PUBLISHED, message, perf_counter_ns())
+        await self._write_queue.put(message)
+
+    async def publish_chunked(
+            self,
+            topic: str,
+            data_packets: list[DataPacket],
+            *,
+            chunk_size: int = DEFAULT_CHUNK_SIZE
+    ) -> None:
+        """Publish data, splitting large packets into chunks.
+
+        Each chunk is published as a separate message, so messages on other
+        topics can be sent between the chunks, and no frame is larger than
+        the chunk size. Subscribers reassemble the chunks with a
+        `ChunkAssembler` or `ChunkStreamer`.
+
+        Args:
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+            chunk_size (int, optional): The maximum size of the data of a
+                chunk. Defaults to DEFAULT_CHUNK_SIZE, 960KiB, so a chunk
+                with its headers fits in a 1MiB frame.
+        """
+        if self._is_suppressed(topic):
+            return
+        if self._compression is not None:
+            data_packets = self._compress(data_packets)
+
+        small_packets: list[DataPacket] = []
+        for packet in data_packets:
+            chunks = split_data_packet(packet, chunk_size)
+            if len(chunks) == 1:
+                small_packets.append(packet)
+                continue
+            for chunk in chunks:
+                await self.publish(topic, [chunk])
+                # Let other publishers interleave with the transfer.
+                await asyncio.sleep(0)
+
+        if small_packets:
+            await self.publish(topic, small_packets)
+
+    def _compress(self, data_packets: list[DataPacket]) -> list[DataPacket]:
+        compression = cast(PayloadCompression, self._compression)
+        stats = None if self._metrics is None else self._metrics.compression
+        compressed: list[DataPacket] = []
+        for packet in data_packets:
+            headers, payload = compression.compress(packet.headers, packet.payload, stats)
+            compressed.append(
+                packet
+                if payload is packet.payload
+                else DataPacket(packet.entitlements, headers, payload)
+            )
+        return compressed
+
+    async def publish_value(
+            self,
+            topic: str,
+            value: Any,
+            *,
+            content_type: bytes = CONTENT_TYPE_JSON,
+            entitlements: set[int] | None = None,
+            headers: dict[bytes, bytes] | None = None
+    ) -> None:
+        """Encode a value and publish it to subscribers.
+
+        If the client suppresses uninterested publishing, the value is not
+        encoded when the topic has no subscribers.
 
         Args:
             topic (str): The topic name.
+            value (Any): The value to encode.
+            content_type (bytes, optional): The content type which selects the
+                codec. Defaults to b'application/json'.
+            entitlements (set[int] | None, optional): The entitlements of the
+                data packet. Defaults to {0}.
+            headers (dict[bytes, bytes] | None, optional): Additional headers.
+                Defaults to None.
         """
+        if self._is_suppressed(topic):
+            return
+        await self.publish(
+            topic,
+            [_encode_value(value, content_type, entitlements, headers)]
+        )
+
+    async def send_value(
+            self,
+            client_id: str,
+            topic: str,
+            value: Any,
+            *,
+            content_type: bytes = CONTENT_TYPE_JSON,
+            entitlements: set[int] | None = None,
+            headers: dict[bytes, bytes] | None = None
+    ) -> None:
+        """Encode a value and send it to a client.
+
+        Args:
+            client_id (str): The client id.
+            topic (str): The topic name.
+            value (Any): The value to encode.
+            content_type (bytes, optional): The content type which selects the
+                codec. Defaults to b'application/json'.
+            entitlements (set[int] | None, optional): The entitlements of the
+                data packet. Defaults to {0}.
+            headers (dict[bytes, bytes] | None, optional): Additional headers.
+                Defaults to None.
+        """
+        await self.send(
+            client_id,
+            topic,
+            [_encode_value(value, content_type, entitlements, headers)]
+        )
+
+    async def add_subscription(
+            self,
+            topic: str,
+            *,
+            header_filter: HeaderFilter | None = None
+    ) -> None:
+        """Add a subscription
+
+        When a header filter is given, received packets on the topics the
+        subscription matches are checked as soon as their headers are
+        decoded. The data of rejected packets is skipped, and messages left
+        with no packets are dropped before they reach the handlers. When
+        several subscriptions match a topic a packet is kept if any of them
+        accepts it.
+
+        Args:
+            topic (str): The topic name, or a pattern.
+            header_filter (HeaderFilter | None, optional): A predicate on the
+                headers of the packets to receive. Defaults to None.
+        """
+        self._set_header_filter(topic, header_filter)
         await self._write_queue.put(
             SubscriptionRequest(
                 topic,
@@ -264,9 +686,16 @@ class BaseClient(metaclass=ABCMeta):
     async def remove_subscription(self, topic: str) -> None:
         """Remove a subscription
 
+        The values cached for the topics the subscription matches are
+        discarded, as they will no longer be kept up to date, unless another
+        subscription still matches them.
+
         Args:
-            topic (str): The topic name.
+            topic (str): The topic name, or a pattern.
         """
+        self._set_header_filter(topic, None, remove=True)
+        if self._last_value_cache is not None:
+            self._discard_unsubscribed(self._last_value_cache, topic)
         await self._write_queue.put(
             SubscriptionRequest(
                 topic,
@@ -300,16 +729,147 @@ class BaseClient(metaclass=ABCMeta):
             )
         )
 
+    def _discard_unsubscribed(self, cache: LastValueCache, pattern: str) -> None:
+        for topic, _ in cache.items():
+            if topic_matches(pattern, topic) and not any(
+                    topic_matches(subscription, topic)
+                    for subscription in self._subscription_filters
+            ):
+                cache.discard(topic)
+
+    def _set_header_filter(
+            self,
+            topic: str,
+            header_filter: HeaderFilter | None,
+            *,
+            remove: bool = False
+    ) -> None:
+        if remove:
+            self._subscription_filters.pop(topic, None)
+        else:
+            self._subscription_filters[topic] = header_filter
+        self._has_header_filters = any(
+            header_filter is not None
+            for header_filter in self._subscription_filters.values()
+        )
+        self._topic_filters.clear()
+
+    def _resolve_header_filters(self, topic: str) -> list[HeaderFilter] | None:
+        # A packet is wanted if any subscription matching the topic accepts
+        # it, so a matching subscription without a filter accepts them all.
+        header_filters: list[HeaderFilter] = []
+        for pattern, header_filter in self._subscription_filters.items():
+            if not topic_matches(pattern, topic):
+                continue
+            if header_filter is None:
+                return None
+            header_filters.append(header_filter)
+        return header_filters or None
+
+    def _accept_packet(self, topic: str | bytes, headers: dict[bytes, bytes]) -> bool:
+        name = decode_name(topic)
+        try:
+            header_filters = self._topic_filters[name]
+        except KeyError:
+            if len(self._topic_filters) >= _MAX_FILTERED_TOPICS:
+                self._topic_filters.clear()
+            header_filters = self._topic_filters[name] = self._resolve_header_filters(name)
+        return header_filters is None or any(
+            header_filter(headers)
+            for header_filter in header_filters
+        )
+
     async def _read(self) -> None:
         buf = await self._frame_stream.read()
-        message = Message.deserialize(buf)
+        received = perf_counter_ns() if self._tracer is not None else 0
+        reader = DataReader(
+            buf,
+            copy_data=self._copy_data,
+            packet_filter=self._accept_packet if self._has_header_filters else None,
+            string_cache=self._string_cache,
+            raw_strings=self._bytes_mode,
+            decompression=self._decompression
+        )
+        if self._metrics is None:
+            message = Message.read(reader)
+        else:
+            start = perf_counter_ns()
+            message = Message.read(reader)
+            self._metrics.record_read(
+                message.message_type,
+                len(buf),
+                perf_counter_ns() - start,
+                _data_topic(message)
+            )
+        if reader.skipped_packets > 0 and not cast(
+                ForwardedMulticastData | ForwardedUnicastData,
+                message
+        ).data_packets:
+            LOG.debug("dropping message with no accepted packets")
+            return
+        if self._tracer is not None:
+            self._tracer(TraceStage.RECEIVED, message, received)
+            self._tracer(TraceStage.DECODED, message, perf_counter_ns())
         await self._read_queue.put(message)
 
-    async def _dequeue(self) -> Message:
-        message = await self._read_queue.get()
-        return message
+    async def _dequeue(self) -> Message | None:
+        if self._notification_deadline is None:
+            message = await self._read_queue.get()
+            return message
+
+        # Wait no longer than the end of the notification batch window, and
+        # return None when it ends.
+        timeout = self._notification_deadline - asyncio.get_running_loop().time()
+        if timeout <= 0:
+            return None
+        try:
+            return await asyncio.wait_for(self._read_queue.get(), timeout)
+        except TimeoutError:
+            return None
 
     async def _write(self):
         message = await self._write_queue.get()
-        buf = message.serialize()
+        if self._metrics is None and self._tracer is None:
+            buf = message.serialize_buffer()
+            await self._frame_stream.write(buf)
+            return
+
+        start = perf_counter_ns()
+        buf = message.serialize_buffer()
+        serialized = perf_counter_ns()
         await self._frame_stream.write(buf)
+        written = perf_counter_ns()
+        if self._metrics is not None:
+            self._metrics.record_write(
+                message.message_type,
+                len(buf),
+                serialized - start,
+                written - serialized,
+                _data_topic(message)
+            )
+        if self._tracer is not None:
+            self._tracer(TraceStage.WRITE_DEQUEUED, message, start)
+            self._tracer(TraceStage.SERIALIZED, message, serialized)
+            self._tracer(TraceStage.WRITTEN, message, written)
+
+
+def _data_topic(message: Message) -> str | None:
+    if isinstance(message, _DATA_MESSAGES):
+        return decode_name(message.topic)
+    return None
+
+
+def _encode_value(
+        value: Any,
+        content_type: bytes,
+        entitlements: set[int] | None,
+        headers: dict[bytes, bytes] | None
+) -> DataPacket:
+    packet_headers = {CONTENT_TYPE_HEADER: content_type}
+    if headers is not None:
+        packet_headers.update(headers)
+    return DataPacket(
+        {0} if entitlements is None else entitlements,
+        packet_headers,
+        DEFAULT_CODECS.encode(value, content_type)
+    )
@@ -0,0 +1,313 @@
+"""Multi-process load test"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+from multiprocessing.synchronize import Barrier, Event
+import time
+from collections import Counter
+from typing import Any
+
+from .callback_client import CallbackClient
+from .client_options import ClientOptions
+from .data_packet import DataPacket
+from .latency import LatencyMonitor, LatencyStamper
+from .messages import MessageType
+from .metrics import ClientMetrics
+from .payload_compression import PayloadCompression, ZlibCompressor, ZstdCompressor
+from .socket_client import SocketClient
+from .socket_stream import DEFAULT_MAX_FRAME_SIZE
+from .websocket_client import WebsocketClient
+
+DRAIN_TIME = 1.0
+
+
+def _topics(options: dict[str, Any]) -> list[str]:
+    return [f"{options['topic_prefix']}.{i}" for i in range(options['topics'])]
+
+
+def _client_options(options: dict[str, Any], metrics: ClientMetrics) -> ClientOptions:
+    compression = None
+    if options['compression'] is not None:
+        compressor = ZstdCompressor() if options['compression'] == 'zstd' else ZlibCompressor()
+        compression = PayloadCompression(compressor, options['compression_threshold'])
+    return ClientOptions(
+        notification_batch_window=options['notification_batch_window'],
+        compression=compression,
+        copy_data=options['copy_data'],
+        bytes_mode=options['bytes_mode'],
+        metrics=metrics,
+        max_frame_size=options['max_frame_size'],
+        max_memory_frame_size=options['max_memory_frame_size'],
+    )
+
+
+async def _connect(options: dict[str, Any], metrics: ClientMetrics) -> CallbackClient:
+    client_type = WebsocketClient if options['transport'] == 'websocket' else SocketClient
+    return await client_type.create(
+        options['host'],
+        options['port'],
+        credentials=options['credentials'],
+        options=_client_options(options, metrics)
+    )
+
+
+async def _publish(options: dict[str, Any], index: int, barrier: Barrier) -> dict[str, Any]:
+    metrics = ClientMetrics()
+    client = await _connect(options, metrics)
+    write_queue_depth = metrics.gauges['write_queue_depth']
+    stamper = LatencyStamper(source=f'p{index}'.encode('ascii'))
+    topics = _topics(options)
+    packets = [
+        DataPacket({0}, {}, bytes(options['payload_size']))
+        for _ in range(options['packets'])
+    ]
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+
+    interval = 1 / options['rate'] if options['rate'] else 0
+    max_write_queue_depth = options['max_write_queue_depth']
+    count = 0
+    published: Counter[str] = Counter()
+    cpu_start, start = time.process_time(), time.perf_counter()
+    end = start + options['duration']
+    while (now := time.perf_counter()) < end:
+        if interval:
+            delay = start + count * interval - now
+            if delay > 0:
+                await asyncio.sleep(delay)
+        while write_queue_depth() > max_write_queue_depth:
+            await asyncio.sleep(0.001)
+        topic = topics[count % len(topics)]
+        await client.publish(topic, stamper.stamp(topic, packets))
+        published[topic] += 1
+        count += 1
+        if count % 100 == 0:
+            await asyncio.sleep(0)
+    while write_queue_depth() > 0:
+        await asyncio.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+
+    client.close()
+    await client.wait_closed()
+    return {
+        'role': 'publisher',
+        'index': index,
+        'messages': count,
+        'messages_per_sec': count / elapsed,
+        'mb_per_sec': sum(metrics.bytes_out.values()) / elapsed / 1e6,
+        'cpu_percent': cpu / elapsed * 100,
+        'topics': dict(published),
+    }
+
+
+async def _subscribe(options: dict[str, Any], index: int, barrier: Barrier) -> dict[str, Any]:
+    metrics = ClientMetrics()
+    client = await _connect(options, metrics)
+    monitor = LatencyMonitor()
+    monitor.attach(client)
+    received: Counter[str] = Counter()
+
+    async def on_data(_user, _host, topic: str, _data_packets) -> None:
+        received[topic] += 1
+
+    client.data_handlers.append(on_data)
+    for topic in _topics(options):
+        await client.add_subscription(topic)
+    await asyncio.get_running_loop().run_in_executor(None, barrier.wait)
+
+    cpu_start, start = time.process_time(), time.perf_counter()
+    await asyncio.sleep(options['duration'] + DRAIN_TIME)
+    elapsed = time.perf_counter() - start - DRAIN_TIME
+    cpu = time.process_time() - cpu_start
+
+    client.close()
+    await client.wait_closed()
+    latency = monitor.latency
+    messages = metrics.messages_in[MessageType.FORWARDED_MULTICAST_DATA]
+    return {
+        'role': 'subscriber',
+        'index': index,
+        'messages': messages,
+        'messages_per_sec': messages / elapsed,
+        'mb_per_sec': sum(metrics.bytes_in.values()) / elapsed / 1e6,
+        'latency_p50_us': latency.percentile(50) / 1e3,
+        'latency_p99_us': latency.percentile(99) / 1e3,
+        'latency_p999_us': latency.percentile(99.9) / 1e3,
+        'latency_max_us': latency.max / 1e3,
+        'missing': monitor.missing,
+        'gaps': monitor.gaps,
+        'cpu_percent': cpu / elapsed * 100,
+        'topics': dict(received),
+    }
+
+
+def _count_dropped(results: list[dict[str, Any]]) -> None:
+    """Set the messages each subscriber dropped, from the messages published
+    and received on each topic"""
+    published: Counter[str] = Counter()
+    for result in results:
+        if result['role'] == 'publisher' and 'error' not in result:
+            published.update(result['topics'])
+    for result in results:
+        if result['role'] == 'subscriber' and 'error' not in result:
+            received = result['topics']
+            result['dropped'] = sum(
+                max(count - received.get(topic, 0), 0)
+                for topic, count in published.items()
+            )
+
+
+def _run_client(
+        role: str,
+        index: int,
+        options: dict[str, Any],
+        barrier: Barrier,
+        results: multiprocessing.Queue
+) -> None:
+    run = _publish if role == 'publisher' else _subscribe
+    try:
+        results.put(asyncio.run(run(options, index, barrier)))
+    except BaseException as error:  # pylint: disable=broad-exception-caught
+        barrier.abort()
+        results.put({'role': role, 'index': index, 'error': repr(error)})
+
+
+def _run_broker(options: dict[str, Any], ready: Event) -> None:
+    from .broker import Broker  # pylint: disable=import-outside-toplevel
+
+    async def serve() -> None:
+        async with Broker() as broker:
+            if options['transport'] == 'websocket':
+                await broker.start(options['host'], None, websocket_port=options['port'])
+            else:
+                await broker.start(options['host'], options['port'])
+            ready.set()
+            await asyncio.Event().wait()
+
+    asyncio.run(serve())
+
+
+def _print_results(results: list[dict[str, Any]]) -> None:
+    for result in results:
+        name = f"{result['role']} {result['index']}"
+        if 'error' in result:
+            print(f"{name}: failed {result['error']}")
+            continue
+        fields = ' '.join(
+            f'{key}={value:,.1f}' if isinstance(value, float) else f'{key}={value:,}'
+            for key, value in result.items()
+            if key not in ('role', 'index', 'topics')
+        )
+        print(f"{name}: {fields}")
+
+    for role in ('publisher', 'subscriber'):
+        completed = [
+            result for result in results
+            if result['role'] == role and 'error' not in result
+        ]
+        if completed:
+            total = sum(result['messages_per_sec'] for result in completed)
+            print(f"total {role} throughput: {total:,.0f} messages/sec")
+
+
+def main() -> None:
+    """Run the load test"""
+    parser = argparse.ArgumentParser(
+        description="Run publishers and subscribers in separate processes, "
+        "and report throughput, latency, drops and CPU usage."
+    )
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=None,
+                        help='defaults to 8558 for sockets and 8559 for websockets')
+    parser.add_argument('--transport', choices=('socket', 'websocket'), default='socket')
+    parser.add_argument('--credentials', nargs=2, metavar=('USER', 'PASSWORD'))
+    parser.add_argument('--local-broker', action='store_true',
+                        help='run the stand-in broker in another process')
+    parser.add_argument('--publishers', type=int, default=1)
+    parser.add_argument('--subscribers', type=int, default=1)
+    parser.add_argument('--topics', type=int, default=10)
+    parser.add_argument('--topic-prefix', default='bench')
+    parser.add_argument('--rate', type=float, default=1_000,
+                        help='messages per second per publisher, or 0 for unbounded')
+    parser.add_argument('--payload-size', type=int, default=100)
+    parser.add_argument('--packets', type=int, default=1)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--notification-batch-window', type=float, default=None,
+                        help='the seconds notifications are batched for')
+    parser.add_argument('--compression', choices=('zlib', 'zstd'), default=None,
+                        help='compress published data')
+    parser.add_argument('--compression-threshold', type=int, default=1024,
+                        help='the size in bytes above which data is compressed')
+    parser.add_argument('--no-copy-data', action='store_true',
+                        help='receive data as views over the frame')
+    parser.add_argument('--bytes-mode', action='store_true',
+                        help='receive names as bytes')
+    parser.add_argument('--max-write-queue-depth', type=int, default=1_000,
+                        help='the queued messages above which publishers wait')
+    parser.add_argument('--max-frame-size', type=int, default=DEFAULT_MAX_FRAME_SIZE,
+                        help='the size in bytes above which a frame is rejected, or 0 for no limit')
+    parser.add_argument('--max-memory-frame-size', type=int, default=None,
+                        help='the size in bytes above which a frame is read into a file')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+
+    options = {
+        'host': args.host,
+        'port': args.port or (8559 if args.transport == 'websocket' else 8558),
+        'transport': args.transport,
+        'credentials': tuple(args.credentials) if args.credentials else None,
+        'topics': args.topics,
+        'topic_prefix': args.topic_prefix,
+        'rate': args.rate,
+        'payload_size': args.payload_size,
+        'packets': args.packets,
+        'duration': args.duration,
+        'notification_batch_window': args.notification_batch_window,
+        'compression': args.compression,
+        'compression_threshold': args.compression_threshold,
+        'copy_data': not args.no_copy_data,
+        'bytes_mode': args.bytes_mode,
+        'max_write_queue_depth': args.max_write_queue_depth,
+        'max_frame_size': args.max_frame_size or None,
+        'max_memory_frame_size': args.max_memory_frame_size,
+    }
+
+    context = multiprocessing.get_context('spawn')
+    broker = None
+    if args.local_broker:
+        ready = context.Event()
+        broker = context.Process(target=_run_broker, args=(options, ready), daemon=True)
+        broker.start()
+        if not ready.wait(10):
+            raise RuntimeError("the broker did not start")
+
+    barrier = context.Barrier(args.publishers + args.subscribers)
+    results: multiprocessing.Queue = context.Queue()
+    processes = [
+        context.Process(target=_run_client, args=(role, index, options, barrier, results))
+        for role, count in (('subscriber', args.subscribers), ('publisher', args.publishers))
+        for index in range(count)
+    ]
+    for process in processes:
+        process.start()
+    collected = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    if broker is not None:
+        broker.terminate()
+        broker.join()
+
+    collected.sort(key=lambda result: (result['role'], result['index']))
+    _count_dropped(collected)
+    _print_results(collected)
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as file:
+            json.dump({'options': options, 'results': collected}, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
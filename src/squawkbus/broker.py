@@ -0,0 +1,590 @@
+"""A stand-in broker for testing and benchmarking"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from asyncio import Queue, Server, StreamReader, StreamWriter, Task
+from base64 import b64decode
+from collections import OrderedDict
+import logging
+import re
+from ssl import SSLContext
+from typing import Any, Collection, Generic, Hashable, Mapping, TypeVar
+import uuid
+
+from .data_packet import DataPacket
+from .data_reader import DataReader, decode_name
+from .messages import (
+    AuthenticationRequest,
+    AuthenticationResponse,
+    ForwardedMulticastData,
+    ForwardedSubscriptionRequest,
+    ForwardedUnicastData,
+    Message,
+    MulticastData,
+    NotificationRequest,
+    SubscriptionRequest,
+    UnicastData,
+)
+from .socket_stream import DEFAULT_MAX_FRAME_SIZE, SocketStream
+from .string_cache import StringCache
+from .topic_patterns import is_literal, literal_prefix, topic_matches
+from .types import MessageStream
+
+try:
+    from websockets.asyncio.server import ServerConnection, serve
+    from websockets.exceptions import ConnectionClosed
+except ImportError:
+    # The websocket server is optional.
+    serve = None  # type: ignore[assignment]
+
+LOG = logging.getLogger(__name__)
+
+T = TypeVar('T', bound=Hashable)
+
+
+def _require_websockets() -> None:
+    if serve is None:
+        raise ImportError(
+            "websockets is required to serve websockets: install squawkbus[websockets]"
+        )
+
+
+class _Regex(Generic[T]):
+
+    def __init__(self, pattern: str) -> None:
+        self.prefix = literal_prefix(pattern)
+        self.regex = re.compile(pattern)
+        self.holders: dict[T, int] = {}
+
+    def fullmatch(self, topic: str) -> bool:
+        return topic.startswith(self.prefix) and self.regex.fullmatch(topic) is not None
+
+
+class PatternIndex(Generic[T]):
+    """An index of the holders of topic patterns.
+
+    Patterns are regular expressions which must match the whole topic,
+    except that a pattern whose only metacharacter is '.' is taken
+    literally, so 'quote.T5' does not match 'quoteXT5'. Literal patterns are
+    held in a dictionary, and regular expressions are grouped by the literal
+    prefix they start with, so a topic is only tested against the
+    expressions whose prefix it has. The holders matching the most recently
+    used topics are cached, and a change to a pattern only invalidates the
+    topics it matches, so looking up a topic is usually a single dictionary
+    access.
+    """
+
+    def __init__(self, max_cached_topics: int = 10_000) -> None:
+        """Initialise the index.
+
+        Args:
+            max_cached_topics (int, optional): The number of topics whose
+                holders are cached. Defaults to 10,000.
+        """
+        self.max_cached_topics = max_cached_topics
+        self._literals: dict[str, dict[T, int]] = {}
+        self._patterns: dict[str, _Regex[T]] = {}
+        self._prefixes: dict[str, dict[str, _Regex[T]]] = {}
+        self._prefix_lengths: dict[int, int] = {}
+        self._cache: OrderedDict[str, list[T]] = OrderedDict()
+
+    def _holders(self, pattern: str) -> dict[T, int] | None:
+        if is_literal(pattern):
+            return self._literals.get(pattern)
+        entry = self._patterns.get(pattern)
+        return None if entry is None else entry.holders
+
+    def _create(self, pattern: str) -> dict[T, int]:
+        if is_literal(pattern):
+            holders: dict[T, int] = {}
+            self._literals[pattern] = holders
+            return holders
+        entry = _Regex[T](pattern)
+        self._patterns[pattern] = entry
+        self._prefixes.setdefault(entry.prefix, {})[pattern] = entry
+        length = len(entry.prefix)
+        self._prefix_lengths[length] = self._prefix_lengths.get(length, 0) + 1
+        return entry.holders
+
+    def _delete(self, pattern: str) -> None:
+        if self._literals.pop(pattern, None) is not None:
+            return
+        entry = self._patterns.pop(pattern)
+        patterns = self._prefixes[entry.prefix]
+        del patterns[pattern]
+        if not patterns:
+            del self._prefixes[entry.prefix]
+        length = len(entry.prefix)
+        self._prefix_lengths[length] -= 1
+        if not self._prefix_lengths[length]:
+            del self._prefix_lengths[length]
+
+    def _invalidate(self, pattern: str) -> None:
+        if is_literal(pattern):
+            self._cache.pop(pattern, None)
+            return
+        entry = self._patterns.get(pattern) or _Regex[T](pattern)
+        for topic in [topic for topic in self._cache if entry.fullmatch(topic)]:
+            del self._cache[topic]
+
+    def add(self, pattern: str, holder: T) -> int:
+        """Add a holder of a pattern.
+
+        Args:
+            pattern (str): The pattern.
+            holder (T): The holder.
+
+        Returns:
+            int: The number of times the holder holds the pattern.
+        """
+        holders = self._holders(pattern)
+        if holders is None:
+            holders = self._create(pattern)
+        count = holders[holder] = holders.get(holder, 0) + 1
+        if count == 1:
+            self._invalidate(pattern)
+        return count
+
+    def remove(self, pattern: str, holder: T, *, remove_all: bool = False) -> int:
+        """Remove a holder of a pattern.
+
+        Args:
+            pattern (str): The pattern.
+            holder (T): The holder.
+            remove_all (bool, optional): If true the holder is removed however
+                many times it holds the pattern. Defaults to False.
+
+        Returns:
+            int: The number of times the holder still holds the pattern.
+        """
+        holders = self._holders(pattern)
+        if holders is None or holder not in holders:
+            return 0
+        count = 0 if remove_all else holders[holder] - 1
+        if count > 0:
+            holders[holder] = count
+            return count
+        del holders[holder]
+        self._invalidate(pattern)
+        if not holders:
+            self._delete(pattern)
+        return 0
+
+    def patterns(self, holder: T) -> list[tuple[str, int]]:
+        """Get the patterns of a holder.
+
+        Args:
+            holder (T): The holder.
+
+        Returns:
+            list[tuple[str, int]]: The patterns and counts.
+        """
+        return [
+            (pattern, holders[holder])
+            for pattern, holders in self.items()
+            if holder in holders
+        ]
+
+    def items(self) -> list[tuple[str, dict[T, int]]]:
+        """Get the patterns and their holders.
+
+        Returns:
+            list[tuple[str, dict[T, int]]]: The patterns with the count for
+                each holder.
+        """
+        return [
+            *self._literals.items(),
+            *((pattern, entry.holders) for pattern, entry in self._patterns.items())
+        ]
+
+    def match(self, topic: str) -> list[T]:
+        """Find the holders of patterns matching a topic.
+
+        Args:
+            topic (str): The topic.
+
+        Returns:
+            list[T]: The holders, each appearing once.
+        """
+        matched = self._cache.get(topic)
+        if matched is not None:
+            self._cache.move_to_end(topic)
+            return matched
+        found: dict[T, None] = dict.fromkeys(self._literals.get(topic, ()))
+        for length in self._prefix_lengths:
+            for entry in self._prefixes.get(topic[:length], {}).values():
+                if entry.regex.fullmatch(topic):
+                    found.update(dict.fromkeys(entry.holders))
+        matched = self._cache[topic] = list(found)
+        if len(self._cache) > self.max_cached_topics:
+            self._cache.popitem(last=False)
+        return matched
+
+
+class _WebsocketServerStream:
+
+    def __init__(self, websocket: ServerConnection) -> None:
+        self._websocket = websocket
+
+    async def write(self, buf: bytes | bytearray) -> None:
+        await self._websocket.send(buf, text=False)
+
+    async def read(self) -> bytes:
+        try:
+            buf = await self._websocket.recv()
+        except ConnectionClosed as error:
+            raise EOFError() from error
+        if not isinstance(buf, bytes):
+            raise ValueError("websocket received text - expected binary")
+        return buf
+
+    async def close(self) -> None:
+        await self._websocket.close()
+
+
+class _Connection:
+
+    def __init__(self, stream: MessageStream, host: str) -> None:
+        self.stream = stream
+        self.host = host
+        self.user = 'nobody'
+        self.client_id = str(uuid.uuid4())
+        self.entitlements: frozenset[int] | None = None
+        self.queue: Queue[bytes | bytearray] = Queue()
+        self.writer: Task[None] | None = None
+
+    async def write_queued(self) -> None:
+        try:
+            while True:
+                buf = await self.queue.get()
+                await self.stream.write(buf)
+        except (EOFError, ConnectionError):
+            pass
+
+
+class Broker:
+    """A stand-in for the squawkbus server.
+
+    The broker supports authentication, subscriptions and notifications
+    with regular expression topic patterns, forwarded subscription requests,
+    multicast and unicast data, and entitlement filtering, over TCP and
+    (if the websockets package is installed) websockets.
+
+    Received data is not copied, and each forwarded message is serialized
+    once for all of the subscribers entitled to the same packets. Each client
+    has its own write queue, so a slow client does not hold up the others.
+    """
+
+    def __init__(
+            self,
+            *,
+            passwords: Mapping[str, str] | None = None,
+            entitlements: Mapping[str, Collection[int]] | None = None,
+            max_frame_size: int | None = DEFAULT_MAX_FRAME_SIZE
+    ) -> None:
+        """Initialise the broker.
+
+        Args:
+            passwords (Mapping[str, str] | None, optional): If set, clients
+                must authenticate with one of these user names and passwords.
+                Defaults to None.
+            entitlements (Mapping[str, Collection[int]] | None, optional): If
+                set, a client only receives packets whose entitlements are all
+                held by its user. Defaults to None.
+            max_frame_size (int | None, optional): The size in bytes above
+                which a frame is rejected, or None for no limit. Defaults to
+                DEFAULT_MAX_FRAME_SIZE.
+        """
+        self._passwords = passwords
+        self._entitlements = entitlements
+        self._max_frame_size = max_frame_size
+        self._connections: dict[str, _Connection] = {}
+        self._subscriptions = PatternIndex[_Connection]()
+        self._notifications = PatternIndex[_Connection]()
+        self._server: Server | None = None
+        self._websocket_server: Any = None
+        self._handlers: set[Task[None]] = set()
+        self._string_cache = StringCache()
+
+    @property
+    def port(self) -> int | None:
+        """The port of the TCP server, once started"""
+        if self._server is None:
+            return None
+        return self._server.sockets[0].getsockname()[1]
+
+    @property
+    def websocket_port(self) -> int | None:
+        """The port of the websocket server, once started"""
+        if self._websocket_server is None:
+            return None
+        return next(iter(self._websocket_server.sockets)).getsockname()[1]
+
+    @property
+    def client_count(self) -> int:
+        """The number of connected clients"""
+        return len(self._connections)
+
+    async def start(
+            self,
+            host: str = 'localhost',
+            port: int | None = 8558,
+            *,
+            websocket_port: int | None = None,
+            ssl: SSLContext | None = None
+    ) -> None:
+        """Start listening.
+
+        Args:
+            host (str, optional): The interface. Defaults to 'localhost'.
+            port (int | None, optional): The TCP port, zero for any free
+                port, or None for no TCP server. Defaults to 8558.
+            websocket_port (int | None, optional): The websocket port, zero
+                for any free port, or None for no websocket server. Defaults
+                to None.
+            ssl (SSLContext | None, optional): An optional server ssl context.
+                Defaults to None.
+
+        Raises:
+            ImportError: If a websocket port is given and the websockets
+                package is not installed.
+        """
+        if websocket_port is not None:
+            _require_websockets()
+        if port is not None:
+            self._server = await asyncio.start_server(
+                self._handle_socket,
+                host,
+                port,
+                ssl=ssl
+            )
+        if websocket_port is not None:
+            self._websocket_server = await serve(
+                self._handle_websocket,
+                host,
+                websocket_port,
+                ssl=ssl,
+                max_size=self._max_frame_size
+            )
+
+    async def stop(self) -> None:
+        """Stop listening, and disconnect the clients"""
+        for server in (self._server, self._websocket_server):
+            if server is not None:
+                server.close()
+        for task in list(self._handlers):
+            task.cancel()
+        await asyncio.gather(*self._handlers, return_exceptions=True)
+        for server in (self._server, self._websocket_server):
+            if server is not None:
+                await server.wait_closed()
+        self._server = self._websocket_server = None
+
+    async def __aenter__(self) -> Broker:
+        return self
+
+    async def __aexit__(self, *args: Any) -> None:
+        await self.stop()
+
+    async def _handle_socket(self, reader: StreamReader, writer: StreamWriter) -> None:
+        peername = writer.get_extra_info('peername')
+        stream = SocketStream(reader, writer, max_frame_size=self._max_frame_size)
+        await self._handle(stream, peername[0] if peername else 'localhost')
+
+    async def _handle_websocket(self, websocket: ServerConnection) -> None:
+        await self._handle(_WebsocketServerStream(websocket), websocket.remote_address[0])
+
+    async def _handle(self, stream: MessageStream, host: str) -> None:
+        task = asyncio.current_task()
+        assert task is not None
+        self._handlers.add(task)
+        connection = _Connection(stream, host)
+        try:
+            if await self._authenticate(connection):
+                self._connections[connection.client_id] = connection
+                connection.writer = asyncio.create_task(connection.write_queued())
+                await self._read(connection)
+        except (EOFError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except asyncio.CancelledError:
+            raise
+        except:  # pylint: disable=bare-except
+            LOG.exception("Client %s failed", connection.client_id)
+        finally:
+            self._handlers.discard(task)
+            self._disconnect(connection)
+            try:
+                await stream.close()
+            except:  # pylint: disable=bare-except
+                pass
+
+    async def _authenticate(self, connection: _Connection) -> bool:
+        request = Message.deserialize(await connection.stream.read())
+        if not isinstance(request, AuthenticationRequest):
+            LOG.warning("expected an authentication request")
+            return False
+        if request.method == 'basic':
+            user, _, password = b64decode(request.credentials).decode('utf-8').partition(':')
+            if self._passwords is not None and self._passwords.get(user) != password:
+                LOG.info("authentication failed for %s", user)
+                return False
+            connection.user = user
+        elif self._passwords is not None:
+            LOG.info("authentication required")
+            return False
+        if self._entitlements is not None:
+            connection.entitlements = frozenset(self._entitlements.get(connection.user, ()))
+        await connection.stream.write(AuthenticationResponse(connection.client_id).serialize())
+        return True
+
+    async def _read(self, connection: _Connection) -> None:
+        while True:
+            buf = await connection.stream.read()
+            message = Message.read(
+                DataReader(buf, copy_data=False, string_cache=self._string_cache)
+            )
+            if isinstance(message, MulticastData):
+                self._forward_multicast(connection, message)
+            elif isinstance(message, UnicastData):
+                self._forward_unicast(connection, message)
+            elif isinstance(message, SubscriptionRequest):
+                self._subscribe(connection, message)
+            elif isinstance(message, NotificationRequest):
+                self._notify(connection, message)
+            else:
+                raise ValueError(f"unexpected message {message.message_type}")
+
+    def _disconnect(self, connection: _Connection) -> None:
+        if self._connections.pop(connection.client_id, None) is None:
+            return
+        if connection.writer is not None:
+            connection.writer.cancel()
+        for pattern, _ in self._notifications.patterns(connection):
+            self._notifications.remove(pattern, connection, remove_all=True)
+        for topic, _ in self._subscriptions.patterns(connection):
+            self._subscriptions.remove(topic, connection, remove_all=True)
+            self._forward_subscription(connection, topic, 0)
+
+    def _subscribe(self, connection: _Connection, message: SubscriptionRequest) -> None:
+        if message.is_add:
+            count = self._subscriptions.add(message.topic, connection)
+        else:
+            count = self._subscriptions.remove(message.topic, connection)
+        self._forward_subscription(connection, message.topic, count)
+
+    def _forward_subscription(self, connection: _Connection, topic: str, count: int) -> None:
+        notifiers = self._notifications.match(topic)
+        if not notifiers:
+            return
+        buf = ForwardedSubscriptionRequest(
+            connection.host,
+            connection.user,
+            connection.client_id,
+            topic,
+            count
+        ).serialize()
+        for notifier in notifiers:
+            notifier.queue.put_nowait(buf)
+
+    def _notify(self, connection: _Connection, message: NotificationRequest) -> None:
+        if not message.is_add:
+            self._notifications.remove(message.topic_pattern, connection)
+            return
+        if self._notifications.add(message.topic_pattern, connection) > 1:
+            return
+        for topic, subscribers in self._subscriptions.items():
+            if not topic_matches(message.topic_pattern, topic):
+                continue
+            for subscriber, count in subscribers.items():
+                connection.queue.put_nowait(ForwardedSubscriptionRequest(
+                    subscriber.host,
+                    subscriber.user,
+                    subscriber.client_id,
+                    topic,
+                    count
+                ).serialize())
+
+    def _entitled_packets(
+            self,
+            connection: _Connection,
+            data_packets: list[DataPacket]
+    ) -> tuple[int, ...] | None:
+        if connection.entitlements is None:
+            return None
+        return tuple(
+            index
+            for index, packet in enumerate(data_packets)
+            if packet.entitlements <= connection.entitlements
+        )
+
+    def _forward_multicast(self, sender: _Connection, message: MulticastData) -> None:
+        subscribers = self._subscriptions.match(decode_name(message.topic))
+        if not subscribers:
+            return
+        bufs: dict[tuple[int, ...] | None, bytes | bytearray | None] = {}
+        for subscriber in subscribers:
+            key = self._entitled_packets(subscriber, message.data_packets)
+            if key not in bufs:
+                data_packets = (
+                    message.data_packets
+                    if key is None
+                    else [message.data_packets[index] for index in key]
+                )
+                bufs[key] = ForwardedMulticastData(
+                    sender.host,
+                    sender.user,
+                    message.topic,
+                    data_packets
+                ).serialize_buffer() if data_packets else None
+            buf = bufs[key]
+            if buf is not None:
+                subscriber.queue.put_nowait(buf)
+
+    def _forward_unicast(self, sender: _Connection, message: UnicastData) -> None:
+        recipient = self._connections.get(decode_name(message.client_id))
+        if recipient is None:
+            return
+        key = self._entitled_packets(recipient, message.data_packets)
+        data_packets = (
+            message.data_packets
+            if key is None
+            else [message.data_packets[index] for index in key]
+        )
+        if data_packets:
+            recipient.queue.put_nowait(ForwardedUnicastData(
+                sender.host,
+                sender.user,
+                sender.client_id,
+                message.topic,
+                data_packets
+            ).serialize_buffer())
+
+
+async def _serve(args: argparse.Namespace) -> None:
+    broker = Broker()
+    await broker.start(args.host, args.port, websocket_port=args.websocket_port)
+    LOG.info("listening on %s:%s", args.host, broker.port)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await broker.stop()
+
+
+def main() -> None:
+    """Run the broker"""
+    parser = argparse.ArgumentParser(description="A stand-in squawkbus broker")
+    parser.add_argument('--host', default='localhost')
+    parser.add_argument('--port', type=int, default=8558)
+    parser.add_argument('--websocket-port', type=int, default=None)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    try:
+        asyncio.run(_serve(args))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
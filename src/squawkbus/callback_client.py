@@ -3,11 +3,14 @@
 from __future__ import annotations
 
 from asyncio import Queue
+from time import perf_counter_ns
 from typing import Callable, Awaitable
 
 from .base_client import BaseClient
+from .client_options import ClientOptions
 from .data_packet import DataPacket
-from .messages import Message
+from .messages import ForwardedSubscriptionRequest, Message
+from .tracing import TraceStage
 from .types import MessageStream
 
 
@@ -15,10 +18,18 @@ DataHandler = Callable[
     [str, str, str, list[DataPacket]],
     Awaitable[None]
 ]
+BytesDataHandler = Callable[
+    [bytes, bytes, bytes, list[DataPacket]],
+    Awaitable[None]
+]
 NotificationHandler = Callable[
     [str, str, str, str, int],
     Awaitable[None]
 ]
+NotificationBatchHandler = Callable[
+    [list[ForwardedSubscriptionRequest]],
+    Awaitable[None]
+]
 ClosedHandler = Callable[
     [bool],
     Awaitable[None]
@@ -32,11 +43,18 @@ class CallbackClient(BaseClient):
             self,
             stream: MessageStream,
             *,
-            credentials: tuple[str, str] | None = None
+            credentials: tuple[str, str] | None = None,
+            options: ClientOptions | None = None
     ) -> None:
-        super().__init__(stream, credentials=credentials)
+        super().__init__(
+            stream,
+            credentials=credentials,
+            options=options
+        )
         self._data_handlers: list[DataHandler] = []
+        self._bytes_data_handlers: list[BytesDataHandler] = []
         self._notification_handlers: list[NotificationHandler] = []
+        self._notification_batch_handlers: list[NotificationBatchHandler] = []
         self._closed_handlers: list[ClosedHandler] = []
         self._read_queue: Queue[Message] = Queue()
         self._write_queue: Queue[Message] = Queue()
@@ -50,6 +68,59 @@ class CallbackClient(BaseClient):
         """
         return self._data_handlers
 
+    @property
+    def bytes_data_handlers(self) -> list[BytesDataHandler]:
+        """The list of handlers called when data is received in bytes mode.
+
+        The handlers are called with the user, host and topic as the encoded
+        bytes. Data handlers are also called, with the names decoded, if
+        there are any.
+
+        Returns:
+            list[BytesDataHandler]: The list of handlers
+        """
+        return self._bytes_data_handlers
+
+    async def add_data_handler(
+            self,
+            handler: DataHandler,
+            *,
+            replay: bool = False
+    ) -> None:
+        """Add a data handler.
+
+        When replaying, the cached values are passed to the handler before it
+        is added, so it never receives new data ahead of an older value.
+        Values cached while the replay awaits the handler are replayed in
+        turn, and the handler is added once a snapshot of the cache has
+        nothing left to replay, with no await in between.
+
+        Args:
+            handler (DataHandler): The handler.
+            replay (bool, optional): If true, and the client has a last value
+                cache, the handler is called with each cached value before
+                it receives new data. Defaults to False.
+        """
+        if replay and self._last_value_cache is not None:
+            replayed: dict[str, list[DataPacket]] = {}
+            while True:
+                pending = [
+                    (topic, entry)
+                    for topic, entry in self._last_value_cache.items()
+                    if replayed.get(topic) is not entry.data_packets
+                ]
+                if not pending:
+                    break
+                for topic, entry in pending:
+                    replayed[topic] = entry.data_packets
+                    await handler(
+                        entry.user,
+                        entry.host,
+                        topic,
+                        entry.data_packets
+                    )
+        self._data_handlers.append(handler)
+
     @property
     def notification_handlers(self) -> list[NotificationHandler]:
         """The list of handlers called when a notification is received
@@ -59,6 +130,15 @@ class CallbackClient(BaseClient):
         """
         return self._notification_handlers
 
+    @property
+    def notification_batch_handlers(self) -> list[NotificationBatchHandler]:
+        """The list of handlers called with batches of notifications.
+
+        Returns:
+            list[NotificationBatchHandler]: The list of handlers
+        """
+        return self._notification_batch_handlers
+
     @property
     def closed_handlers(self) -> list[ClosedHandler]:
         """The list of handlers called when a connection is closed
@@ -75,13 +155,67 @@ class CallbackClient(BaseClient):
             topic: str,
             data_packets: list[DataPacket]
     ) -> None:
-        for handler in self._data_handlers:
-            await handler(
+        await self._call_data_handlers(
+            self._data_handlers,
+            user,
+            host,
+            topic,
+            data_packets
+        )
+
+    async def on_bytes_data(
+            self,
+            user: bytes,
+            host: bytes,
+            topic: bytes,
+            data_packets: list[DataPacket]
+    ) -> None:
+        await self._call_data_handlers(
+            self._bytes_data_handlers,
+            user,
+            host,
+            topic,
+            data_packets
+        )
+        if self._data_handlers:
+            await super().on_bytes_data(user, host, topic, data_packets)
+
+    async def _call_data_handlers[T: (str, bytes)](
+            self,
+            handlers: list[Callable[[T, T, T, list[DataPacket]], Awaitable[None]]],
+            user: T,
+            host: T,
+            topic: T,
+            data_packets: list[DataPacket]
+    ) -> None:
+        tracer, message, watchdog = self._tracer, self._dispatching, self._watchdog
+        if message is None:
+            tracer = None
+        if tracer is None and watchdog is None:
+            for handler in handlers:
+                await handler(
+                    user,
+                    host,
+                    topic,
+                    data_packets,
+                )
+            return
+
+        for handler in handlers:
+            if tracer is not None and message is not None:
+                tracer(TraceStage.HANDLER_STARTED, message, perf_counter_ns())
+            awaitable = handler(
                 user,
                 host,
                 topic,
                 data_packets,
             )
+            if watchdog is None:
+                await awaitable
+            else:
+                await watchdog.time_handler(handler, topic, awaitable)
+            if tracer is not None and message is not None:
+                tracer(TraceStage.HANDLER_FINISHED, message, perf_counter_ns())
 
     async def on_forwarded_subscription_request(
             self,
@@ -91,15 +225,36 @@ class CallbackClient(BaseClient):
             topic: str,
             count: int
     ) -> None:
+        watchdog = self._watchdog
         for handler in self._notification_handlers:
-            await handler(
+            awaitable = handler(
                 client_id,
                 user,
                 host,
                 topic,
                 count
             )
+            if watchdog is None:
+                await awaitable
+            else:
+                await watchdog.time_handler(handler, topic, awaitable)
+
+    async def on_forwarded_subscription_requests(
+            self,
+            messages: list[ForwardedSubscriptionRequest]
+    ) -> None:
+        watchdog = self._watchdog
+        for handler in self._notification_batch_handlers:
+            if watchdog is None:
+                await handler(messages)
+            else:
+                await watchdog.time_handler(handler, '', handler(messages))
+        await super().on_forwarded_subscription_requests(messages)
 
     async def on_closed(self, is_faulted: bool) -> None:
+        watchdog = self._watchdog
         for handler in self._closed_handlers:
-            await handler(is_faulted)
+            if watchdog is None:
+                await handler(is_faulted)
+            else:
+                await watchdog.time_handler(handler, '', handler(is_faulted))
@@ -0,0 +1,595 @@
+"""Chunking of large payloads"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Event, Task
+from collections import deque
+import logging
+import os
+import time
+from typing import TYPE_CHECKING, Any, AsyncIterator, BinaryIO, Callable, Coroutine
+
+from .data_packet import DataPacket
+
+if TYPE_CHECKING:
+    from .callback_client import DataHandler
+
+LOG = logging.getLogger(__name__)
+
+CHUNK_ID_HEADER = b'x-chunk-id'
+CHUNK_INDEX_HEADER = b'x-chunk-index'
+CHUNK_COUNT_HEADER = b'x-chunk-count'
+CHUNK_OFFSET_HEADER = b'x-chunk-offset'
+CHUNK_TOTAL_SIZE_HEADER = b'x-chunk-total-size'
+
+DEFAULT_CHUNK_SIZE = 1024 * 1024 - 64 * 1024
+"""The default size of the data of a chunk, which leaves room for the headers
+and the message within the 1MiB frames websocket servers commonly accept"""
+
+CHUNK_HEADERS = frozenset((
+    CHUNK_ID_HEADER,
+    CHUNK_INDEX_HEADER,
+    CHUNK_COUNT_HEADER,
+    CHUNK_OFFSET_HEADER,
+    CHUNK_TOTAL_SIZE_HEADER,
+))
+
+
+def is_chunk(packet: DataPacket) -> bool:
+    """Check if a packet is a chunk of a larger packet.
+
+    Args:
+        packet (DataPacket): The data packet.
+
+    Returns:
+        bool: True if the packet is a chunk.
+    """
+    return CHUNK_ID_HEADER in packet.headers
+
+
+def split_data_packet(
+        packet: DataPacket,
+        chunk_size: int,
+        chunk_id: bytes | None = None
+) -> list[DataPacket]:
+    """Split a packet into chunks.
+
+    Each chunk has the entitlements and headers of the original packet, with
+    headers identifying the transfer and the position of the chunk. The data
+    of the chunks are views over the payload of the packet, so no data is
+    copied.
+
+    Args:
+        packet (DataPacket): The packet to split.
+        chunk_size (int): The maximum size of the data in each chunk.
+        chunk_id (bytes | None, optional): The transfer identifier. Defaults
+            to a random identifier.
+
+    Returns:
+        list[DataPacket]: The chunks, or the packet itself if it is not larger
+            than the chunk size.
+    """
+    if chunk_size <= 0:
+        raise ValueError("chunk_size must be positive")
+
+    payload = memoryview(packet.payload).cast('B')
+    total_size = len(payload)
+    if total_size <= chunk_size:
+        return [packet]
+
+    if chunk_id is None:
+        chunk_id = os.urandom(8).hex().encode('ascii')
+    count = (total_size + chunk_size - 1) // chunk_size
+    count_header = str(count).encode('ascii')
+    total_size_header = str(total_size).encode('ascii')
+
+    chunks: list[DataPacket] = []
+    for index, offset in enumerate(range(0, total_size, chunk_size)):
+        headers = dict(packet.headers)
+        headers[CHUNK_ID_HEADER] = chunk_id
+        headers[CHUNK_INDEX_HEADER] = str(index).encode('ascii')
+        headers[CHUNK_COUNT_HEADER] = count_header
+        headers[CHUNK_OFFSET_HEADER] = str(offset).encode('ascii')
+        headers[CHUNK_TOTAL_SIZE_HEADER] = total_size_header
+        chunks.append(
+            DataPacket(
+                packet.entitlements,
+                headers,
+                payload[offset:offset + chunk_size]
+            )
+        )
+    return chunks
+
+
+def _original_headers(headers: dict[bytes, bytes]) -> dict[bytes, bytes]:
+    return {
+        key: value
+        for key, value in headers.items()
+        if key not in CHUNK_HEADERS
+    }
+
+
+class _ChunkPosition:
+
+    def __init__(self, packet: DataPacket) -> None:
+        headers = packet.headers
+        self.index = int(headers[CHUNK_INDEX_HEADER])
+        self.count = int(headers[CHUNK_COUNT_HEADER])
+        self.offset = int(headers[CHUNK_OFFSET_HEADER])
+        self.total_size = int(headers[CHUNK_TOTAL_SIZE_HEADER])
+        size = len(packet.payload)
+        if not (
+                0 <= self.index < self.count and
+                0 <= self.offset and
+                self.offset + size <= self.total_size
+        ):
+            raise ValueError(
+                f"chunk {self.index} of {self.count} at {self.offset} "
+                f"with {size} bytes is outside the {self.total_size} bytes"
+            )
+
+
+def _chunk_position(topic: str, packet: DataPacket) -> _ChunkPosition | None:
+    try:
+        return _ChunkPosition(packet)
+    except (KeyError, ValueError) as error:
+        LOG.warning("ignoring invalid chunk on %s: %s", topic, error)
+        return None
+
+
+class _Transfer:
+
+    def __init__(self, packet: DataPacket, position: _ChunkPosition, now: float) -> None:
+        self.entitlements = packet.entitlements
+        self.headers = _original_headers(packet.headers)
+        self.count = position.count
+        self.buf = bytearray(position.total_size)
+        self.received = bytearray(position.count)
+        self.remaining = position.count
+        self.updated = now
+
+
+class ChunkAssembler:
+    """Reassemble chunked packets into preallocated buffers.
+
+    The total size of incomplete transfers is limited. When a new transfer
+    would exceed the limit, the incomplete transfers which have waited
+    longest for a chunk are dropped to make room. A transfer larger than the
+    limit is dropped, and its chunks are ignored. Incomplete transfers which
+    receive no chunks for the maximum age are dropped, so a subscriber which
+    joins part way through a transfer does not hold it forever.
+
+    Chunks with a position outside the transfer are ignored, as are repeated
+    chunks.
+    """
+
+    def __init__(
+            self,
+            max_outstanding_bytes: int = 256 * 1024 * 1024,
+            max_age: float = 60.0
+    ) -> None:
+        """Initialise the assembler.
+
+        Args:
+            max_outstanding_bytes (int, optional): The maximum number of bytes
+                held by incomplete transfers. Defaults to 256 MB.
+            max_age (float, optional): The number of seconds an incomplete
+                transfer is kept without receiving a chunk. Defaults to 60.0.
+        """
+        self.max_outstanding_bytes = max_outstanding_bytes
+        self.max_age = max_age
+        self._outstanding_bytes = 0
+        # Ordered from the least to the most recently updated.
+        self._transfers: dict[tuple[str, bytes], _Transfer] = {}
+        self._dropped: dict[tuple[str, bytes], float] = {}
+
+    @property
+    def outstanding_bytes(self) -> int:
+        """The number of bytes held by incomplete transfers"""
+        return self._outstanding_bytes
+
+    def add(self, topic: str, packet: DataPacket) -> DataPacket | None:
+        """Add a received packet.
+
+        Args:
+            topic (str): The topic name.
+            packet (DataPacket): The packet.
+
+        Returns:
+            DataPacket | None: The packet if it was not a chunk, the
+                reassembled packet if this was the last chunk, otherwise None.
+        """
+        chunk_id = packet.headers.get(CHUNK_ID_HEADER)
+        if chunk_id is None:
+            return packet
+
+        now = time.monotonic()
+        self._expire(now)
+
+        key = (topic, chunk_id)
+        if key in self._dropped:
+            # Keep ignoring the transfer while its chunks arrive.
+            del self._dropped[key]
+            self._dropped[key] = now
+            return None
+
+        position = _chunk_position(topic, packet)
+        if position is None:
+            return None
+
+        transfer = self._transfers.pop(key, None)
+        if transfer is None:
+            if not self._make_room(topic, position.total_size, now):
+                self._dropped[key] = now
+                return None
+            transfer = _Transfer(packet, position, now)
+            self._outstanding_bytes += len(transfer.buf)
+        self._transfers[key] = transfer
+        transfer.updated = now
+
+        if position.count != transfer.count or position.total_size != len(transfer.buf):
+            LOG.warning("ignoring chunk on %s which does not match its transfer", topic)
+            return None
+        if transfer.received[position.index]:
+            LOG.debug("ignoring repeated chunk %s on %s", position.index, topic)
+            return None
+
+        payload = packet.payload
+        transfer.buf[position.offset:position.offset + len(payload)] = payload
+        transfer.received[position.index] = 1
+        transfer.remaining -= 1
+        if transfer.remaining > 0:
+            return None
+
+        del self._transfers[key]
+        self._outstanding_bytes -= len(transfer.buf)
+        return DataPacket(
+            transfer.entitlements,
+            transfer.headers,
+            memoryview(transfer.buf).toreadonly()
+        )
+
+    def _make_room(self, topic: str, total_size: int, now: float) -> bool:
+        if total_size > self.max_outstanding_bytes:
+            LOG.warning(
+                "dropping transfer of %s bytes on %s: larger than the outstanding limit",
+                total_size,
+                topic
+            )
+            return False
+        while self._outstanding_bytes + total_size > self.max_outstanding_bytes:
+            key = next(iter(self._transfers))
+            LOG.warning(
+                "dropping incomplete transfer on %s: outstanding limit reached",
+                key[0]
+            )
+            self._drop(key, now)
+        return True
+
+    def _expire(self, now: float) -> None:
+        expired = now - self.max_age
+        while self._transfers:
+            key, transfer = next(iter(self._transfers.items()))
+            if transfer.updated > expired:
+                break
+            LOG.warning("dropping incomplete transfer on %s: expired", key[0])
+            self._drop(key, now)
+        while self._dropped:
+            key, updated = next(iter(self._dropped.items()))
+            if updated > expired:
+                break
+            del self._dropped[key]
+
+    def _drop(self, key: tuple[str, bytes], now: float) -> None:
+        self._outstanding_bytes -= len(self._transfers.pop(key).buf)
+        self._dropped[key] = now
+
+    def discard(self, topic: str) -> None:
+        """Discard the incomplete transfers on a topic.
+
+        Args:
+            topic (str): The topic name.
+        """
+        for key in [key for key in self._transfers if key[0] == topic]:
+            self._outstanding_bytes -= len(self._transfers.pop(key).buf)
+
+    def wrap(self, handler: DataHandler) -> DataHandler:
+        """Wrap a data handler so it receives reassembled packets.
+
+        Messages which only hold incomplete chunks are not passed to the
+        handler.
+
+        Args:
+            handler (DataHandler): The handler.
+
+        Returns:
+            DataHandler: The wrapped handler.
+        """
+        async def on_data(
+                user: str,
+                host: str,
+                topic: str,
+                data_packets: list[DataPacket]
+        ) -> None:
+            packets = [
+                packet
+                for packet in (self.add(topic, packet) for packet in data_packets)
+                if packet is not None
+            ]
+            if packets:
+                await handler(user, host, topic, packets)
+
+        return on_data
+
+
+class ChunkStream:
+    """An async iterator over the chunks of a transfer.
+
+    Chunks are buffered until they are consumed, up to a limit. When the
+    limit is reached the producer waits, which holds up the client until the
+    consumer catches up. If the consumer stops reading, the stream is
+    abandoned, and further chunks are discarded rather than waiting. If no
+    chunk arrives for the maximum age, the consumer receives a TimeoutError
+    rather than waiting forever.
+    """
+
+    def __init__(
+            self,
+            topic: str,
+            headers: dict[bytes, bytes],
+            total_size: int,
+            max_buffered_bytes: int,
+            max_age: float | None = None
+    ) -> None:
+        self.topic = topic
+        self.headers = headers
+        self.total_size = total_size
+        self._max_buffered_bytes = max_buffered_bytes
+        self._max_age = max_age
+        self._buffered_bytes = 0
+        self._chunks: deque[bytes | memoryview] = deque()
+        self._is_closed = False
+        self._is_abandoned = False
+        self._error: Exception | None = None
+        self._readable = Event()
+        self._writable = Event()
+
+    @property
+    def is_abandoned(self) -> bool:
+        """True if the consumer has stopped reading"""
+        return self._is_abandoned
+
+    async def put(self, data: bytes | memoryview) -> bool:
+        """Add a chunk, waiting if too many bytes are buffered.
+
+        Args:
+            data (bytes | memoryview): The chunk data.
+
+        Returns:
+            bool: False if the stream was abandoned, and the chunk discarded.
+        """
+        while not self._is_abandoned and not (
+                self._buffered_bytes == 0 or
+                self._buffered_bytes + len(data) <= self._max_buffered_bytes
+        ):
+            self._writable.clear()
+            await self._writable.wait()
+        if self._is_abandoned:
+            return False
+        self._chunks.append(data)
+        self._buffered_bytes += len(data)
+        self._readable.set()
+        return True
+
+    async def close(self, error: Exception | None = None) -> None:
+        """Mark the end of the transfer.
+
+        Args:
+            error (Exception | None, optional): If set, the transfer failed,
+                and the consumer receives the error rather than the
+                remaining chunks. Defaults to None.
+        """
+        self._is_closed = True
+        if error is not None:
+            self._error = error
+            self._chunks.clear()
+            self._buffered_bytes = 0
+        self._readable.set()
+
+    def abandon(self) -> None:
+        """Stop buffering, as the consumer has stopped reading"""
+        self._is_abandoned = True
+        self._chunks.clear()
+        self._buffered_bytes = 0
+        self._writable.set()
+
+    def __aiter__(self) -> AsyncIterator[bytes | memoryview]:
+        return self
+
+    async def __anext__(self) -> bytes | memoryview:
+        while not self._chunks and not self._is_closed:
+            self._readable.clear()
+            try:
+                await asyncio.wait_for(self._readable.wait(), self._max_age)
+            except TimeoutError:
+                raise TimeoutError(
+                    f"no chunk received on {self.topic} for {self._max_age}s"
+                ) from None
+        if not self._chunks:
+            if self._error is not None:
+                raise self._error
+            raise StopAsyncIteration
+        data = self._chunks.popleft()
+        self._buffered_bytes -= len(data)
+        self._writable.set()
+        return data
+
+    async def write_to(self, file: BinaryIO) -> int:
+        """Write the chunks to a file as they arrive.
+
+        Args:
+            file (BinaryIO): The file.
+
+        Returns:
+            int: The number of bytes written.
+        """
+        count = 0
+        async for data in self:
+            count += file.write(data)
+        return count
+
+
+StreamHandler = Callable[[ChunkStream], Coroutine[Any, Any, None]]
+
+
+class ChunkStreamer:
+    """Deliver chunked transfers as streams rather than assembling them.
+
+    When the first chunk of a transfer arrives the stream handler is started
+    in a new task with a `ChunkStream`, and the chunks are passed to it in
+    order as they arrive.
+
+    If a chunk is missing or out of order, the transfer is discarded, and the
+    stream raises a `ValueError` to the handler. If the handler returns or
+    fails before reading the whole stream, the rest of the transfer is
+    discarded. Transfers which receive no chunks for the maximum age are
+    dropped, and the stream raises a `TimeoutError` to the handler.
+    """
+
+    def __init__(
+            self,
+            on_stream: StreamHandler,
+            max_buffered_bytes: int = 16 * 1024 * 1024,
+            max_age: float = 60.0
+    ) -> None:
+        """Initialise the streamer.
+
+        Args:
+            on_stream (StreamHandler): Called with the stream of each transfer.
+            max_buffered_bytes (int, optional): The maximum number of bytes
+                buffered for each stream. Defaults to 16 MB.
+            max_age (float, optional): The number of seconds an incomplete
+                transfer is kept without receiving a chunk. Defaults to 60.0.
+        """
+        self._on_stream = on_stream
+        self._max_buffered_bytes = max_buffered_bytes
+        self.max_age = max_age
+        # The stream, the next chunk index and the time of the last chunk,
+        # ordered from the least to the most recently updated.
+        self._streams: dict[tuple[str, bytes], tuple[ChunkStream, int, float]] = {}
+        self._tasks: set[Task[None]] = set()
+
+    async def add(self, topic: str, packet: DataPacket) -> DataPacket | None:
+        """Add a received packet.
+
+        Args:
+            topic (str): The topic name.
+            packet (DataPacket): The packet.
+
+        Returns:
+            DataPacket | None: The packet if it was not a chunk, otherwise
+                None.
+        """
+        chunk_id = packet.headers.get(CHUNK_ID_HEADER)
+        if chunk_id is None:
+            return packet
+
+        await self._expire(time.monotonic())
+
+        position = _chunk_position(topic, packet)
+        if position is None:
+            return None
+
+        key = (topic, chunk_id)
+        if position.index == 0:
+            previous = self._streams.pop(key, None)
+            if previous is not None:
+                await previous[0].close(ValueError(f"transfer restarted on {topic}"))
+            stream = ChunkStream(
+                topic,
+                _original_headers(packet.headers),
+                position.total_size,
+                self._max_buffered_bytes,
+                self.max_age
+            )
+            self._start(stream)
+        elif key not in self._streams:
+            return None
+        else:
+            stream, expected, _ = self._streams[key]
+            if position.index != expected:
+                LOG.warning(
+                    "discarding transfer on %s: received chunk %s, expected %s",
+                    topic,
+                    position.index,
+                    expected
+                )
+                del self._streams[key]
+                await stream.close(
+                    ValueError(f"chunk {position.index} received out of order on {topic}")
+                )
+                return None
+
+        if not await stream.put(packet.payload):
+            LOG.warning("discarding transfer on %s: the stream handler has finished", topic)
+            self._streams.pop(key, None)
+            return None
+        self._streams.pop(key, None)
+        if position.index + 1 == position.count:
+            await stream.close()
+        else:
+            self._streams[key] = (stream, position.index + 1, time.monotonic())
+        return None
+
+    async def _expire(self, now: float) -> None:
+        expired = now - self.max_age
+        while self._streams:
+            key, (stream, _, updated) = next(iter(self._streams.items()))
+            if updated > expired:
+                break
+            LOG.warning("discarding incomplete transfer on %s: expired", key[0])
+            del self._streams[key]
+            await stream.close(TimeoutError(f"the transfer on {key[0]} expired"))
+
+    def _start(self, stream: ChunkStream) -> None:
+        task = asyncio.create_task(self._on_stream(stream))
+        self._tasks.add(task)
+
+        def on_done(task: Task[None]) -> None:
+            self._tasks.discard(task)
+            stream.abandon()
+            if not task.cancelled() and task.exception() is not None:
+                LOG.error(
+                    "stream handler failed on %s",
+                    stream.topic,
+                    exc_info=task.exception()
+                )
+
+        task.add_done_callback(on_done)
+
+    def wrap(self, handler: DataHandler) -> DataHandler:
+        """Wrap a data handler so chunks are streamed rather than passed on.
+
+        Args:
+            handler (DataHandler): The handler for packets which are not
+                chunks.
+
+        Returns:
+            DataHandler: The wrapped handler.
+        """
+        async def on_data(
+                user: str,
+                host: str,
+                topic: str,
+                data_packets: list[DataPacket]
+        ) -> None:
+            packets: list[DataPacket] = []
+            for packet in data_packets:
+                result = await self.add(topic, packet)
+                if result is not None:
+                    packets.append(result)
+            if packets:
+                await handler(user, host, topic, packets)
+
+        return on_data
@@ -0,0 +1,58 @@
+"""Client options"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+from .last_value_cache import LastValueCache
+from .metrics import ClientMetrics
+from .payload_compression import DEFAULT_MAX_DECOMPRESSED_SIZE, PayloadCompression
+from .socket_stream import DEFAULT_MAX_FRAME_SIZE
+from .tracing import Tracer
+from .watchdog import Watchdog
+
+
+@dataclass(kw_only=True)
+class ClientOptions:
+    """The optional features of a client.
+
+    The options are passed unchanged from the `create` methods of the clients
+    to the base client, so a feature is added in one place.
+    """
+    last_value_cache: LastValueCache | None = None
+    """An optional cache of the last data received on each topic"""
+    track_interest: bool = False
+    """If true the subscribers to each topic are tracked from notifications"""
+    suppress_uninterested: bool = False
+    """If true interest is tracked, and data published to topics without
+    subscribers is discarded before it is encoded. Data sent to a client is
+    never discarded"""
+    notification_batch_window: float | None = None
+    """If set, forwarded subscription requests received within this many
+    seconds are netted and delivered as a batch"""
+    compression: PayloadCompression | None = None
+    """If set, the data of published packets above the size threshold is
+    compressed"""
+    max_decompressed_size: int | None = DEFAULT_MAX_DECOMPRESSED_SIZE
+    """The size in bytes above which the decompressed data of a received
+    packet is rejected, or None for no limit"""
+    copy_data: bool = True
+    """If false the data of received packets is a read-only memoryview over
+    the received frame, rather than a copy"""
+    bytes_mode: bool = False
+    """If true the topics, hosts, users and client identifiers of received
+    data are the encoded bytes rather than strings, and are passed to the
+    bytes data handlers"""
+    metrics: ClientMetrics | None = None
+    """If set, the traffic and timings of the client are recorded"""
+    tracer: Tracer | None = None
+    """If set, called with the time each message reaches each stage of the
+    read and write pipelines"""
+    watchdog: Watchdog | None = None
+    """If set, handler calls are timed, and slow calls reported"""
+    max_frame_size: int | None = DEFAULT_MAX_FRAME_SIZE
+    """The size in bytes above which a received frame is rejected, or None
+    for no limit"""
+    max_memory_frame_size: int | None = None
+    """The size in bytes above which a received frame is read into a
+    memory-mapped temporary file rather than memory"""
@@ -0,0 +1,333 @@
+"""Columnar sink"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Mapping, Sequence
+
+from .callback_client import CallbackClient
+from .data_packet import DataPacket
+from .record_schema import RecordSchema
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional.
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+LOG = logging.getLogger(__name__)
+
+TIME_COLUMN = 'time'
+TOPIC_COLUMN = 'topic'
+
+PacketDecoder = Callable[[DataPacket], Mapping[str, Any] | Sequence[Any]]
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "numpy is required for the columnar sink: install squawkbus[numpy]"
+        )
+
+
+class ColumnarBatch:
+    """An immutable batch of columns"""
+
+    def __init__(self, columns: dict[str, NDArray], length: int) -> None:
+        """Initialise the batch.
+
+        Args:
+            columns (dict[str, NDArray]): The read-only columns.
+            length (int): The number of rows.
+        """
+        self.columns = columns
+        self.length = length
+
+    def __getitem__(self, name: str) -> NDArray:
+        return self.columns[name]
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __repr__(self) -> str:
+        return f'ColumnarBatch({list(self.columns)!r},{self.length!r})'
+
+
+BatchHandler = Callable[[ColumnarBatch], Awaitable[None]]
+
+
+class ColumnarSink:
+    """Accumulate fields of received data into columns.
+
+    Each data packet received by the client is decoded to its fields, which
+    are appended to preallocated numpy columns alongside the receive time (in
+    nanoseconds since the epoch) and the topic. Packets holding records of
+    the sink's schema are copied straight from the packet data into the
+    columns, without decoding each record. When the row limit is reached, or
+    the interval elapses, the columns are handed to the batch handler and new
+    columns are started.
+
+    A packet which is missing a field, has a null field, or cannot be decoded
+    into the columns, is logged and counted in `skipped`, rather than being
+    appended with made up values.
+    """
+
+    def __init__(
+            self,
+            fields: Sequence[tuple[str, Any]],
+            on_batch: BatchHandler,
+            *,
+            decode: PacketDecoder | None = None,
+            schema: RecordSchema | None = None,
+            max_rows: int | None = 10_000,
+            interval: float | None = None,
+            initial_capacity: int = 1024
+    ) -> None:
+        """Initialise the sink.
+
+        Args:
+            fields (Sequence[tuple[str, Any]]): The names and numpy dtypes of
+                the columns to collect.
+            on_batch (BatchHandler): Called with each completed batch.
+            decode (PacketDecoder | None, optional): Returns the fields of a
+                packet, either as a mapping or as a sequence in the order of
+                the columns. Defaults to the packet value.
+            schema (RecordSchema | None, optional): If set, packets holding
+                records of this schema are copied straight into the columns.
+                The schema must have a field for each column, and text
+                fields are collected as null padded bytes. Defaults to None.
+            max_rows (int | None, optional): The number of rows at which a
+                batch is handed over. A packet of several records can take
+                a batch over the limit. Defaults to 10,000.
+            interval (float | None, optional): The number of seconds after
+                which a batch is handed over. Defaults to None.
+            initial_capacity (int, optional): The initial size of the
+                columns. Defaults to 1024.
+
+        Raises:
+            ImportError: If numpy is not installed.
+            ValueError: If the schema is missing a column.
+        """
+        _require_numpy()
+        self._fields = [(name, np.dtype(dtype)) for name, dtype in fields]
+        self._names = [name for name, _ in self._fields]
+        if schema is not None:
+            missing = set(self._names).difference(name for name, _ in schema.fields)
+            if missing:
+                raise ValueError(f"the schema {schema.name} has no fields {sorted(missing)}")
+        self._schema = schema
+        self._on_batch = on_batch
+        self._decode = decode if decode is not None else _packet_value
+        self.skipped = 0
+        self._max_rows = max_rows
+        self._interval = interval
+        self._capacity = max(initial_capacity, 1)
+        self._length = 0
+        self._columns = self._allocate(self._capacity)
+        self._client: CallbackClient | None = None
+        self._interval_task: Task[None] | None = None
+
+    @property
+    def column_names(self) -> list[str]:
+        """The names of the columns, including the time and topic"""
+        return [TIME_COLUMN, TOPIC_COLUMN, *self._names]
+
+    def __len__(self) -> int:
+        return self._length
+
+    def _allocate(self, capacity: int) -> dict[str, NDArray]:
+        columns: dict[str, NDArray] = {
+            TIME_COLUMN: np.empty(capacity, dtype=np.int64),
+            TOPIC_COLUMN: np.empty(capacity, dtype=object),
+        }
+        for name, dtype in self._fields:
+            columns[name] = np.zeros(capacity, dtype=dtype)
+        return columns
+
+    def _grow(self, rows: int = 1) -> None:
+        capacity = self._capacity * 2
+        while capacity < self._length + rows:
+            capacity *= 2
+        columns = self._allocate(capacity)
+        for name, column in self._columns.items():
+            columns[name][:self._length] = column[:self._length]
+        self._columns = columns
+        self._capacity = capacity
+
+    def attach(self, client: CallbackClient) -> None:
+        """Start receiving data from a client.
+
+        Args:
+            client (CallbackClient): The client.
+        """
+        if self._client is not None:
+            raise RuntimeError("the sink is already attached")
+        self._client = client
+        client.data_handlers.append(self.on_data)
+        if self._interval is not None:
+            self._interval_task = asyncio.create_task(
+                self._flush_periodically(self._interval)
+            )
+
+    async def detach(self) -> None:
+        """Stop receiving data, and hand over any remaining rows"""
+        if self._client is None:
+            return
+        self._client.data_handlers.remove(self.on_data)
+        self._client = None
+        if self._interval_task is not None:
+            self._interval_task.cancel()
+            self._interval_task = None
+        await self.flush()
+
+    async def on_data(
+            self,
+            _user: str,
+            _host: str,
+            topic: str,
+            data_packets: list[DataPacket]
+    ) -> None:
+        """A data handler which appends the packets to the columns.
+
+        Args:
+            _user (str): The user name of the sender.
+            _host (str): The host from which the data was sent.
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+        """
+        received = time.time_ns()
+        for packet in data_packets:
+            try:
+                if self._schema is not None and self._schema.matches(packet):
+                    self.append_records(
+                        topic,
+                        np.frombuffer(packet.data, dtype=self._schema.dtype),
+                        received
+                    )
+                else:
+                    self.append(topic, self._decode(packet), received)
+            except (KeyError, TypeError, ValueError) as error:
+                self.skipped += 1
+                LOG.warning("skipping a packet on %s: %s", topic, error)
+                continue
+            if self._max_rows is not None and self._length >= self._max_rows:
+                await self.flush()
+
+    def append(
+            self,
+            topic: str,
+            values: Mapping[str, Any] | Sequence[Any],
+            received: int | None = None
+    ) -> None:
+        """Append a row.
+
+        Args:
+            topic (str): The topic name.
+            values (Mapping[str, Any] | Sequence[Any]): The fields as a
+                mapping, or a sequence in the order of the columns.
+            received (int | None, optional): The receive time in nanoseconds
+                since the epoch. Defaults to now.
+
+        Raises:
+            KeyError: If a field is missing from a mapping.
+            TypeError: If the values are neither a mapping nor a sequence, or
+                a value has a type its column cannot hold.
+            ValueError: If a sequence does not have a value for each column,
+                a value is null, or a value does not fit its column.
+        """
+        if isinstance(values, Mapping):
+            values = [values[name] for name in self._names]
+        elif not isinstance(values, Sequence) or isinstance(values, (str, bytes)):
+            raise TypeError(f"expected a mapping or sequence of fields, got {type(values).__name__}")
+        elif len(values) != len(self._names):
+            raise ValueError(f"expected {len(self._names)} fields, got {len(values)}")
+        for name, value in zip(self._names, values):
+            if value is None:
+                raise ValueError(f"the field {name} is null")
+
+        if self._length == self._capacity:
+            self._grow()
+
+        row = self._length
+        columns = self._columns
+        for name, value in zip(self._names, values):
+            columns[name][row] = value
+        columns[TIME_COLUMN][row] = time.time_ns() if received is None else received
+        columns[TOPIC_COLUMN][row] = topic
+        self._length += 1
+
+    def append_records(
+            self,
+            topic: str,
+            records: NDArray,
+            received: int | None = None
+    ) -> None:
+        """Append a row for each record of a structured array.
+
+        Each column is copied from the field of the same name in one step.
+
+        Args:
+            topic (str): The topic name.
+            records (NDArray): The records.
+            received (int | None, optional): The receive time in nanoseconds
+                since the epoch. Defaults to now.
+
+        Raises:
+            ValueError: If the records are missing a column.
+        """
+        names = records.dtype.names or ()
+        missing = set(self._names).difference(names)
+        if missing:
+            raise ValueError(f"the records have no fields {sorted(missing)}")
+
+        rows = len(records)
+        if self._length + rows > self._capacity:
+            self._grow(rows)
+
+        start, end = self._length, self._length + rows
+        columns = self._columns
+        for name in self._names:
+            columns[name][start:end] = records[name]
+        columns[TIME_COLUMN][start:end] = time.time_ns() if received is None else received
+        columns[TOPIC_COLUMN][start:end] = topic
+        self._length = end
+
+    def take(self) -> ColumnarBatch:
+        """Take the accumulated rows as a batch, and start new columns.
+
+        Returns:
+            ColumnarBatch: The batch.
+        """
+        length, columns = self._length, self._columns
+        self._columns = self._allocate(self._capacity)
+        self._length = 0
+
+        batch_columns: dict[str, NDArray] = {}
+        for name, column in columns.items():
+            view = column[:length]
+            view.flags.writeable = False
+            batch_columns[name] = view
+        return ColumnarBatch(batch_columns, length)
+
+    async def flush(self) -> None:
+        """Hand over the accumulated rows, if there are any"""
+        if self._length > 0:
+            await self._on_batch(self.take())
+
+    async def _flush_periodically(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await self.flush()
+            except:  # pylint: disable=bare-except
+                LOG.exception("Failed to handle batch")
+
+
+def _packet_value(packet: DataPacket) -> Mapping[str, Any] | Sequence[Any]:
+    return packet.value
@@ -1,5 +1,16 @@
 """DataPacket"""
 
+from typing import Any
+
+from .payload_codecs import DEFAULT_CODECS
+from .payload_compression import (
+    CONTENT_ENCODING_HEADER,
+    PayloadDecompression,
+    decompress,
+)
+
+_UNDECODED = object()
+
 
 class DataPacket:
     """A data packet"""
@@ -8,29 +19,87 @@ class DataPacket:
             self,
             entitlements: set[int],
             headers: dict[bytes, bytes],
-            data: bytes
+            data: bytes | memoryview,
+            *,
+            decompression: PayloadDecompression | None = None
     ) -> None:
         """Initialise a data packet.
 
+        If the headers contain a `content-encoding`, the data is taken to be
+        encoded, and is decoded on first access.
+
+        The data can be any contiguous byte buffer, such as a memoryview over
+        a numpy array, allowing it to be sent without first being copied.
+
         Args:
             entitlements (set[int]): The required packet entitlements.
             headers (dict[bytes, bytes]): The headers.
-            data (bytes): The data.
+            data (bytes | memoryview): The data.
+            decompression (PayloadDecompression | None, optional): The
+                decompression of the receiving client. Defaults to None, to
+                decompress with the default size limit.
         """
         self.entitlements = entitlements
         self.headers = headers
-        self.data = data
+        self._payload = data
+        self._decompression = decompression
+        self._data: bytes | memoryview | None = None
+        self._value: Any = _UNDECODED
+
+    @property
+    def payload(self) -> bytes | memoryview:
+        """The data as it is sent, which may be compressed"""
+        return self._payload
+
+    @property
+    def data(self) -> bytes | memoryview:
+        """The data, decompressed if it has a content encoding.
+
+        Raises:
+            ValueError: If the encoding is unsupported, or the decompressed
+                data exceeds the size limit.
+        """
+        if self._data is None:
+            encoding = self.headers.get(CONTENT_ENCODING_HEADER)
+            if encoding is None:
+                self._data = self._payload
+            elif self._decompression is None:
+                self._data = decompress(encoding, self._payload)
+            else:
+                self._data = self._decompression.decompress(encoding, self._payload)
+        return self._data
+
+    @data.setter
+    def data(self, value: bytes | memoryview) -> None:
+        self.headers.pop(CONTENT_ENCODING_HEADER, None)
+        self._payload = value
+        self._data = None
+        self._value = _UNDECODED
+
+    @property
+    def value(self) -> Any:
+        """The data decoded with the codec for the `content-type` header.
+
+        The data is decoded on first access, and the result is cached, so
+        handlers sharing the packet only decode it once.
+
+        Returns:
+            Any: The decoded value.
+        """
+        if self._value is _UNDECODED:
+            self._value = DEFAULT_CODECS.decode(self.headers, self.data)
+        return self._value
 
     def __str__(self) -> str:
-        return f'{self.entitlements=},{self.headers=},{self.data=}'
+        return f'{self.entitlements=},{self.headers=},{self.payload=}'
 
     def __repr__(self):
-        return f'DataPacket({self.entitlements!r},{self.headers!r},{self.data!r})'
+        return f'DataPacket({self.entitlements!r},{self.headers!r},{self.payload!r})'
 
     def __eq__(self, value):
         return (
             isinstance(value, DataPacket) and
             self.entitlements == value.entitlements and
             self.headers == value.headers and
-            self.data == value.data
+            self.payload == value.payload
         )
@@ -1,18 +1,89 @@
 """DataReader"""
 
+from mmap import mmap
 import struct
+from typing import Callable
 
 from .data_packet import DataPacket
+from .payload_compression import PayloadDecompression
+from .string_cache import StringCache
+from .types import Frame
 
 EMPTY = memoryview(b'')
 
+PacketFilter = Callable[[str | bytes, dict[bytes, bytes]], bool]
+"""A predicate on the topic and headers of a data packet. The topic is bytes
+when the reader has raw strings."""
+
+
+def decode_name(name: str | bytes) -> str:
+    """Decode a name which may have been read as bytes.
+
+    Args:
+        name (str | bytes): The name.
+
+    Returns:
+        str: The name, decoded if it is bytes.
+    """
+    return name.decode('utf-8') if isinstance(name, bytes) else name
+
+
+def encode_name(name: str | bytes) -> bytes:
+    """Encode a name which may have been read as a string.
+
+    Args:
+        name (str | bytes): The name.
+
+    Returns:
+        bytes: The name, encoded if it is a string.
+    """
+    return name if isinstance(name, bytes) else name.encode('utf-8')
+
 
 class DataReader:
     """A data reader class"""
 
-    def __init__(self, buf: bytes) -> None:
-        self.buf = memoryview(buf)
+    def __init__(
+            self,
+            buf: Frame,
+            *,
+            copy_data: bool = True,
+            packet_filter: PacketFilter | None = None,
+            string_cache: StringCache | None = None,
+            raw_strings: bool = False,
+            decompression: PayloadDecompression | None = None
+    ) -> None:
+        """Initialise the reader.
+
+        Args:
+            buf (Frame): The buffer to read. Data which is not copied is a
+                view over it.
+            copy_data (bool, optional): If false the data of packets is a
+                read-only memoryview over the buffer, rather than a copy. Data
+                is never copied out of a memory-mapped buffer. Defaults to
+                True.
+            packet_filter (PacketFilter | None, optional): If set, data
+                packets are only read when the filter accepts their topic and
+                headers, and the data of other packets is skipped. Defaults to
+                None.
+            string_cache (StringCache | None, optional): The cache used to
+                decode strings and header keys, owned by the caller. If None
+                every value is decoded. Defaults to None.
+            raw_strings (bool, optional): If true the names read by
+                `read_name` are the encoded bytes, without decoding. Defaults
+                to False.
+            decompression (PayloadDecompression | None, optional): The
+                decompression of the data of packets with a content encoding.
+                Defaults to None, for the default size limit.
+        """
+        self.buf = memoryview(buf).toreadonly()
         self.offset = 0
+        self.copy_data = copy_data and not isinstance(buf, mmap)
+        self.packet_filter = packet_filter
+        self.skipped_packets = 0
+        self.string_cache = string_cache
+        self.raw_strings = raw_strings
+        self.decompression = decompression
 
     def _read(self, count: int) -> memoryview:
         if count == 0:
@@ -55,6 +126,26 @@ class DataReader:
         buf = self._read(4)
         return struct.unpack('>I', buf)[0]
 
+    def read_name(self) -> str | bytes:
+        """Read a name, such as a topic, host, user or client identifier.
+
+        Returns:
+            str | bytes: The encoded bytes if the reader has raw strings,
+                otherwise the string.
+        """
+        return self.read_string_bytes() if self.raw_strings else self.read_string()
+
+    def read_string_bytes(self) -> bytes:
+        """Read a string as the encoded bytes, without decoding.
+
+        Returns:
+            bytes: The encoded string.
+        """
+        view = self.read_byte_view()
+        if self.string_cache is None:
+            return bytes(view)
+        return self.string_cache.intern_bytes(view)
+
     def read_string(self, encoding: str = 'utf-8') -> str:
         """Read a string.
 
@@ -64,8 +155,11 @@ class DataReader:
         Returns:
             str: The string.
         """
-        buf = self.read_byte_array()
-        return buf.decode(encoding)
+        if self.string_cache is None or encoding != 'utf-8':
+            buf = self.read_byte_array()
+            return buf.decode(encoding)
+        count = self.read_unsigned_int()
+        return self.string_cache.decode(self._read(count))
 
     def read_byte_array(self) -> bytes:
         """Read an array of bytes.
@@ -77,6 +171,20 @@ class DataReader:
         buf = bytes(self._read(count))
         return buf
 
+    def read_byte_view(self) -> memoryview:
+        """Read an array of bytes as a view over the buffer.
+
+        Returns:
+            memoryview: A read-only view of the bytes.
+        """
+        count = self.read_unsigned_int()
+        return self._read(count)
+
+    def skip_byte_array(self) -> None:
+        """Skip over an array of bytes"""
+        count = self.read_unsigned_int()
+        self.offset += count
+
     def read_int_set(self) -> set[int]:
         """Read a set of ints
 
@@ -98,7 +206,11 @@ class DataReader:
         count = self.read_unsigned_int()
         headers = dict[bytes, bytes]()
         for _ in range(count):
-            key = self.read_byte_array()
+            key = (
+                self.read_byte_array()
+                if self.string_cache is None
+                else self.string_cache.intern_bytes(self.read_byte_view())
+            )
             value = self.read_byte_array()
             headers[key] = value
         return headers
@@ -111,18 +223,39 @@ class DataReader:
         """
         entitlements = self.read_int_set()
         headers = self.read_headers()
-        data = self.read_byte_array()
-        return DataPacket(entitlements, headers, data)
+        data = self.read_byte_array() if self.copy_data else self.read_byte_view()
+        return DataPacket(entitlements, headers, data, decompression=self.decompression)
 
-    def read_data_packet_array(self) -> list[DataPacket]:
+    def read_data_packet_array(self, topic: str | bytes | None = None) -> list[DataPacket]:
         """Read an array of data packets.
 
+        If the reader has a packet filter and the topic is given, packets
+        rejected by the filter are skipped once their headers are read.
+
+        Args:
+            topic (str | bytes | None, optional): The topic of the packets.
+                Defaults to None.
+
         Returns:
             Optional[List[DataPacket]]: The data packets or None.
         """
         count = self.read_unsigned_int()
         packets: list[DataPacket] = list()
+        if self.packet_filter is None or topic is None:
+            for _ in range(count):
+                packet = self.read_data_packet()
+                packets.append(packet)
+            return packets
+
         for _ in range(count):
-            packet = self.read_data_packet()
-            packets.append(packet)
+            entitlements = self.read_int_set()
+            headers = self.read_headers()
+            if not self.packet_filter(topic, headers):
+                self.skip_byte_array()
+                self.skipped_packets += 1
+                continue
+            data = self.read_byte_array() if self.copy_data else self.read_byte_view()
+            packets.append(
+                DataPacket(entitlements, headers, data, decompression=self.decompression)
+            )
         return packets
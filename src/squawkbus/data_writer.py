@@ -49,24 +49,26 @@ class DataWriter:
         self.buf += struct.pack('>I', val)
         return self
 
-    def write_string(self, val: str, encoding: str = 'utf-8') -> DataWriter:
+    def write_string(self, val: str | bytes, encoding: str = 'utf-8') -> DataWriter:
         """Writ a string.
 
         Args:
-            val (str): The string to write.
+            val (str | bytes): The string to write. Bytes are taken to be
+                encoded already, and are written unchanged.
             encoding (str, optional): The encoding. Defaults to 'utf-8'.
         """
-        buf = val.encode(encoding)
+        buf = val if isinstance(val, bytes) else val.encode(encoding)
         return self.write_byte_array(buf)
 
-    def write_byte_array(self, val: bytes) -> DataWriter:
+    def write_byte_array(self, val: bytes | memoryview) -> DataWriter:
         """Write an array of bytes.
 
         Args:
-            val (Optional[bytes]): The bytes to write.
+            val (bytes | memoryview): The bytes to write.
         """
-        self.write_unsigned_int(len(val))
-        if len(val) > 0:
+        count = val.nbytes if isinstance(val, memoryview) else len(val)
+        self.write_unsigned_int(count)
+        if count > 0:
             self.buf += val
         return self
 
@@ -101,7 +103,7 @@ class DataWriter:
         """
         self.write_int_set(val.entitlements)
         self.write_headers(val.headers)
-        self.write_byte_array(val.data)
+        self.write_byte_array(val.payload)
         return self
 
     def write_data_packet_array(self, val: list[DataPacket]) -> DataWriter:
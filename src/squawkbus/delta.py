@@ -0,0 +1,209 @@
+"""Field level deltas"""
+
+from __future__ import annotations
+
+from dataclasses import fields, is_dataclass
+from typing import Any, Mapping
+
+from .data_packet import DataPacket
+from .payload_codecs import CONTENT_TYPE_HEADER, CONTENT_TYPE_JSON, DEFAULT_CODECS
+
+UPDATE_TYPE_HEADER = b'update-type'
+UPDATE_TYPE_IMAGE = b'image'
+UPDATE_TYPE_DELTA = b'delta'
+
+_MISSING = object()
+
+
+def as_mapping(value: Any) -> Mapping[str, Any]:
+    """Get the fields of a dict or record.
+
+    Args:
+        value (Any): A mapping, named tuple or dataclass instance.
+
+    Raises:
+        TypeError: If the value is not a supported type.
+
+    Returns:
+        Mapping[str, Any]: The fields.
+    """
+    if isinstance(value, Mapping):
+        return value
+    if hasattr(value, '_asdict'):
+        return value._asdict()
+    if is_dataclass(value) and not isinstance(value, type):
+        return {field.name: getattr(value, field.name) for field in fields(value)}
+    raise TypeError(f"unsupported record type {type(value).__name__}")
+
+
+def changed_fields(
+        previous: Mapping[str, Any],
+        current: Mapping[str, Any]
+) -> dict[str, Any]:
+    """Find the fields of the current value that differ from the previous.
+
+    Args:
+        previous (Mapping[str, Any]): The previous value.
+        current (Mapping[str, Any]): The current value.
+
+    Returns:
+        dict[str, Any]: The new or changed fields of the current value.
+    """
+    return {
+        key: value
+        for key, value in current.items()
+        if previous.get(key, _MISSING) != value
+    }
+
+
+class DeltaEncoder:
+    """Keep the last published state of each topic, and encode updates as
+    the fields that have changed.
+
+    The first update of a topic, or an update which removes fields, is
+    encoded as an image. Otherwise only the changed fields are encoded as a
+    delta. Each packet carries an `update-type` header of `image` or
+    `delta`.
+    """
+
+    def __init__(self, entitlements: set[int] | None = None) -> None:
+        """Initialise the encoder.
+
+        Args:
+            entitlements (set[int] | None, optional): The entitlements for the
+                data packets. Defaults to {0}.
+        """
+        self._entitlements = {0} if entitlements is None else entitlements
+        self._state: dict[str, dict[str, Any]] = {}
+
+    def _to_data_packets(
+            self,
+            update_type: bytes,
+            value: Mapping[str, Any]
+    ) -> list[DataPacket]:
+        return [
+            DataPacket(
+                self._entitlements,
+                {
+                    CONTENT_TYPE_HEADER: CONTENT_TYPE_JSON,
+                    UPDATE_TYPE_HEADER: update_type
+                },
+                DEFAULT_CODECS.encode(value, CONTENT_TYPE_JSON)
+            )
+        ]
+
+    def update(self, topic: str, value: Any) -> list[DataPacket] | None:
+        """Update the state of a topic.
+
+        Args:
+            topic (str): The topic name.
+            value (Any): The new value as a mapping, named tuple or dataclass.
+
+        Returns:
+            list[DataPacket] | None: The data packets for the image or delta,
+                or None if nothing has changed.
+        """
+        current = as_mapping(value)
+        previous = self._state.get(topic)
+
+        if previous is None or len(previous.keys() - current.keys()) > 0:
+            state = self._state[topic] = dict(current)
+            return self._to_data_packets(UPDATE_TYPE_IMAGE, state)
+
+        delta = changed_fields(previous, current)
+        if not delta:
+            return None
+
+        previous.update(delta)
+        return self._to_data_packets(UPDATE_TYPE_DELTA, delta)
+
+    def image(self, topic: str) -> list[DataPacket] | None:
+        """Get an image of the current state of a topic.
+
+        This can be used as the image provider of an `OnDemandPublisher`.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            list[DataPacket] | None: The data packets, or None if the topic
+                has no state.
+        """
+        state = self._state.get(topic)
+        if state is None:
+            return None
+        return self._to_data_packets(UPDATE_TYPE_IMAGE, state)
+
+    def get(self, topic: str) -> Mapping[str, Any] | None:
+        """Get the current state of a topic.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            Mapping[str, Any] | None: The state, or None if there is none.
+        """
+        return self._state.get(topic)
+
+    def discard(self, topic: str) -> None:
+        """Forget the state of a topic.
+
+        Args:
+            topic (str): The topic name.
+        """
+        self._state.pop(topic, None)
+
+
+class DeltaApplier:
+    """Rebuild the state of topics from images and deltas"""
+
+    def __init__(self) -> None:
+        self._state: dict[str, dict[str, Any]] = {}
+
+    def apply(
+            self,
+            topic: str,
+            data_packets: list[DataPacket]
+    ) -> dict[str, Any] | None:
+        """Apply received data packets to the state of a topic.
+
+        Packets without an `update-type` header are treated as images. Deltas
+        received before an image are ignored.
+
+        Args:
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+
+        Returns:
+            dict[str, Any] | None: The state of the topic, or None if no
+                image has been received.
+        """
+        state = self._state.get(topic)
+        for packet in data_packets:
+            update_type = packet.headers.get(UPDATE_TYPE_HEADER, UPDATE_TYPE_IMAGE)
+            if update_type == UPDATE_TYPE_DELTA:
+                if state is not None:
+                    state.update(packet.value)
+            else:
+                # Copy the value, as it is cached on the shared packet.
+                state = self._state[topic] = dict(packet.value)
+        return state
+
+    def get(self, topic: str) -> dict[str, Any] | None:
+        """Get the state of a topic.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            dict[str, Any] | None: The state, or None if there is none.
+        """
+        return self._state.get(topic)
+
+    def discard(self, topic: str) -> None:
+        """Forget the state of a topic.
+
+        Args:
+            topic (str): The topic name.
+        """
+        self._state.pop(topic, None)
@@ -0,0 +1,42 @@
+"""Header filters"""
+
+from __future__ import annotations
+
+from typing import Callable
+
+HeaderFilter = Callable[[dict[bytes, bytes]], bool]
+"""A predicate on the headers of a data packet"""
+
+
+def header_equals(key: bytes, *values: bytes) -> HeaderFilter:
+    """Make a filter which accepts packets where a header has one of the
+    given values.
+
+    Args:
+        key (bytes): The header key.
+        *values (bytes): The accepted values.
+
+    Returns:
+        HeaderFilter: The filter.
+    """
+    accepted = frozenset(values)
+
+    def header_filter(headers: dict[bytes, bytes]) -> bool:
+        return headers.get(key) in accepted
+
+    return header_filter
+
+
+def header_present(key: bytes) -> HeaderFilter:
+    """Make a filter which accepts packets with a header.
+
+    Args:
+        key (bytes): The header key.
+
+    Returns:
+        HeaderFilter: The filter.
+    """
+    def header_filter(headers: dict[bytes, bytes]) -> bool:
+        return key in headers
+
+    return header_filter
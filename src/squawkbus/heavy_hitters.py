@@ -0,0 +1,202 @@
+"""Heavy hitter topics"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+import heapq
+import logging
+from typing import Awaitable, Callable, NamedTuple
+
+LOG = logging.getLogger(__name__)
+
+
+class HeavyHitter(NamedTuple):
+    """An estimated count"""
+    key: str
+    estimate: int
+    """The estimated count, which is never less than the true count"""
+    error: int
+    """The most the estimate may exceed the true count by"""
+
+
+class SpaceSaving:
+    """The space saving sketch of the most frequent keys.
+
+    At most `capacity` keys are counted. When a new key arrives at a full
+    sketch it replaces the key with the smallest count, and inherits that
+    count as its error. Any key with a true count above the total divided by
+    the capacity is guaranteed to be counted.
+    """
+
+    def __init__(self, capacity: int = 1024) -> None:
+        """Initialise the sketch.
+
+        Args:
+            capacity (int, optional): The maximum number of keys counted.
+                Defaults to 1024.
+        """
+        if capacity < 1:
+            raise ValueError("the capacity must be positive")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: dict[str, int] = {}
+        self._errors: dict[str, int] = {}
+        # One entry per key, with a count which may be stale. Counts only
+        # grow, so a stale entry is refreshed when it reaches the top.
+        self._heap: list[tuple[int, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._counts)
+
+    def add(self, key: str, weight: int = 1) -> None:
+        """Add to the count of a key.
+
+        Args:
+            key (str): The key.
+            weight (int, optional): The amount to add. Defaults to 1.
+        """
+        self.total += weight
+        count = self._counts.get(key)
+        if count is not None:
+            self._counts[key] = count + weight
+            return
+
+        if len(self._counts) < self.capacity:
+            self._counts[key] = weight
+            self._errors[key] = 0
+            heapq.heappush(self._heap, (weight, key))
+            return
+
+        while True:
+            count, evicted = self._heap[0]
+            current = self._counts[evicted]
+            if current == count:
+                break
+            heapq.heapreplace(self._heap, (current, evicted))
+        del self._counts[evicted]
+        del self._errors[evicted]
+        self._counts[key] = count + weight
+        self._errors[key] = count
+        heapq.heapreplace(self._heap, (count + weight, key))
+
+    def top(self, k: int) -> list[HeavyHitter]:
+        """The keys with the highest counts.
+
+        Args:
+            k (int): The number of keys.
+
+        Returns:
+            list[HeavyHitter]: The keys and their counts, highest first.
+        """
+        return [
+            HeavyHitter(key, count, self._errors[key])
+            for key, count in heapq.nlargest(
+                k,
+                self._counts.items(),
+                key=lambda item: item[1]
+            )
+        ]
+
+    def reset(self) -> None:
+        """Reset the sketch"""
+        self.total = 0
+        self._counts.clear()
+        self._errors.clear()
+        self._heap.clear()
+
+
+class TopTopicsReport(NamedTuple):
+    """The topics with the most traffic in an interval"""
+    messages_in: list[HeavyHitter]
+    bytes_in: list[HeavyHitter]
+    messages_out: list[HeavyHitter]
+    bytes_out: list[HeavyHitter]
+
+
+ReportHandler = Callable[[TopTopicsReport], Awaitable[None]]
+
+
+class TopTopics:
+    """Track the topics with the most inbound and outbound traffic.
+
+    The messages and bytes in each direction are counted by topic in space
+    saving sketches, so the memory is bounded however many topics there
+    are.
+    """
+
+    def __init__(self, capacity: int = 1024, top: int = 10) -> None:
+        """Initialise the tracker.
+
+        Args:
+            capacity (int, optional): The maximum number of topics counted
+                by each sketch. Defaults to 1024.
+            top (int, optional): The number of topics reported. Defaults to
+                10.
+        """
+        self.top = top
+        self.messages_in = SpaceSaving(capacity)
+        self.bytes_in = SpaceSaving(capacity)
+        self.messages_out = SpaceSaving(capacity)
+        self.bytes_out = SpaceSaving(capacity)
+        self._report_task: Task[None] | None = None
+
+    def record_in(self, topic: str, size: int) -> None:
+        """Record a message received.
+
+        Args:
+            topic (str): The topic name.
+            size (int): The size of the frame.
+        """
+        self.messages_in.add(topic)
+        self.bytes_in.add(topic, size)
+
+    def record_out(self, topic: str, size: int) -> None:
+        """Record a message sent.
+
+        Args:
+            topic (str): The topic name.
+            size (int): The size of the frame.
+        """
+        self.messages_out.add(topic)
+        self.bytes_out.add(topic, size)
+
+    def report(self) -> TopTopicsReport:
+        """Report the top topics, and reset the counts.
+
+        Returns:
+            TopTopicsReport: The report.
+        """
+        report = TopTopicsReport(
+            self.messages_in.top(self.top),
+            self.bytes_in.top(self.top),
+            self.messages_out.top(self.top),
+            self.bytes_out.top(self.top),
+        )
+        for sketch in (self.messages_in, self.bytes_in, self.messages_out, self.bytes_out):
+            sketch.reset()
+        return report
+
+    def start_report(self, interval: float, on_report: ReportHandler) -> None:
+        """Start passing reports to a handler periodically.
+
+        Args:
+            interval (float): The number of seconds between reports.
+            on_report (ReportHandler): Called with each report.
+        """
+        self.stop_report()
+        self._report_task = asyncio.create_task(self._report(interval, on_report))
+
+    def stop_report(self) -> None:
+        """Stop the periodic report"""
+        if self._report_task is not None:
+            self._report_task.cancel()
+            self._report_task = None
+
+    async def _report(self, interval: float, on_report: ReportHandler) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await on_report(self.report())
+            except:  # pylint: disable=bare-except
+                LOG.exception("Failed to report top topics")
@@ -0,0 +1,150 @@
+"""Interest table"""
+
+from __future__ import annotations
+
+from typing import Collection, Iterator
+
+
+class InterestTable:
+    """An index of the clients subscribed to each topic.
+
+    The table is maintained from forwarded subscription requests, and is
+    indexed both by topic and by client, so the topics of a client can be
+    found without scanning the table.
+    """
+
+    def __init__(self) -> None:
+        self._topic_clients: dict[str, dict[str, int]] = {}
+        self._client_topics: dict[str, set[str]] = {}
+
+    def update(self, client_id: str, topic: str, count: int) -> bool:
+        """Update the subscription count of a client on a topic.
+
+        Args:
+            client_id (str): The client identifier.
+            topic (str): The topic name.
+            count (int): The number of subscriptions the client holds on the
+                topic. A count of zero removes the interest.
+
+        Returns:
+            bool: True if the client was not previously subscribed to the
+                topic.
+        """
+        if count <= 0:
+            self.remove(client_id, topic)
+            return False
+
+        clients = self._topic_clients.get(topic)
+        if clients is None:
+            clients = self._topic_clients[topic] = {}
+        is_new = client_id not in clients
+        clients[client_id] = count
+
+        if is_new:
+            topics = self._client_topics.get(client_id)
+            if topics is None:
+                topics = self._client_topics[client_id] = set()
+            topics.add(topic)
+
+        return is_new
+
+    def remove(self, client_id: str, topic: str) -> bool:
+        """Remove the interest of a client in a topic.
+
+        Args:
+            client_id (str): The client identifier.
+            topic (str): The topic name.
+
+        Returns:
+            bool: True if the client was subscribed to the topic.
+        """
+        clients = self._topic_clients.get(topic)
+        if clients is None or clients.pop(client_id, None) is None:
+            return False
+        if not clients:
+            del self._topic_clients[topic]
+
+        topics = self._client_topics[client_id]
+        topics.discard(topic)
+        if not topics:
+            del self._client_topics[client_id]
+
+        return True
+
+    def remove_client(self, client_id: str) -> set[str]:
+        """Remove all the interest held by a client.
+
+        The cost is proportional to the number of topics the client was
+        subscribed to, rather than the size of the table.
+
+        Args:
+            client_id (str): The client identifier.
+
+        Returns:
+            set[str]: The topics the client was subscribed to.
+        """
+        topics = self._client_topics.pop(client_id, set())
+        for topic in topics:
+            clients = self._topic_clients[topic]
+            del clients[client_id]
+            if not clients:
+                del self._topic_clients[topic]
+        return topics
+
+    def has_interest(self, topic: str) -> bool:
+        """Check if any client is subscribed to a topic.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            bool: True if there are subscribers.
+        """
+        return topic in self._topic_clients
+
+    def clients(self, topic: str) -> Collection[str]:
+        """The clients subscribed to a topic.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            Collection[str]: The client identifiers.
+        """
+        return self._topic_clients.get(topic, {}).keys()
+
+    def topics(self, client_id: str) -> Collection[str]:
+        """The topics a client is subscribed to.
+
+        Args:
+            client_id (str): The client identifier.
+
+        Returns:
+            Collection[str]: The topic names.
+        """
+        return self._client_topics.get(client_id, set())
+
+    def subscription_count(self, topic: str) -> int:
+        """The total number of subscriptions on a topic across all clients.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            int: The number of subscriptions.
+        """
+        return sum(self._topic_clients.get(topic, {}).values())
+
+    def clear(self) -> None:
+        """Remove all interest"""
+        self._topic_clients.clear()
+        self._client_topics.clear()
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._topic_clients)
+
+    def __len__(self) -> int:
+        return len(self._topic_clients)
+
+    def __contains__(self, topic: object) -> bool:
+        return topic in self._topic_clients
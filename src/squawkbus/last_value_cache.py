@@ -0,0 +1,139 @@
+"""Last value cache"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Iterator, NamedTuple
+
+from .data_packet import DataPacket
+
+
+class CachedValue(NamedTuple):
+    """The most recent data received on a topic"""
+    user: str
+    host: str
+    data_packets: list[DataPacket]
+    size: int
+
+
+def data_packets_size(data_packets: list[DataPacket]) -> int:
+    """Estimate the memory held by a list of data packets.
+
+    Args:
+        data_packets (list[DataPacket]): The data packets.
+
+    Returns:
+        int: The number of bytes held by the entitlements, headers and data.
+    """
+    return sum(
+        4 * len(packet.entitlements) +
+        sum(len(key) + len(value) for key, value in packet.headers.items()) +
+        len(packet.payload)
+        for packet in data_packets
+    )
+
+
+class LastValueCache:
+    """A cache of the last data received on each topic.
+
+    The cache is bounded by the total number of bytes held by the cached data
+    packets. When the budget is exceeded the least recently used topics are
+    evicted. The data packets are stored as received, so the cache shares
+    the buffers with the handlers.
+    """
+
+    def __init__(self, max_bytes: int) -> None:
+        """Initialise the cache.
+
+        Args:
+            max_bytes (int): The maximum number of bytes to hold.
+        """
+        if max_bytes <= 0:
+            raise ValueError("max_bytes must be positive")
+        self._max_bytes = max_bytes
+        self._size = 0
+        self._entries: OrderedDict[str, CachedValue] = OrderedDict()
+
+    @property
+    def max_bytes(self) -> int:
+        """The maximum number of bytes the cache will hold"""
+        return self._max_bytes
+
+    @property
+    def size(self) -> int:
+        """The number of bytes currently held"""
+        return self._size
+
+    def put(
+            self,
+            topic: str,
+            user: str,
+            host: str,
+            data_packets: list[DataPacket]
+    ) -> None:
+        """Store the latest data for a topic.
+
+        Data larger than the whole budget is not cached, and any previous
+        value for the topic is discarded as it is now stale.
+
+        Args:
+            topic (str): The topic name.
+            user (str): The user name of the sender.
+            host (str): The host from which the data was sent.
+            data_packets (list[DataPacket]): The data packets.
+        """
+        self.discard(topic)
+
+        size = data_packets_size(data_packets)
+        if size > self._max_bytes:
+            return
+
+        self._entries[topic] = CachedValue(user, host, data_packets, size)
+        self._size += size
+
+        while self._size > self._max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= evicted.size
+
+    def get(self, topic: str) -> CachedValue | None:
+        """Get the latest data for a topic, marking it as recently used.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            CachedValue | None: The cached value, or None if not cached.
+        """
+        entry = self._entries.get(topic)
+        if entry is not None:
+            self._entries.move_to_end(topic)
+        return entry
+
+    def discard(self, topic: str) -> None:
+        """Remove the cached value for a topic if present.
+
+        Args:
+            topic (str): The topic name.
+        """
+        entry = self._entries.pop(topic, None)
+        if entry is not None:
+            self._size -= entry.size
+
+    def clear(self) -> None:
+        """Remove all cached values"""
+        self._entries.clear()
+        self._size = 0
+
+    def items(self) -> Iterator[tuple[str, CachedValue]]:
+        """Iterate over a snapshot of the cached values, oldest first.
+
+        Returns:
+            Iterator[tuple[str, CachedValue]]: The topics and cached values.
+        """
+        return iter(list(self._entries.items()))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, topic: object) -> bool:
+        return topic in self._entries
@@ -0,0 +1,283 @@
+"""Latency measurement"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+import logging
+import os
+import time
+
+from .callback_client import CallbackClient
+from .data_packet import DataPacket
+from .metrics import LatencyHistogram
+
+LOG = logging.getLogger(__name__)
+
+SEND_TS_HEADER = b'send-ts'
+"""The send time, sequence number and source of a packet"""
+
+RTT_TS_HEADER = b'x-rtt-ts'
+"""The monotonic send time of a round trip probe"""
+
+RTT_TOPIC = '__rtt__'
+
+
+def _parse_send_ts(value: bytes) -> tuple[int, int, bytes]:
+    timestamp, sequence, source = value.split(b':', 2)
+    return int(timestamp), int(sequence), source
+
+
+class LatencyStamper:
+    """Stamp published packets with the send time and a sequence number.
+
+    The `send-ts` header holds the wall clock time in nanoseconds since the
+    epoch, a sequence number for the topic, and an identifier of the
+    stamper, separated by colons. The time never goes backwards, even if the
+    wall clock is stepped.
+
+    The sequence number counts messages rather than packets, and every
+    packet of a message has the same number, so a subscriber which receives
+    only some of the packets, because of its entitlements or header
+    filters, does not see a gap.
+    """
+
+    def __init__(self, source: bytes | None = None) -> None:
+        """Initialise the stamper.
+
+        Args:
+            source (bytes | None, optional): The identifier of the publisher.
+                Defaults to a random identifier.
+        """
+        self.source = os.urandom(4).hex().encode('ascii') if source is None else source
+        self._sequences: dict[str, int] = {}
+        self._last_timestamp = 0
+
+    def _now(self) -> int:
+        self._last_timestamp = max(time.time_ns(), self._last_timestamp)
+        return self._last_timestamp
+
+    def stamp(self, topic: str, data_packets: list[DataPacket]) -> list[DataPacket]:
+        """Stamp packets for publishing.
+
+        Args:
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The packets.
+
+        Returns:
+            list[DataPacket]: The packets with a `send-ts` header. The data is
+                shared with the original packets.
+        """
+        timestamp = self._now()
+        sequence = self._sequences.get(topic, 0) + 1
+        self._sequences[topic] = sequence
+        send_ts = b'%d:%d:%s' % (timestamp, sequence, self.source)
+        stamped: list[DataPacket] = []
+        for packet in data_packets:
+            headers = dict(packet.headers)
+            headers[SEND_TS_HEADER] = send_ts
+            stamped.append(DataPacket(packet.entitlements, headers, packet.payload))
+        return stamped
+
+
+class LatencyMonitor:
+    """Measure the one way latency of stamped packets, and detect gaps.
+
+    The latency is the difference between the receive time and the send
+    time, so it relies on the clocks of the publisher and subscriber being
+    synchronised. A gap is counted when the sequence number of a source on
+    a topic skips, and the number of missing messages is added to the total.
+    Packets of the same message share a sequence number.
+    """
+
+    def __init__(self, significant_bits: int = 7) -> None:
+        """Initialise the monitor.
+
+        Args:
+            significant_bits (int, optional): The precision of the
+                histograms. Defaults to 7.
+        """
+        self._significant_bits = significant_bits
+        self.latency = LatencyHistogram(significant_bits)
+        self.topic_latency: dict[str, LatencyHistogram] = {}
+        self.gaps = 0
+        self.missing = 0
+        self.out_of_order = 0
+        self._sequences: dict[tuple[bytes, str], int] = {}
+        self._client: CallbackClient | None = None
+
+    def attach(self, client: CallbackClient) -> None:
+        """Start measuring the data received by a client.
+
+        Args:
+            client (CallbackClient): The client.
+        """
+        if self._client is not None:
+            raise RuntimeError("the monitor is already attached")
+        self._client = client
+        client.data_handlers.append(self.on_data)
+
+    def detach(self) -> None:
+        """Stop measuring"""
+        if self._client is not None:
+            self._client.data_handlers.remove(self.on_data)
+            self._client = None
+
+    async def on_data(
+            self,
+            _user: str,
+            _host: str,
+            topic: str,
+            data_packets: list[DataPacket]
+    ) -> None:
+        """A data handler which records the latency of stamped packets.
+
+        Args:
+            _user (str): The user name of the sender.
+            _host (str): The host from which the data was sent.
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+        """
+        self.record(topic, data_packets, time.time_ns())
+
+    def record(
+            self,
+            topic: str,
+            data_packets: list[DataPacket],
+            received: int
+    ) -> None:
+        """Record the latency of received packets.
+
+        Args:
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+            received (int): The receive time in nanoseconds since the epoch.
+        """
+        for packet in data_packets:
+            value = packet.headers.get(SEND_TS_HEADER)
+            if value is None:
+                continue
+            try:
+                timestamp, sequence, source = _parse_send_ts(value)
+            except ValueError:
+                LOG.warning("invalid %s header on %s", SEND_TS_HEADER, topic)
+                continue
+
+            latency = received - timestamp
+            self.latency.record(latency)
+            histogram = self.topic_latency.get(topic)
+            if histogram is None:
+                histogram = self.topic_latency[topic] = LatencyHistogram(
+                    self._significant_bits
+                )
+            histogram.record(latency)
+
+            key = (source, topic)
+            previous = self._sequences.get(key)
+            if previous is not None:
+                if sequence > previous + 1:
+                    self.gaps += 1
+                    self.missing += sequence - previous - 1
+                elif sequence < previous:
+                    self.out_of_order += 1
+                    continue
+            self._sequences[key] = sequence
+
+    def reset(self) -> None:
+        """Reset the histograms and counts, keeping the sequence numbers"""
+        self.latency.reset()
+        self.topic_latency.clear()
+        self.gaps = self.missing = self.out_of_order = 0
+
+
+class RttProbe:
+    """Measure the round trip time through the broker.
+
+    At each interval the client sends a packet to itself on the probe topic,
+    and records the time until it is received. Data handlers of the client
+    also receive the probe packets, and should ignore the probe topic.
+
+    Probes are sent rather than published, so they are not suppressed when
+    the client suppresses publishing to topics without subscribers.
+    """
+
+    def __init__(
+            self,
+            client: CallbackClient,
+            interval: float = 1.0,
+            *,
+            topic: str = RTT_TOPIC,
+            significant_bits: int = 7
+    ) -> None:
+        """Initialise the probe.
+
+        Args:
+            client (CallbackClient): A started client.
+            interval (float, optional): The number of seconds between probes.
+                Defaults to 1.0.
+            topic (str, optional): The probe topic. Defaults to RTT_TOPIC.
+            significant_bits (int, optional): The precision of the
+                histogram. Defaults to 7.
+        """
+        self.client = client
+        self.interval = interval
+        self.topic = topic
+        self.rtt = LatencyHistogram(significant_bits)
+        self._task: Task[None] | None = None
+
+    def start(self) -> None:
+        """Start probing"""
+        if self._task is not None:
+            return
+        self.client.data_handlers.append(self.on_data)
+        self._task = asyncio.create_task(self._probe())
+
+    def stop(self) -> None:
+        """Stop probing"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        self._task = None
+        self.client.data_handlers.remove(self.on_data)
+
+    async def send_probe(self) -> None:
+        """Send a probe to the client"""
+        client_id = self.client.client_id
+        if client_id is None:
+            raise RuntimeError("the client has not been started")
+        await self.client.send(
+            client_id,
+            self.topic,
+            [DataPacket({0}, {RTT_TS_HEADER: b'%d' % time.monotonic_ns()}, b'')]
+        )
+
+    async def on_data(
+            self,
+            _user: str,
+            _host: str,
+            topic: str,
+            data_packets: list[DataPacket]
+    ) -> None:
+        """A data handler which records the round trip time of probes.
+
+        Args:
+            _user (str): The user name of the sender.
+            _host (str): The host from which the data was sent.
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+        """
+        if topic != self.topic:
+            return
+        received = time.monotonic_ns()
+        for packet in data_packets:
+            value = packet.headers.get(RTT_TS_HEADER)
+            if value is not None:
+                self.rtt.record(received - int(value))
+
+    async def _probe(self) -> None:
+        while True:
+            try:
+                await self.send_probe()
+            except:  # pylint: disable=bare-except
+                LOG.exception("Failed to send probe")
+            await asyncio.sleep(self.interval)
@@ -0,0 +1,179 @@
+"""In-memory message streams"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Event, Queue
+import logging
+from .types import Frame, MessageStream
+
+LOG = logging.getLogger(__name__)
+
+
+class MemoryStream(MessageStream):
+    """One end of an in-memory connection.
+
+    Frames written to one end are read from the other without being copied,
+    so the writer must not change a buffer once it has been written. A link
+    can add latency and limit the bandwidth, to model a network, and the
+    number of frames queued for the reader can be limited, so a slow reader
+    holds up the writer. Faults can be injected to reproduce disconnects.
+
+    When either end is closed or disconnected, reads at the other end raise
+    EOFError once the frames already queued have been read, and writes at
+    either end raise ConnectionResetError.
+    """
+
+    def __init__(
+            self,
+            *,
+            latency: float = 0.0,
+            bandwidth: float | None = None,
+            max_queued: int | None = None,
+            fail_after: int | None = None
+    ) -> None:
+        """Initialise one end of a connection. Use `pair` to connect two.
+
+        Args:
+            latency (float, optional): The number of seconds before a written
+                frame can be read. Defaults to 0.0.
+            bandwidth (float | None, optional): If set, the number of bytes
+                per second written frames are delivered at. Defaults to None.
+            max_queued (int | None, optional): If set, the number of frames
+                which can wait to be read before writes block. Defaults to
+                None.
+            fail_after (int | None, optional): If set, the connection is
+                reset when this many frames have been written. Defaults to
+                None.
+        """
+        self.latency = latency
+        self.bandwidth = bandwidth
+        self.max_queued = max_queued
+        self.fail_after = fail_after
+        self.frames_written = 0
+        self.bytes_written = 0
+        self._peer: MemoryStream | None = None
+        self._frames: Queue[tuple[float, bytes | bytearray] | None] = Queue()
+        self._space = Event()
+        self._space.set()
+        self._link_free = 0.0
+        self._error: BaseException | None = None
+
+    @classmethod
+    def pair(
+            cls,
+            *,
+            latency: float = 0.0,
+            bandwidth: float | None = None,
+            max_queued: int | None = None
+    ) -> tuple[MemoryStream, MemoryStream]:
+        """Create two connected streams.
+
+        Args:
+            latency (float, optional): The number of seconds before a written
+                frame can be read. Defaults to 0.0.
+            bandwidth (float | None, optional): If set, the number of bytes
+                per second written frames are delivered at, in each
+                direction. Defaults to None.
+            max_queued (int | None, optional): If set, the number of frames
+                which can wait to be read at each end before writes block.
+                Defaults to None.
+
+        Returns:
+            tuple[MemoryStream, MemoryStream]: The two ends.
+        """
+        left = cls(latency=latency, bandwidth=bandwidth, max_queued=max_queued)
+        right = cls(latency=latency, bandwidth=bandwidth, max_queued=max_queued)
+        left._peer, right._peer = right, left
+        return left, right
+
+    @property
+    def is_connected(self) -> bool:
+        """True until either end is closed or disconnected"""
+        return self._peer is not None and self._error is None
+
+    @property
+    def queued(self) -> int:
+        """The number of frames waiting to be read at this end"""
+        return self._frames.qsize()
+
+    async def read(self) -> Frame:
+        """Read a frame.
+
+        Raises:
+            EOFError: If the connection was closed, and no frames are left.
+
+        Returns:
+            Frame: The frame, which is the buffer that was written, and is
+                shared with the writer.
+        """
+        item = await self._frames.get()
+        if item is None:
+            # Leave the end of stream for further reads.
+            self._frames.put_nowait(None)
+            raise EOFError("the connection is closed")
+        deliver_at, buf = item
+        self._space.set()
+        delay = deliver_at - asyncio.get_running_loop().time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return buf
+
+    async def write(self, buf: bytes | bytearray) -> None:
+        """Write a frame.
+
+        Args:
+            buf (bytes | bytearray): The frame. It is passed to the reader
+                without being copied.
+
+        Raises:
+            ConnectionResetError: If the connection is closed.
+        """
+        peer = self._check_connected()
+        if self.fail_after is not None and self.frames_written >= self.fail_after:
+            self.disconnect(ConnectionResetError("injected fault"))
+            self._check_connected()
+
+        while peer.max_queued is not None and peer.queued >= peer.max_queued:
+            peer._space.clear()
+            await peer._space.wait()
+            peer = self._check_connected()
+
+        now = asyncio.get_running_loop().time()
+        if self.bandwidth is None:
+            deliver_at = now + self.latency
+        else:
+            self._link_free = max(self._link_free, now) + len(buf) / self.bandwidth
+            deliver_at = self._link_free + self.latency
+
+        peer._frames.put_nowait((deliver_at, buf))
+        self.frames_written += 1
+        self.bytes_written += len(buf)
+
+    async def close(self) -> None:
+        """Close the connection"""
+        self.disconnect()
+
+    def disconnect(self, error: BaseException | None = None) -> None:
+        """Disconnect both ends.
+
+        Args:
+            error (BaseException | None, optional): The error raised by
+                further writes. Defaults to None, for ConnectionResetError.
+        """
+        peer = self._peer
+        if peer is None:
+            return
+        LOG.debug("disconnecting")
+        for stream in (self, peer):
+            stream._peer = None
+            stream._error = error or ConnectionResetError("the connection is closed")
+            stream._frames.put_nowait(None)
+            stream._space.set()
+
+    def _check_connected(self) -> MemoryStream:
+        if self._error is not None:
+            raise self._error
+        if self._peer is None:
+            raise ConnectionResetError("the stream is not connected")
+        return self._peer
@@ -9,6 +9,7 @@ from typing import Any
 from .data_packet import DataPacket
 from .data_reader import DataReader
 from .data_writer import DataWriter
+from .types import Frame
 
 
 class MessageType(Enum):
@@ -31,7 +32,22 @@ class Message(metaclass=ABCMeta):
         self.message_type = message_type
 
     @classmethod
-    def deserialize(cls, buf: bytes) -> Message:
+    def deserialize(cls, buf: Frame) -> Message:
+        """Deserialize a message
+
+        Args:
+            buf (Frame): The serialized message.
+
+        Raises:
+            RuntimeError: When the message type is unknown.
+
+        Returns:
+            Message: The message.
+        """
+        return cls.read(DataReader(buf))
+
+    @classmethod
+    def read(cls, reader: DataReader) -> Message:
         """Read a messages
 
         Args:
@@ -43,8 +59,6 @@ class Message(metaclass=ABCMeta):
         Returns:
             Message: The message.
         """
-        reader = DataReader(buf)
-
         message_type = cls._read_header(reader)
 
         if message_type == MessageType.AUTHENTICATION_REQUEST:
@@ -91,10 +105,26 @@ class Message(metaclass=ABCMeta):
         """
 
     def serialize(self) -> bytes:
+        """Serialize the message.
+
+        Returns:
+            bytes: The serialized message.
+        """
+        return bytes(self.serialize_buffer())
+
+    def serialize_buffer(self) -> bytearray:
+        """Serialize the message into a buffer.
+
+        Unlike `serialize` the buffer is returned without copying, so large
+        payloads are only copied once, into the buffer.
+
+        Returns:
+            bytearray: The serialized message.
+        """
         writer = DataWriter()
         self.write_header(writer)
         self.write_body(writer)
-        return bytes(writer.buf)
+        return writer.buf
 
     @classmethod
     @abstractmethod
@@ -188,17 +218,20 @@ class AuthenticationResponse(Message):
 
 
 class MulticastData(Message):
-    """A multicast data message"""
+    """A multicast data message.
+
+    The topic may be given as encoded bytes, which are written unchanged.
+    """
 
     def __init__(
             self,
-            topic: str,
+            topic: str | bytes,
             data_packets: list[DataPacket]
     ) -> None:
         """A multicast data message.
 
         Args:
-            topic (str): The topic name
+            topic (str | bytes): The topic name
             data_packets (Optional[List[DataPacket]]): The data packets.
         """
         super().__init__(MessageType.MULTICAST_DATA)
@@ -208,7 +241,7 @@ class MulticastData(Message):
     @classmethod
     def read_body(cls, reader: DataReader) -> MulticastData:
         topic = reader.read_string()
-        data_packets = reader.read_data_packet_array()
+        data_packets = reader.read_data_packet_array(topic)
         return MulticastData(topic, data_packets)
 
     def write_body(self, writer: DataWriter) -> None:
@@ -230,19 +263,22 @@ class MulticastData(Message):
 
 
 class UnicastData(Message):
-    """A unicast data message"""
+    """A unicast data message.
+
+    The names may be given as encoded bytes, which are written unchanged.
+    """
 
     def __init__(
             self,
-            client_id: str,
-            topic: str,
+            client_id: str | bytes,
+            topic: str | bytes,
             data_packets: list[DataPacket]
     ) -> None:
         """A unicast data message.
 
         Args:
             client_id (UUID): The client identifier.
-            topic (str): Thee topic name
+            topic (str | bytes): Thee topic name
             data_packets (Optional[List[DataPacket]]): The data packets
         """
         super().__init__(MessageType.UNICAST_DATA)
@@ -254,7 +290,7 @@ class UnicastData(Message):
     def read_body(cls, reader: DataReader) -> UnicastData:
         client_id = reader.read_string()
         topic = reader.read_string()
-        data_packets = reader.read_data_packet_array()
+        data_packets = reader.read_data_packet_array(topic)
         return UnicastData(client_id, topic, data_packets)
 
     def write_body(self, writer: DataWriter) -> None:
@@ -416,21 +452,24 @@ class SubscriptionRequest(Message):
 
 
 class ForwardedMulticastData(Message):
-    """A forwarded multicast data message"""
+    """A forwarded multicast data message.
+
+    The names are the encoded bytes when the message is read in bytes mode.
+    """
 
     def __init__(
             self,
-            host: str,
-            user: str,
-            topic: str,
+            host: str | bytes,
+            user: str | bytes,
+            topic: str | bytes,
             data_packets: list[DataPacket]
     ) -> None:
         """Forwarded multicast data.
 
         Args:
-            host (str): The host from which the data was sent.
-            user (str): The user that sent the data.
-            topic (str): The topic name.
+            host (str | bytes): The host from which the data was sent.
+            user (str | bytes): The user that sent the data.
+            topic (str | bytes): The topic name.
             data_packets (list[DataPacket]): The data packets.
         """
         super().__init__(MessageType.FORWARDED_MULTICAST_DATA)
@@ -441,10 +480,10 @@ class ForwardedMulticastData(Message):
 
     @classmethod
     def read_body(cls, reader: DataReader) -> Message:
-        host = reader.read_string()
-        user = reader.read_string()
-        topic = reader.read_string()
-        data_packets = reader.read_data_packet_array()
+        host = reader.read_name()
+        user = reader.read_name()
+        topic = reader.read_name()
+        data_packets = reader.read_data_packet_array(topic)
         return ForwardedMulticastData(host, user, topic, data_packets)
 
     def write_body(self, writer: DataWriter) -> None:
@@ -472,23 +511,26 @@ class ForwardedMulticastData(Message):
 
 
 class ForwardedUnicastData(Message):
-    """A forwarded unicast message"""
+    """A forwarded unicast message.
+
+    The names are the encoded bytes when the message is read in bytes mode.
+    """
 
     def __init__(
             self,
-            host: str,
-            user: str,
-            client_id: str,
-            topic: str,
+            host: str | bytes,
+            user: str | bytes,
+            client_id: str | bytes,
+            topic: str | bytes,
             data_packets: list[DataPacket]
     ) -> None:
         """A forwarded unicast message
 
         Args:
-            host (str): The host from which the message was sent.
-            user (str): The user that sent the message.
-            client_id (str): The client that sent the message.
-            topic (str): The topic name.
+            host (str | bytes): The host from which the message was sent.
+            user (str | bytes): The user that sent the message.
+            client_id (str | bytes): The client that sent the message.
+            topic (str | bytes): The topic name.
             data_packets (list[DataPacket]): The data packets.
         """
         super().__init__(MessageType.FORWARDED_UNICAST_DATA)
@@ -500,11 +542,11 @@ class ForwardedUnicastData(Message):
 
     @classmethod
     def read_body(cls, reader: DataReader) -> Message:
-        host = reader.read_string()
-        user = reader.read_string()
-        client_id = reader.read_string()
-        topic = reader.read_string()
-        data_packets = reader.read_data_packet_array()
+        host = reader.read_name()
+        user = reader.read_name()
+        client_id = reader.read_name()
+        topic = reader.read_name()
+        data_packets = reader.read_data_packet_array(topic)
         return ForwardedUnicastData(host, user, client_id, topic, data_packets)
 
     def write_body(self, writer: DataWriter) -> None:
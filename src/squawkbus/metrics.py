@@ -0,0 +1,396 @@
+"""Client metrics"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+from bisect import bisect_left
+import logging
+from typing import Awaitable, Callable, NamedTuple, Sequence
+
+from .heavy_hitters import TopTopics
+from .messages import MessageType
+from .payload_compression import CompressionSnapshot, CompressionStats
+
+LOG = logging.getLogger(__name__)
+
+DEFAULT_NS_BUCKETS = tuple(1_000 * 2 ** i for i in range(21))
+"""Histogram bucket bounds in nanoseconds, from 1µs to about 1s"""
+
+
+class HistogramSnapshot(NamedTuple):
+    """The state of a histogram"""
+    bounds: tuple[int, ...]
+    counts: tuple[int, ...]
+    samples: int
+    total: int
+
+
+class Histogram:
+    """A histogram with fixed bucket bounds.
+
+    The last bucket counts the values above the highest bound.
+    """
+
+    def __init__(self, bounds: Sequence[int] = DEFAULT_NS_BUCKETS) -> None:
+        """Initialise the histogram.
+
+        Args:
+            bounds (Sequence[int], optional): The inclusive upper bounds of the
+                buckets, in ascending order. Defaults to DEFAULT_NS_BUCKETS.
+        """
+        self.bounds = tuple(bounds)
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.total = 0
+
+    def observe(self, value: int) -> None:
+        """Record a value.
+
+        Args:
+            value (int): The value.
+        """
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def snapshot(self) -> HistogramSnapshot:
+        """Take a snapshot of the histogram.
+
+        Returns:
+            HistogramSnapshot: The snapshot.
+        """
+        return HistogramSnapshot(self.bounds, tuple(self.counts), self.count, self.total)
+
+    def reset(self) -> None:
+        """Reset the histogram"""
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = self.total = 0
+
+
+class LatencyHistogram:
+    """A histogram of latencies with a bounded relative error.
+
+    Values are counted in buckets whose width grows with the value, in the
+    manner of an HDR histogram: values below 2**significant_bits are exact,
+    and above that each power of two is split into 2**(significant_bits-1)
+    buckets. Buckets are only held for the values seen.
+    """
+
+    def __init__(self, significant_bits: int = 7) -> None:
+        """Initialise the histogram.
+
+        Args:
+            significant_bits (int, optional): The number of bits of each
+                value kept. The relative error is at most
+                2**-(significant_bits-1). Defaults to 7, which is under 2%.
+        """
+        if significant_bits < 2:
+            raise ValueError("significant_bits must be at least 2")
+        self.significant_bits = significant_bits
+        self._exact_limit = 1 << significant_bits
+        self._half = 1 << (significant_bits - 1)
+        self.counts: dict[int, int] = {}
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def _index(self, value: int) -> int:
+        if value < self._exact_limit:
+            return value
+        shift = value.bit_length() - self.significant_bits
+        top = value >> shift
+        return self._exact_limit + (shift - 1) * self._half + top - self._half
+
+    def _upper_bound(self, index: int) -> int:
+        if index < self._exact_limit:
+            return index
+        shift, offset = divmod(index - self._exact_limit, self._half)
+        top = offset + self._half
+        return ((top + 1) << (shift + 1)) - 1
+
+    def record(self, value: int) -> None:
+        """Record a value.
+
+        Args:
+            value (int): The value, which must not be negative.
+        """
+        value = max(value, 0)
+        index = self._index(value)
+        self.counts[index] = self.counts.get(index, 0) + 1
+        if self.count == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.count += 1
+        self.total += value
+
+    @property
+    def mean(self) -> float:
+        """The mean of the values"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, percentile: float) -> int:
+        """Get the value at a percentile.
+
+        Args:
+            percentile (float): The percentile, from 0 to 100.
+
+        Returns:
+            int: The upper bound of the bucket holding the percentile, or
+                zero if there are no values.
+        """
+        if self.count == 0:
+            return 0
+        rank = max(1, round(self.count * percentile / 100))
+        seen = 0
+        for index in sorted(self.counts):
+            seen += self.counts[index]
+            if seen >= rank:
+                return min(self._upper_bound(index), self.max)
+        return self.max
+
+    def merge(self, other: LatencyHistogram) -> None:
+        """Add the values of another histogram.
+
+        Args:
+            other (LatencyHistogram): A histogram with the same significant
+                bits.
+        """
+        if other.significant_bits != self.significant_bits:
+            raise ValueError("histograms must have the same significant bits")
+        if other.count == 0:
+            return
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.min = other.min if self.count == 0 else min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def reset(self) -> None:
+        """Reset the histogram"""
+        self.counts.clear()
+        self.count = self.total = self.min = self.max = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'LatencyHistogram(count={self.count},min={self.min},'
+            f'p50={self.percentile(50)},p99={self.percentile(99)},max={self.max})'
+        )
+
+
+class MetricsSnapshot(NamedTuple):
+    """The state of the client metrics"""
+    messages_in: dict[str, int]
+    bytes_in: dict[str, int]
+    messages_out: dict[str, int]
+    bytes_out: dict[str, int]
+    gauges: dict[str, float]
+    histograms: dict[str, HistogramSnapshot]
+    compression: CompressionSnapshot
+    decompression: CompressionSnapshot
+
+
+ExportHandler = Callable[[MetricsSnapshot], Awaitable[None]]
+
+
+class ClientMetrics:
+    """Counters, gauges and histograms of a client.
+
+    The client counts the messages and bytes read and written for each
+    message type, and records the time taken to decode each frame, to
+    serialize each message, and to write and drain each frame, and the data
+    it compresses and decompresses. Gauges are
+    callables evaluated when a snapshot is taken, so they cost nothing on the
+    hot paths. The data traffic can also be counted by topic, for the topics
+    with the most traffic.
+    """
+
+    def __init__(
+            self,
+            bounds: Sequence[int] = DEFAULT_NS_BUCKETS,
+            *,
+            top_topics: TopTopics | None = None
+    ) -> None:
+        """Initialise the metrics.
+
+        Args:
+            bounds (Sequence[int], optional): The histogram bucket bounds in
+                nanoseconds. Defaults to DEFAULT_NS_BUCKETS.
+            top_topics (TopTopics | None, optional): If set, the data
+                traffic is counted by topic. Defaults to None.
+        """
+        self.messages_in = {message_type: 0 for message_type in MessageType}
+        self.bytes_in = {message_type: 0 for message_type in MessageType}
+        self.messages_out = {message_type: 0 for message_type in MessageType}
+        self.bytes_out = {message_type: 0 for message_type in MessageType}
+        self.gauges: dict[str, Callable[[], float]] = {}
+        self.decode_ns = Histogram(bounds)
+        self.serialize_ns = Histogram(bounds)
+        self.write_ns = Histogram(bounds)
+        self.compression = CompressionStats()
+        self.decompression = CompressionStats()
+        self.top_topics = top_topics
+        self._export_task: Task[None] | None = None
+
+    def record_read(
+            self,
+            message_type: MessageType,
+            size: int,
+            decode_ns: int,
+            topic: str | None = None
+    ) -> None:
+        """Record a message read.
+
+        Args:
+            message_type (MessageType): The message type.
+            size (int): The size of the frame.
+            decode_ns (int): The time taken to decode the frame.
+            topic (str | None, optional): The topic of a data message.
+                Defaults to None.
+        """
+        self.messages_in[message_type] += 1
+        self.bytes_in[message_type] += size
+        self.decode_ns.observe(decode_ns)
+        if topic is not None and self.top_topics is not None:
+            self.top_topics.record_in(topic, size)
+
+    def record_write(
+            self,
+            message_type: MessageType,
+            size: int,
+            serialize_ns: int,
+            write_ns: int,
+            topic: str | None = None
+    ) -> None:
+        """Record a message written.
+
+        Args:
+            message_type (MessageType): The message type.
+            size (int): The size of the frame.
+            serialize_ns (int): The time taken to serialize the message.
+            write_ns (int): The time taken to write and drain the frame.
+            topic (str | None, optional): The topic of a data message.
+                Defaults to None.
+        """
+        self.messages_out[message_type] += 1
+        self.bytes_out[message_type] += size
+        self.serialize_ns.observe(serialize_ns)
+        self.write_ns.observe(write_ns)
+        if topic is not None and self.top_topics is not None:
+            self.top_topics.record_out(topic, size)
+
+    def snapshot(self) -> MetricsSnapshot:
+        """Take a snapshot of the metrics.
+
+        Returns:
+            MetricsSnapshot: The snapshot.
+        """
+        return MetricsSnapshot(
+            {key.name: value for key, value in self.messages_in.items()},
+            {key.name: value for key, value in self.bytes_in.items()},
+            {key.name: value for key, value in self.messages_out.items()},
+            {key.name: value for key, value in self.bytes_out.items()},
+            {name: gauge() for name, gauge in self.gauges.items()},
+            {
+                'decode': self.decode_ns.snapshot(),
+                'serialize': self.serialize_ns.snapshot(),
+                'write': self.write_ns.snapshot(),
+            },
+            self.compression.snapshot(),
+            self.decompression.snapshot()
+        )
+
+    def reset(self) -> None:
+        """Reset the counters and histograms"""
+        for counts in (self.messages_in, self.bytes_in, self.messages_out, self.bytes_out):
+            for message_type in counts:
+                counts[message_type] = 0
+        self.decode_ns.reset()
+        self.serialize_ns.reset()
+        self.write_ns.reset()
+        self.compression.reset()
+        self.decompression.reset()
+
+    def start_export(self, interval: float, on_export: ExportHandler) -> None:
+        """Start passing snapshots to a handler periodically.
+
+        Args:
+            interval (float): The number of seconds between snapshots.
+            on_export (ExportHandler): Called with each snapshot.
+        """
+        self.stop_export()
+        self._export_task = asyncio.create_task(self._export(interval, on_export))
+
+    def stop_export(self) -> None:
+        """Stop the periodic export"""
+        if self._export_task is not None:
+            self._export_task.cancel()
+            self._export_task = None
+
+    async def _export(self, interval: float, on_export: ExportHandler) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await on_export(self.snapshot())
+            except:  # pylint: disable=bare-except
+                LOG.exception("Failed to export metrics")
+
+
+def _render_histogram(
+        lines: list[str],
+        name: str,
+        histogram: HistogramSnapshot
+) -> None:
+    lines.append(f'# TYPE {name} histogram')
+    cumulative = 0
+    for bound, count in zip(histogram.bounds, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{{le="{bound / 1e9:g}"}} {cumulative}')
+    lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.samples}')
+    lines.append(f'{name}_sum {histogram.total / 1e9:g}')
+    lines.append(f'{name}_count {histogram.samples}')
+
+
+def render_prometheus(snapshot: MetricsSnapshot, prefix: str = 'squawkbus') -> str:
+    """Render a snapshot in the Prometheus text format.
+
+    Args:
+        snapshot (MetricsSnapshot): The snapshot.
+        prefix (str, optional): The prefix of the metric names. Defaults to
+            'squawkbus'.
+
+    Returns:
+        str: The metrics as text.
+    """
+    lines: list[str] = []
+    for name, counts in (
+            ('messages_received_total', snapshot.messages_in),
+            ('bytes_received_total', snapshot.bytes_in),
+            ('messages_sent_total', snapshot.messages_out),
+            ('bytes_sent_total', snapshot.bytes_out),
+    ):
+        lines.append(f'# TYPE {prefix}_{name} counter')
+        for message_type, count in counts.items():
+            lines.append(f'{prefix}_{name}{{message_type="{message_type}"}} {count}')
+    for name, gauge in snapshot.gauges.items():
+        lines.append(f'# TYPE {prefix}_{name} gauge')
+        lines.append(f'{prefix}_{name} {gauge:g}')
+    for name, histogram in snapshot.histograms.items():
+        _render_histogram(lines, f'{prefix}_{name}_seconds', histogram)
+    for operation, stats in (
+            ('compression', snapshot.compression),
+            ('decompression', snapshot.decompression),
+    ):
+        for name, value in (
+                (f'{operation}s_total', stats.operations),
+                (f'{operation}_skipped_total', stats.skipped),
+                (f'{operation}_bytes_in_total', stats.bytes_in),
+                (f'{operation}_bytes_out_total', stats.bytes_out),
+                (f'{operation}_seconds_total', stats.elapsed_ns / 1e9),
+        ):
+            lines.append(f'# TYPE {prefix}_{name} counter')
+            lines.append(f'{prefix}_{name} {value:g}')
+    return '\n'.join(lines) + '\n'
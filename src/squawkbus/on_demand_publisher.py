@@ -0,0 +1,176 @@
+"""On demand publisher"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+import logging
+from typing import Callable
+
+from .callback_client import CallbackClient
+from .data_packet import DataPacket
+from .interest_table import InterestTable
+from .messages import ForwardedSubscriptionRequest
+
+LOG = logging.getLogger(__name__)
+
+ImageProvider = Callable[[str], list[DataPacket] | None]
+
+
+class OnDemandPublisher:
+    """Publish data only for topics that have subscribers.
+
+    The publisher listens for forwarded subscription requests on a topic
+    pattern. When a client first subscribes to a topic it is sent an image
+    of the current state, and subsequent updates are only published for
+    topics with subscribers.
+
+    Image requests are batched. Requests arriving together are collected and
+    sent by a single task, and the image for a topic is fetched once per
+    batch regardless of how many clients requested it. Creating the client
+    with a notification batch window makes the batches larger after a
+    reconnect storm.
+    """
+
+    def __init__(
+            self,
+            client: CallbackClient,
+            get_image: ImageProvider,
+    ) -> None:
+        """Initialise the publisher.
+
+        Args:
+            client (CallbackClient): The client.
+            get_image (ImageProvider): A function returning the data packets
+                for the image of a topic, or None if there is no image.
+        """
+        self._client = client
+        self._get_image = get_image
+        self._interest = InterestTable()
+        self._pending_images: dict[str, dict[str, None]] = {}
+        self._flush_task: Task[None] | None = None
+        self._topic_patterns: list[str] = []
+
+    @property
+    def interest(self) -> InterestTable:
+        """The table of clients subscribed to each topic"""
+        return self._interest
+
+    async def start(self, topic_pattern: str) -> None:
+        """Start listening for subscriptions.
+
+        Args:
+            topic_pattern (str): The pattern of the topics to publish.
+        """
+        if not self._topic_patterns:
+            self._client.notification_batch_handlers.append(
+                self._on_notifications
+            )
+        self._topic_patterns.append(topic_pattern)
+        await self._client.add_notification(topic_pattern)
+
+    async def stop(self) -> None:
+        """Stop listening for subscriptions"""
+        if not self._topic_patterns:
+            return
+        self._client.notification_batch_handlers.remove(self._on_notifications)
+        for topic_pattern in self._topic_patterns:
+            await self._client.remove_notification(topic_pattern)
+        self._topic_patterns.clear()
+        self._interest.clear()
+        self._pending_images.clear()
+
+    def has_interest(self, topic: str) -> bool:
+        """Check if a topic has subscribers.
+
+        Args:
+            topic (str): The topic name.
+
+        Returns:
+            bool: True if the topic has subscribers.
+        """
+        return self._interest.has_interest(topic)
+
+    async def publish(
+            self,
+            topic: str,
+            data_packets: list[DataPacket]
+    ) -> bool:
+        """Publish data if the topic has subscribers.
+
+        Args:
+            topic (str): The topic name.
+            data_packets (list[DataPacket]): The data packets.
+
+        Returns:
+            bool: True if the data was published.
+        """
+        if not self._interest.has_interest(topic):
+            return False
+        await self._client.publish(topic, data_packets)
+        return True
+
+    def remove_client(self, client_id: str) -> None:
+        """Forget all the subscriptions of a client.
+
+        Args:
+            client_id (str): The client identifier.
+        """
+        for topic in self._interest.remove_client(client_id):
+            self._discard_pending(client_id, topic)
+
+    async def _on_notifications(
+            self,
+            messages: list[ForwardedSubscriptionRequest]
+    ) -> None:
+        for message in messages:
+            client_id, topic = message.client_id, message.topic
+            if message.count > 0:
+                if self._interest.update(client_id, topic, message.count):
+                    self._request_image(client_id, topic)
+            elif self._interest.remove(client_id, topic):
+                self._discard_pending(client_id, topic)
+
+    def _request_image(self, client_id: str, topic: str) -> None:
+        clients = self._pending_images.get(topic)
+        if clients is None:
+            clients = self._pending_images[topic] = {}
+        clients[client_id] = None
+
+        if self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_images())
+
+    def _discard_pending(self, client_id: str, topic: str) -> None:
+        clients = self._pending_images.get(topic)
+        if clients is not None:
+            clients.pop(client_id, None)
+            if not clients:
+                del self._pending_images[topic]
+
+    async def flush(self) -> None:
+        """Wait for any pending images to be sent"""
+        if self._flush_task is not None:
+            await self._flush_task
+
+    async def _flush_images(self) -> None:
+        try:
+            # Yield to let any queued notifications join the batch.
+            await asyncio.sleep(0)
+            while self._pending_images:
+                pending, self._pending_images = self._pending_images, {}
+                LOG.debug("sending images for %s topics", len(pending))
+                for topic, clients in pending.items():
+                    try:
+                        data_packets = self._get_image(topic)
+                    except:  # pylint: disable=bare-except
+                        LOG.exception("Failed to get image for %s", topic)
+                        continue
+                    if data_packets is None:
+                        continue
+                    subscribers = self._interest.clients(topic)
+                    for client_id in clients:
+                        if client_id not in subscribers:
+                            continue
+                        await self._client.send(client_id, topic, data_packets)
+        finally:
+            self._flush_task = None
@@ -0,0 +1,207 @@
+"""Payload codecs"""
+
+from __future__ import annotations
+
+import json
+from typing import Any, Protocol
+
+try:
+    import orjson
+except ImportError:
+    # The fast json backend is optional.
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    # The msgpack codec is optional.
+    msgpack = None
+
+CONTENT_TYPE_HEADER = b'content-type'
+
+CONTENT_TYPE_JSON = b'application/json'
+CONTENT_TYPE_MSGPACK = b'application/msgpack'
+CONTENT_TYPE_OCTET_STREAM = b'application/octet-stream'
+CONTENT_TYPE_TEXT = b'text/plain'
+
+
+class PayloadCodec(Protocol):
+    """A codec for packet data"""
+
+    def encode(self, value: Any) -> bytes:
+        ...
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        ...
+
+
+class JsonCodec:
+    """A JSON codec, using orjson when it is installed"""
+
+    def __init__(self, backend: str | None = None) -> None:
+        """Initialise the codec.
+
+        Args:
+            backend (str | None, optional): The backend to use: "orjson" or
+                "json". Defaults to orjson if it is installed.
+
+        Raises:
+            ValueError: If the backend is unknown or not installed.
+        """
+        if backend is None:
+            backend = 'json' if orjson is None else 'orjson'
+        if backend == 'orjson' and orjson is None:
+            raise ValueError("orjson is not installed")
+        if backend not in ('json', 'orjson'):
+            raise ValueError(f"unknown json backend {backend!r}")
+        self.backend = backend
+
+    def encode(self, value: Any) -> bytes:
+        if self.backend == 'orjson':
+            return orjson.dumps(value)
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        if self.backend == 'orjson':
+            return orjson.loads(data)
+        if isinstance(data, memoryview):
+            data = bytes(data)
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """A msgpack codec"""
+
+    def __init__(self) -> None:
+        if msgpack is None:
+            raise ValueError("msgpack is not installed")
+
+    def encode(self, value: Any) -> bytes:
+        return msgpack.packb(value)
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        return msgpack.unpackb(data)
+
+
+class TextCodec:
+    """A codec for text"""
+
+    def __init__(self, encoding: str = 'utf-8') -> None:
+        self.encoding = encoding
+
+    def encode(self, value: Any) -> bytes:
+        return value.encode(self.encoding)
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        return str(data, self.encoding)
+
+
+class RawCodec:
+    """A codec which passes the data through unchanged"""
+
+    def encode(self, value: Any) -> bytes:
+        return value
+
+    def decode(self, data: bytes | memoryview) -> Any:
+        return data
+
+
+def _media_type(content_type: bytes) -> bytes:
+    media_type, _, _ = content_type.partition(b';')
+    return media_type.strip().lower()
+
+
+class CodecRegistry:
+    """A registry of payload codecs keyed by content type"""
+
+    def __init__(self, default: PayloadCodec | None = None) -> None:
+        """Initialise the registry.
+
+        Args:
+            default (PayloadCodec | None, optional): The codec used for packets
+                without a content type. Defaults to a raw codec.
+        """
+        self.default = RawCodec() if default is None else default
+        self._codecs: dict[bytes, PayloadCodec] = {}
+
+    def register(self, content_type: bytes, codec: PayloadCodec) -> None:
+        """Register a codec.
+
+        Args:
+            content_type (bytes): The content type, e.g. b'application/json'.
+            codec (PayloadCodec): The codec.
+        """
+        self._codecs[_media_type(content_type)] = codec
+
+    def unregister(self, content_type: bytes) -> None:
+        """Remove a codec.
+
+        Args:
+            content_type (bytes): The content type.
+        """
+        self._codecs.pop(_media_type(content_type), None)
+
+    def get(self, content_type: bytes | None) -> PayloadCodec:
+        """Find the codec for a content type.
+
+        Parameters of the content type, such as the charset, are ignored.
+
+        Args:
+            content_type (bytes | None): The content type.
+
+        Raises:
+            ValueError: If there is no codec for the content type.
+
+        Returns:
+            PayloadCodec: The codec.
+        """
+        if content_type is None:
+            return self.default
+        codec = self._codecs.get(content_type)
+        if codec is None:
+            codec = self._codecs.get(_media_type(content_type))
+            if codec is None:
+                raise ValueError(f"no codec for content type {content_type!r}")
+        return codec
+
+    def decode(
+            self,
+            headers: dict[bytes, bytes],
+            data: bytes | memoryview
+    ) -> Any:
+        """Decode packet data using the codec for its content type.
+
+        Args:
+            headers (dict[bytes, bytes]): The packet headers.
+            data (bytes | memoryview): The packet data.
+
+        Returns:
+            Any: The decoded value.
+        """
+        return self.get(headers.get(CONTENT_TYPE_HEADER)).decode(data)
+
+    def encode(self, value: Any, content_type: bytes) -> bytes:
+        """Encode a value with the codec for a content type.
+
+        Args:
+            value (Any): The value.
+            content_type (bytes): The content type.
+
+        Returns:
+            bytes: The encoded data.
+        """
+        return self.get(content_type).encode(value)
+
+
+def _make_default_registry() -> CodecRegistry:
+    registry = CodecRegistry()
+    registry.register(CONTENT_TYPE_JSON, JsonCodec())
+    registry.register(CONTENT_TYPE_TEXT, TextCodec())
+    registry.register(CONTENT_TYPE_OCTET_STREAM, RawCodec())
+    if msgpack is not None:
+        registry.register(CONTENT_TYPE_MSGPACK, MsgpackCodec())
+    return registry
+
+
+DEFAULT_CODECS = _make_default_registry()
+"""The codecs used to decode `DataPacket.value`"""
@@ -0,0 +1,317 @@
+"""Payload compression"""
+
+from __future__ import annotations
+
+from time import perf_counter_ns
+from typing import NamedTuple, Protocol
+import zlib
+
+try:
+    from compression import zstd  # type: ignore[import-not-found]
+except ImportError:
+    # zstd is only provided by Python 3.14 and later.
+    zstd = None
+
+CONTENT_ENCODING_HEADER = b'content-encoding'
+
+CONTENT_ENCODING_DEFLATE = b'deflate'
+CONTENT_ENCODING_ZSTD = b'zstd'
+
+DEFAULT_MAX_DECOMPRESSED_SIZE = 256 * 1024 * 1024
+"""The size in bytes above which decompressed data is rejected"""
+
+
+def _check_length(result: bytes, max_length: int | None) -> bytes:
+    if max_length is not None and len(result) > max_length:
+        raise ValueError(f"the decompressed data exceeds {max_length} bytes")
+    return result
+
+
+class Compressor(Protocol):
+    """A compression algorithm"""
+
+    @property
+    def encoding(self) -> bytes:
+        """The value of the content-encoding header"""
+
+    def compress(self, data: bytes | memoryview) -> bytes:
+        ...
+
+    def decompress(self, data: bytes | memoryview, max_length: int | None = None) -> bytes:
+        """Decompress data.
+
+        Args:
+            data (bytes | memoryview): The compressed data.
+            max_length (int | None, optional): If set, the size in bytes
+                above which the decompressed data is rejected, without
+                decompressing the rest. Defaults to None.
+
+        Raises:
+            ValueError: If the decompressed data exceeds the maximum length.
+
+        Returns:
+            bytes: The decompressed data.
+        """
+
+
+class ZlibCompressor:
+    """Compression using zlib, signalled as the "deflate" encoding"""
+
+    encoding = CONTENT_ENCODING_DEFLATE
+
+    def __init__(self, level: int = 6) -> None:
+        self.level = level
+
+    def compress(self, data: bytes | memoryview) -> bytes:
+        return zlib.compress(data, self.level)
+
+    def decompress(self, data: bytes | memoryview, max_length: int | None = None) -> bytes:
+        if max_length is None:
+            return zlib.decompress(data)
+        decompressor = zlib.decompressobj()
+        result = _check_length(decompressor.decompress(data, max_length + 1), max_length)
+        if not decompressor.eof:
+            raise zlib.error("incomplete or truncated stream")
+        return result
+
+
+class ZstdCompressor:
+    """Compression using zstd, where Python provides it"""
+
+    encoding = CONTENT_ENCODING_ZSTD
+
+    def __init__(self, level: int = 3) -> None:
+        if zstd is None:
+            raise ValueError("zstd is not available in this version of Python")
+        self.level = level
+
+    def compress(self, data: bytes | memoryview) -> bytes:
+        return zstd.compress(data, self.level)
+
+    def decompress(self, data: bytes | memoryview, max_length: int | None = None) -> bytes:
+        if max_length is None:
+            return zstd.decompress(data)
+        decompressor = zstd.ZstdDecompressor()
+        result = _check_length(decompressor.decompress(data, max_length + 1), max_length)
+        if not decompressor.eof:
+            raise zstd.ZstdError("incomplete or truncated frame")
+        return result
+
+
+class CompressionSnapshot(NamedTuple):
+    """The state of compression or decompression statistics"""
+    operations: int
+    skipped: int
+    bytes_in: int
+    bytes_out: int
+    elapsed_ns: int
+
+
+class CompressionStats:
+    """Statistics of compression or decompression"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.skipped = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.elapsed_ns = 0
+
+    @property
+    def ratio(self) -> float:
+        """The ratio of uncompressed to compressed bytes"""
+        compressed, uncompressed = (
+            (self.bytes_out, self.bytes_in)
+            if self.bytes_in >= self.bytes_out
+            else (self.bytes_in, self.bytes_out)
+        )
+        return uncompressed / compressed if compressed else 1.0
+
+    def record(self, bytes_in: int, bytes_out: int, elapsed_ns: int) -> None:
+        """Record an operation.
+
+        Args:
+            bytes_in (int): The number of bytes before the operation.
+            bytes_out (int): The number of bytes after the operation.
+            elapsed_ns (int): The time taken in nanoseconds.
+        """
+        self.count += 1
+        self.bytes_in += bytes_in
+        self.bytes_out += bytes_out
+        self.elapsed_ns += elapsed_ns
+
+    def snapshot(self) -> CompressionSnapshot:
+        """Take a snapshot of the statistics.
+
+        Returns:
+            CompressionSnapshot: The snapshot.
+        """
+        return CompressionSnapshot(
+            self.count,
+            self.skipped,
+            self.bytes_in,
+            self.bytes_out,
+            self.elapsed_ns
+        )
+
+    def reset(self) -> None:
+        """Reset the statistics"""
+        self.count = self.skipped = 0
+        self.bytes_in = self.bytes_out = self.elapsed_ns = 0
+
+    def __repr__(self) -> str:
+        return (
+            f'CompressionStats(count={self.count},skipped={self.skipped},'
+            f'bytes_in={self.bytes_in},bytes_out={self.bytes_out},'
+            f'elapsed_ns={self.elapsed_ns})'
+        )
+
+
+def _make_compressors() -> dict[bytes, Compressor]:
+    compressors: dict[bytes, Compressor] = {
+        CONTENT_ENCODING_DEFLATE: ZlibCompressor()
+    }
+    if zstd is not None:
+        compressors[CONTENT_ENCODING_ZSTD] = ZstdCompressor()
+    return compressors
+
+
+DECOMPRESSORS = _make_compressors()
+"""The compressors used to decompress received data, keyed by encoding"""
+
+
+def decompress(
+        encoding: bytes,
+        data: bytes | memoryview,
+        max_length: int | None = DEFAULT_MAX_DECOMPRESSED_SIZE
+) -> bytes:
+    """Decompress data.
+
+    Args:
+        encoding (bytes): The content encoding.
+        data (bytes | memoryview): The compressed data.
+        max_length (int | None, optional): The size in bytes above which the
+            decompressed data is rejected, or None for no limit. Defaults to
+            DEFAULT_MAX_DECOMPRESSED_SIZE.
+
+    Raises:
+        ValueError: If the encoding is unsupported, or the decompressed data
+            exceeds the maximum length.
+
+    Returns:
+        bytes: The decompressed data.
+    """
+    compressor = DECOMPRESSORS.get(encoding)
+    if compressor is None:
+        raise ValueError(f"unsupported content encoding {encoding!r}")
+    return compressor.decompress(data, max_length)
+
+
+class PayloadDecompression:
+    """Decompress the data of received packets.
+
+    Each client has its own decompression, which limits the size of the
+    decompressed data, so a small compressed packet cannot exhaust memory,
+    and records the statistics of the client.
+    """
+
+    def __init__(
+            self,
+            max_length: int | None = DEFAULT_MAX_DECOMPRESSED_SIZE,
+            stats: CompressionStats | None = None
+    ) -> None:
+        """Initialise the decompression.
+
+        Args:
+            max_length (int | None, optional): The size in bytes above which
+                decompressed data is rejected, or None for no limit. Defaults
+                to DEFAULT_MAX_DECOMPRESSED_SIZE.
+            stats (CompressionStats | None, optional): The statistics to
+                record into. Defaults to new statistics.
+        """
+        self.max_length = max_length
+        self.stats = CompressionStats() if stats is None else stats
+
+    def decompress(self, encoding: bytes, data: bytes | memoryview) -> bytes:
+        """Decompress data, and record the statistics.
+
+        Args:
+            encoding (bytes): The content encoding.
+            data (bytes | memoryview): The compressed data.
+
+        Raises:
+            ValueError: If the encoding is unsupported, or the decompressed
+                data exceeds the maximum length.
+
+        Returns:
+            bytes: The decompressed data.
+        """
+        start = perf_counter_ns()
+        result = decompress(encoding, data, self.max_length)
+        self.stats.record(len(data), len(result), perf_counter_ns() - start)
+        return result
+
+
+class PayloadCompression:
+    """Compress the data of packets above a size threshold.
+
+    Compressed packets carry a `content-encoding` header naming the
+    algorithm, and are decompressed transparently by the receiver. Packets
+    which are already encoded, or which do not get smaller, are left alone.
+    """
+
+    def __init__(
+            self,
+            compressor: Compressor | None = None,
+            threshold: int = 1024
+    ) -> None:
+        """Initialise the compression.
+
+        Args:
+            compressor (Compressor | None, optional): The compressor. Defaults
+                to zlib.
+            threshold (int, optional): The size in bytes above which data is
+                compressed. Defaults to 1024.
+        """
+        self.compressor = ZlibCompressor() if compressor is None else compressor
+        self.threshold = threshold
+        self.stats = CompressionStats()
+
+    def compress(
+            self,
+            headers: dict[bytes, bytes],
+            data: bytes | memoryview,
+            stats: CompressionStats | None = None
+    ) -> tuple[dict[bytes, bytes], bytes | memoryview]:
+        """Compress packet data if it is above the threshold.
+
+        Args:
+            headers (dict[bytes, bytes]): The packet headers.
+            data (bytes | memoryview): The packet data.
+            stats (CompressionStats | None, optional): Further statistics to
+                record into, such as those of the metrics of a client.
+                Defaults to None.
+
+        Returns:
+            tuple[dict[bytes, bytes], bytes | memoryview]: The headers and
+                data to send.
+        """
+        if len(data) <= self.threshold or CONTENT_ENCODING_HEADER in headers:
+            return headers, data
+
+        start = perf_counter_ns()
+        compressed = self.compressor.compress(data)
+        elapsed_ns = perf_counter_ns() - start
+
+        if len(compressed) >= len(data):
+            self.stats.skipped += 1
+            if stats is not None:
+                stats.skipped += 1
+            return headers, data
+
+        self.stats.record(len(data), len(compressed), elapsed_ns)
+        if stats is not None:
+            stats.record(len(data), len(compressed), elapsed_ns)
+        headers = dict(headers)
+        headers[CONTENT_ENCODING_HEADER] = self.compressor.encoding
+        return headers, compressed
@@ -0,0 +1,226 @@
+"""Fixed layout record schemas"""
+
+from __future__ import annotations
+
+import re
+import struct
+from typing import TYPE_CHECKING, Any, Sequence
+
+from .data_packet import DataPacket
+from .delta import as_mapping
+from .payload_codecs import CONTENT_TYPE_HEADER
+
+try:
+    import numpy as np
+except ImportError:
+    # numpy is optional.
+    np = None  # type: ignore[assignment]
+
+if TYPE_CHECKING:
+    from numpy.typing import NDArray
+
+CONTENT_TYPE_RECORD = b'application/x-record'
+
+SCHEMA_HEADER = b'x-schema'
+
+FIELD_TYPES: dict[str, tuple[str, str]] = {
+    'bool': ('?', '?'),
+    'int8': ('b', 'i1'),
+    'uint8': ('B', 'u1'),
+    'int16': ('h', '<i2'),
+    'uint16': ('H', '<u2'),
+    'int32': ('i', '<i4'),
+    'uint32': ('I', '<u4'),
+    'int64': ('q', '<i8'),
+    'uint64': ('Q', '<u8'),
+    'float32': ('f', '<f4'),
+    'float64': ('d', '<f8'),
+}
+"""The primitive field types, with their struct and numpy formats"""
+
+_BYTES_TYPE = re.compile(r'^(bytes|str)(\d+)$')
+
+
+def _require_numpy() -> None:
+    if np is None:
+        raise ImportError(
+            "numpy is required for structured arrays: install squawkbus[numpy]"
+        )
+
+
+def _field_formats(field_type: str) -> tuple[str, str]:
+    formats = FIELD_TYPES.get(field_type)
+    if formats is not None:
+        return formats
+    match = _BYTES_TYPE.match(field_type)
+    if match is None:
+        raise ValueError(f"unknown field type {field_type!r}")
+    size = int(match.group(2))
+    return f'{size}s', f'S{size}'
+
+
+class RecordSchema:
+    """A fixed layout binary record.
+
+    A schema is a named sequence of fields, each with a primitive type from
+    `FIELD_TYPES`, or a fixed length "bytesN" or "strN" (utf-8 text padded
+    with nulls). Records are packed little-endian with no padding, and are
+    encoded with a compiled `struct.Struct`. A batch of packets with the same
+    schema can be decoded into a numpy structured array in one step.
+    """
+
+    def __init__(self, name: str, fields: Sequence[tuple[str, str]]) -> None:
+        """Initialise the schema.
+
+        Args:
+            name (str): The schema name, sent in the `x-schema` header.
+            fields (Sequence[tuple[str, str]]): The field names and types.
+        """
+        self.name = name
+        self.fields = tuple(fields)
+        self._names = tuple(field_name for field_name, _ in self.fields)
+        self._text_fields = frozenset(
+            field_name
+            for field_name, field_type in self.fields
+            if field_type.startswith('str')
+        )
+        formats = [_field_formats(field_type) for _, field_type in self.fields]
+        self.struct = struct.Struct('<' + ''.join(fmt for fmt, _ in formats))
+        self._numpy_formats = [numpy_format for _, numpy_format in formats]
+        self._dtype: Any = None
+        self._header = name.encode('utf-8')
+
+    @property
+    def size(self) -> int:
+        """The size of an encoded record in bytes"""
+        return self.struct.size
+
+    @property
+    def dtype(self) -> Any:
+        """The numpy structured dtype of the record"""
+        if self._dtype is None:
+            _require_numpy()
+            self._dtype = np.dtype(list(zip(self._names, self._numpy_formats)))
+        return self._dtype
+
+    def encode(self, record: Any) -> bytes:
+        """Encode a record.
+
+        Args:
+            record (Any): A mapping, named tuple or dataclass with the fields
+                of the schema.
+
+        Returns:
+            bytes: The encoded record.
+        """
+        values = as_mapping(record)
+        return self.struct.pack(*(
+            values[field_name].encode('utf-8')
+            if field_name in self._text_fields
+            else values[field_name]
+            for field_name in self._names
+        ))
+
+    def decode(self, data: bytes | memoryview) -> dict[str, Any]:
+        """Decode a record.
+
+        Args:
+            data (bytes | memoryview): The encoded record.
+
+        Returns:
+            dict[str, Any]: The fields.
+        """
+        return {
+            field_name: (
+                value.rstrip(b'\0').decode('utf-8')
+                if field_name in self._text_fields
+                else value
+            )
+            for field_name, value in zip(self._names, self.struct.unpack(data))
+        }
+
+    def to_data_packet(
+            self,
+            *records: Any,
+            entitlements: set[int] | None = None,
+            headers: dict[bytes, bytes] | None = None
+    ) -> DataPacket:
+        """Create a data packet holding one or more records.
+
+        Args:
+            *records (Any): The records.
+            entitlements (set[int] | None, optional): The entitlements.
+                Defaults to {0}.
+            headers (dict[bytes, bytes] | None, optional): Additional headers.
+                Defaults to None.
+
+        Returns:
+            DataPacket: The data packet.
+        """
+        packet_headers = {
+            CONTENT_TYPE_HEADER: CONTENT_TYPE_RECORD,
+            SCHEMA_HEADER: self._header,
+        }
+        if headers is not None:
+            packet_headers.update(headers)
+        return DataPacket(
+            {0} if entitlements is None else entitlements,
+            packet_headers,
+            b''.join(self.encode(record) for record in records)
+        )
+
+    def matches(self, packet: DataPacket) -> bool:
+        """Check if a packet holds records of this schema.
+
+        Args:
+            packet (DataPacket): The data packet.
+
+        Returns:
+            bool: True if the packet has this schema.
+        """
+        return packet.headers.get(SCHEMA_HEADER) == self._header
+
+    def decode_packet(self, packet: DataPacket) -> list[dict[str, Any]]:
+        """Decode the records in a packet.
+
+        Args:
+            packet (DataPacket): The data packet.
+
+        Returns:
+            list[dict[str, Any]]: The records.
+        """
+        data = packet.data
+        return [
+            self.decode(data[offset:offset + self.size])
+            for offset in range(0, len(data), self.size)
+        ]
+
+    def decode_batch(self, data_packets: Sequence[DataPacket]) -> NDArray:
+        """Decode the records of many packets into a structured array.
+
+        Packets with a different schema are skipped. The data is gathered into
+        a single buffer and viewed as a structured array, so there is no per
+        record or per field decoding. Text fields are returned as null padded
+        bytes.
+
+        Args:
+            data_packets (Sequence[DataPacket]): The data packets.
+
+        Raises:
+            ImportError: If numpy is not installed.
+            ValueError: If the data is not a whole number of records.
+
+        Returns:
+            NDArray: A read-only structured array with a row per record.
+        """
+        _require_numpy()
+        buf = b''.join(
+            packet.data
+            for packet in data_packets
+            if self.matches(packet)
+        )
+        if len(buf) % self.size != 0:
+            raise ValueError(f"data is not a whole number of {self.name} records")
+        array = np.frombuffer(buf, dtype=self.dtype)
+        array.flags.writeable = False
+        return array
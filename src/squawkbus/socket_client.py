@@ -6,6 +6,7 @@ from pathlib import Path
 from ssl import SSLContext
 
 from .callback_client import CallbackClient
+from .client_options import ClientOptions
 from .socket_stream import SocketStream
 from .utils import make_ssl_context
 
@@ -20,6 +21,7 @@ class SocketClient(CallbackClient):
             port: int = 8558,
             *,
             credentials: tuple[str, str] | None = None,
+            options: ClientOptions | None = None,
             ssl: SSLContext | str | Path | bool | None = None,
             auto_start: bool = True
     ) -> SocketClient:
@@ -31,6 +33,8 @@ class SocketClient(CallbackClient):
             credentials (tuple[str, str] | None, optional): Optional credentials.
                 If specified this is a tuple of the username and password.
                 Defaults to None.
+            options (ClientOptions | None, optional): The optional features
+                of the client. Defaults to None.
             ssl (SSLContext | str | Path | bool | None, optional): An optional ssl
                 parameter. If None or false, TLS is not used. If true a default
                 ssl context is made. A string is used as the path to a bundle,
@@ -42,9 +46,21 @@ class SocketClient(CallbackClient):
         Returns:
             SquawkbusClient: The squawkbus client
         """
-        stream = await SocketStream.create(host, port, make_ssl_context(ssl))
+        if options is None:
+            options = ClientOptions()
+        stream = await SocketStream.create(
+            host,
+            port,
+            make_ssl_context(ssl),
+            max_frame_size=options.max_frame_size,
+            max_memory_frame_size=options.max_memory_frame_size
+        )
 
-        client = cls(stream, credentials=credentials)
+        client = cls(
+            stream,
+            credentials=credentials,
+            options=options
+        )
         if auto_start:
             await client.start()
 
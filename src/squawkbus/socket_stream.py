@@ -5,21 +5,53 @@ from __future__ import annotations
 import asyncio
 from asyncio import StreamReader, StreamWriter
 import logging
+from mmap import mmap
 from ssl import SSLContext
 import struct
+import tempfile
 
 from .types import MessageStream
 
 LOG = logging.getLogger(__name__)
 
+SPILL_READ_SIZE = 1024 * 1024
+
+DEFAULT_MAX_FRAME_SIZE = 256 * 1024 * 1024
+"""The size in bytes above which a received frame is rejected by default"""
+
 
 class SocketStream(MessageStream):
     """A frame is a buffer that is transmitted as a 4 byte length, followed by
-    the bytes."""
+    the bytes.
+
+    Frames larger than the maximum in-memory frame size are read in pieces
+    into a memory-mapped temporary file, rather than a single bytes object.
+    """
 
-    def __init__(self, reader: StreamReader, writer: StreamWriter) -> None:
+    def __init__(
+            self,
+            reader: StreamReader,
+            writer: StreamWriter,
+            *,
+            max_frame_size: int | None = DEFAULT_MAX_FRAME_SIZE,
+            max_memory_frame_size: int | None = None
+    ) -> None:
+        """Initialise the stream.
+
+        Args:
+            reader (StreamReader): The stream reader.
+            writer (StreamWriter): The stream writer.
+            max_frame_size (int | None, optional): The size in bytes above
+                which a frame is rejected, or None for no limit. Defaults to
+                DEFAULT_MAX_FRAME_SIZE.
+            max_memory_frame_size (int | None, optional): The size in bytes
+                above which a frame is spilled to a memory-mapped temporary
+                file. Defaults to None.
+        """
         self._reader = reader
         self._writer = writer
+        self.max_frame_size = max_frame_size
+        self.max_memory_frame_size = max_memory_frame_size
 
     @classmethod
     async def create(
@@ -27,31 +59,67 @@ class SocketStream(MessageStream):
             host: str = 'localhost',
             port: int = 8558,
             ssl: SSLContext | None = None,
+            *,
+            max_frame_size: int | None = DEFAULT_MAX_FRAME_SIZE,
+            max_memory_frame_size: int | None = None
     ) -> SocketStream:
         reader, writer = await asyncio.open_connection(host, port, ssl=ssl)
 
-        return SocketStream(reader, writer)
+        return SocketStream(
+            reader,
+            writer,
+            max_frame_size=max_frame_size,
+            max_memory_frame_size=max_memory_frame_size
+        )
 
-    async def read(self) -> bytes:
+    async def read(self) -> bytes | mmap:
         """Read a frame from the input stream.
 
         The stream starts with a 4 byte network-order integer, which holds the
         length of the following data.
 
+        Raises:
+            ValueError: If the length is negative or above the maximum frame
+                size.
+
         Returns:
-            bytes: The frame contents.
+            bytes | mmap: The frame contents.
         """
         buf = await self._reader.readexactly(4)
         (count,) = struct.unpack('>i', buf)
+        if count < 0 or (
+                self.max_frame_size is not None and
+                count > self.max_frame_size
+        ):
+            raise ValueError(f"invalid frame size {count}")
+        if (
+                self.max_memory_frame_size is not None and
+                count > self.max_memory_frame_size
+        ):
+            return await self._read_to_file(count)
         LOG.debug("reading %s bytes", count)
         buf = await self._reader.readexactly(count)
         return buf
 
-    async def write(self, buf: bytes) -> None:
+    async def _read_to_file(self, count: int) -> mmap:
+        LOG.debug("reading %s bytes to a temporary file", count)
+        with tempfile.TemporaryFile() as file:
+            file.truncate(count)
+            buf = mmap(file.fileno(), count)
+        offset = 0
+        while offset < count:
+            data = await self._reader.readexactly(
+                min(SPILL_READ_SIZE, count - offset)
+            )
+            buf[offset:offset + len(data)] = data
+            offset += len(data)
+        return buf
+
+    async def write(self, buf: bytes | bytearray) -> None:
         """Write a frame to the output stream.
 
         Args:
-            buf (bytes): The data to write.
+            buf (bytes | bytearray): The data to write.
         """
         count = len(buf)
         LOG.debug("writing %s bytes", count)
@@ -0,0 +1,97 @@
+"""String cache"""
+
+from __future__ import annotations
+
+from collections import OrderedDict
+import sys
+
+
+def _lookup_key(buf: memoryview) -> bytes:
+    # A memoryview over immutable bytes hashes and compares as the bytes it
+    # views, so it can be looked up without being copied.
+    if buf.readonly and isinstance(buf.obj, bytes):
+        return buf  # type: ignore[return-value]
+    return bytes(buf)
+
+
+class StringCache:
+    """A bounded cache of decoded strings, keyed by their encoded bytes.
+
+    The host, user, topic and client identifiers of received messages come
+    from a small, repetitive set. Looking them up by the raw bytes avoids a
+    decode and an allocation for each message, and the cached strings are
+    interned, so they hash and compare by identity. The least recently used
+    entries are evicted when the cache is full. Long values are not cached.
+
+    The cache is not shared between owners: each client, and the broker, has
+    its own, and passes it to the readers of its frames.
+    """
+
+    def __init__(self, max_entries: int = 4096, max_length: int = 256) -> None:
+        """Initialise the cache.
+
+        Args:
+            max_entries (int, optional): The maximum number of entries of
+                each kind. Defaults to 4096.
+            max_length (int, optional): The maximum length of an encoded value
+                to cache. Defaults to 256.
+        """
+        if max_entries <= 0:
+            raise ValueError("max_entries must be positive")
+        self.max_entries = max_entries
+        self.max_length = max_length
+        self._strings: OrderedDict[bytes, str] = OrderedDict()
+        self._bytes: OrderedDict[bytes, bytes] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._strings) + len(self._bytes)
+
+    def decode(self, buf: memoryview) -> str:
+        """Decode a UTF-8 string.
+
+        Args:
+            buf (memoryview): A read-only view of the encoded string.
+
+        Returns:
+            str: The string.
+        """
+        if len(buf) > self.max_length:
+            return str(buf, 'utf-8')
+        key = _lookup_key(buf)
+        value = self._strings.get(key)
+        if value is not None:
+            self._strings.move_to_end(key)
+            return value
+        key = bytes(buf)
+        value = sys.intern(key.decode('utf-8'))
+        self._strings[key] = value
+        if len(self._strings) > self.max_entries:
+            self._strings.popitem(last=False)
+        return value
+
+    def intern_bytes(self, buf: memoryview) -> bytes:
+        """Get a shared bytes object for a value.
+
+        Args:
+            buf (memoryview): A read-only view of the value.
+
+        Returns:
+            bytes: The bytes.
+        """
+        if len(buf) > self.max_length:
+            return bytes(buf)
+        key = _lookup_key(buf)
+        value = self._bytes.get(key)
+        if value is not None:
+            self._bytes.move_to_end(key)
+            return value
+        value = bytes(buf)
+        self._bytes[value] = value
+        if len(self._bytes) > self.max_entries:
+            self._bytes.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        """Remove all entries"""
+        self._strings.clear()
+        self._bytes.clear()
@@ -0,0 +1,57 @@
+"""Topic patterns"""
+
+from __future__ import annotations
+
+import re
+
+_METACHARACTERS = frozenset('^$*+?{}[]\\|()')
+# The characters which can make the character before them optional.
+_QUANTIFIERS = frozenset('*?{')
+
+
+def is_literal(pattern: str) -> bool:
+    """Check if a topic pattern only matches itself.
+
+    Topics are conventionally dotted names, so a '.' is taken literally
+    unless the pattern has other metacharacters.
+
+    Args:
+        pattern (str): The pattern.
+
+    Returns:
+        bool: True if the pattern is a literal topic.
+    """
+    return _METACHARACTERS.isdisjoint(pattern)
+
+
+def literal_prefix(pattern: str) -> str:
+    """The literal text every topic matching a regular expression starts with.
+
+    Args:
+        pattern (str): The regular expression.
+
+    Returns:
+        str: The prefix, which may be empty.
+    """
+    if '|' in pattern:
+        return ''
+    for index, char in enumerate(pattern):
+        if char == '.' or char in _METACHARACTERS:
+            return pattern[:index - 1 if char in _QUANTIFIERS else index]
+    return pattern
+
+
+def topic_matches(pattern: str, topic: str) -> bool:
+    """Check if a topic pattern matches a topic.
+
+    Args:
+        pattern (str): The pattern, which is a regular expression that must
+            match the whole topic, or a literal topic.
+        topic (str): The topic.
+
+    Returns:
+        bool: True if the pattern matches the topic.
+    """
+    if is_literal(pattern):
+        return pattern == topic
+    return re.fullmatch(pattern, topic) is not None
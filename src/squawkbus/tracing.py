@@ -0,0 +1,116 @@
+"""Pipeline tracing"""
+
+from __future__ import annotations
+
+from enum import Enum
+from typing import Callable
+import weakref
+
+from .messages import Message
+from .metrics import LatencyHistogram
+
+
+class TraceStage(Enum):
+    """The stages of the read and write pipelines"""
+    RECEIVED = 'received'
+    """A frame has been read from the stream"""
+    DECODED = 'decoded'
+    """The frame has been decoded into a message"""
+    DEQUEUED = 'dequeued'
+    """The message has been taken from the read queue"""
+    HANDLER_STARTED = 'handler_started'
+    """A data handler has been called"""
+    HANDLER_FINISHED = 'handler_finished'
+    """A data handler has returned"""
+    DISPATCHED = 'dispatched'
+    """The message has been passed to all of the handlers"""
+    PUBLISHED = 'published'
+    """Data has been published or sent, and added to the write queue"""
+    WRITE_DEQUEUED = 'write_dequeued'
+    """The message has been taken from the write queue"""
+    SERIALIZED = 'serialized'
+    """The message has been serialized into a frame"""
+    WRITTEN = 'written'
+    """The frame has been written to the stream, and the stream drained"""
+
+
+Tracer = Callable[[TraceStage, Message, int], None]
+"""Called with the stage, the message, and the time from `perf_counter_ns`"""
+
+FINAL_STAGES = frozenset((TraceStage.DISPATCHED, TraceStage.WRITTEN))
+
+
+class StageLatencyTracer:
+    """A tracer which records the time spent reaching each stage.
+
+    For each message the time since its previous stage is recorded in a
+    latency histogram for the stage, so the histogram for `DEQUEUED` holds
+    the time messages waited in the read queue, and the histogram for
+    `HANDLER_FINISHED` holds the time taken by the handlers.
+
+    The time of the previous stage is held until the message reaches a final
+    stage, or is garbage collected, through a weak reference, so messages
+    which are dropped part way do not leak entries, and the identity of a
+    collected message is never mistaken for a new one.
+    """
+
+    def __init__(self, significant_bits: int = 7) -> None:
+        """Initialise the tracer.
+
+        Args:
+            significant_bits (int, optional): The precision of the
+                histograms. Defaults to 7.
+        """
+        self.histograms = {
+            stage: LatencyHistogram(significant_bits)
+            for stage in TraceStage
+        }
+        self._previous: dict[int, tuple[weakref.ref[Message], int]] = {}
+
+    @property
+    def pending(self) -> int:
+        """The number of messages which have not reached a final stage"""
+        return len(self._previous)
+
+    def __call__(self, stage: TraceStage, message: Message, timestamp: int) -> None:
+        key = id(message)
+        entry = self._previous.get(key)
+        if entry is not None:
+            self.histograms[stage].record(timestamp - entry[1])
+        if stage in FINAL_STAGES:
+            self._previous.pop(key, None)
+        elif entry is not None:
+            self._previous[key] = (entry[0], timestamp)
+        else:
+            previous = self._previous
+            self._previous[key] = (
+                weakref.ref(message, lambda _: previous.pop(key, None)),
+                timestamp
+            )
+
+    def summary(self, percentiles: tuple[float, ...] = (50, 99, 99.9)) -> dict[str, dict[str, int]]:
+        """Summarise the recorded latencies.
+
+        Args:
+            percentiles (tuple[float, ...], optional): The percentiles to
+                report. Defaults to (50, 99, 99.9).
+
+        Returns:
+            dict[str, dict[str, int]]: The count, percentiles and maximum in
+                nanoseconds of each stage with recorded latencies.
+        """
+        return {
+            stage.value: {
+                'count': histogram.count,
+                **{f'p{percentile:g}': histogram.percentile(percentile) for percentile in percentiles},
+                'max': histogram.max,
+            }
+            for stage, histogram in self.histograms.items()
+            if histogram.count
+        }
+
+    def reset(self) -> None:
+        """Reset the histograms"""
+        for histogram in self.histograms.values():
+            histogram.reset()
+        self._previous.clear()
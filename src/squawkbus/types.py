@@ -1,14 +1,20 @@
 """Types"""
 
+from mmap import mmap
 from typing import Protocol
 
+Frame = bytes | bytearray | mmap
+"""A received frame. A frame may be the buffer its writer wrote, or a mapped
+file, rather than a copy, so neither end may change it once it is written,
+and data read from it may be views over it."""
+
 
 class MessageStream(Protocol):
 
-    async def write(self, buf: bytes) -> None:
+    async def write(self, buf: bytes | bytearray) -> None:
         ...
 
-    async def read(self) -> bytes:
+    async def read(self) -> Frame:
         ...
 
     async def close(self) -> None:
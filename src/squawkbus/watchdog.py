@@ -0,0 +1,282 @@
+"""Event loop lag and slow handler detection"""
+
+from __future__ import annotations
+
+import asyncio
+from asyncio import Task
+import logging
+import time
+from typing import Any, Awaitable, Callable, Generator, NamedTuple
+
+from .data_reader import decode_name
+from .metrics import LatencyHistogram
+
+LOG = logging.getLogger(__name__)
+
+
+class SlowHandler(NamedTuple):
+    """The slow calls of a handler on a topic"""
+    handler: str
+    """The qualified name of the handler"""
+    topic: str
+    """The topic, or empty for handlers without one"""
+    calls: int
+    """The number of calls which blocked the event loop over the threshold"""
+    total_ns: int
+    """The total time the calls blocked the event loop"""
+    max_ns: int
+    """The longest time a call blocked the event loop"""
+    max_elapsed_ns: int
+    """The longest time a call took, including the time it awaited"""
+
+
+class WatchdogReport(NamedTuple):
+    """The lag and slow handlers seen in an interval"""
+    interval: float
+    max_lag_ns: int
+    """The longest the event loop was blocked"""
+    lag_p99_ns: int
+    slow_handlers: list[SlowHandler]
+    """The slowest handlers, by the longest call"""
+
+
+ReportHandler = Callable[[WatchdogReport], Awaitable[None]]
+
+
+def handler_name(handler: Any) -> str:
+    """The qualified name of a handler.
+
+    Args:
+        handler (Any): The handler.
+
+    Returns:
+        str: The qualified name of the handler, or of its type when it has
+            none.
+    """
+    name = getattr(handler, '__qualname__', None)
+    return name if isinstance(name, str) else type(handler).__qualname__
+
+
+class _BlockingTimer:
+    """Await an awaitable, timing the steps it runs on the event loop.
+
+    Each step runs from when the awaitable is resumed until it next
+    suspends, so the sum of the steps is the time it blocked the event loop,
+    and excludes the time spent waiting for the things it awaited.
+    """
+
+    def __init__(self, awaitable: Awaitable[Any]) -> None:
+        self._awaitable = awaitable
+        self.blocking_ns = 0
+
+    def __await__(self) -> Generator[Any, Any, Any]:
+        iterator = self._awaitable.__await__()
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            start = time.perf_counter_ns()
+            try:
+                if error is None:
+                    yielded = iterator.send(value)
+                else:
+                    yielded = iterator.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.blocking_ns += time.perf_counter_ns() - start
+            try:
+                value, error = (yield yielded), None
+            except BaseException as exc:  # pylint: disable=broad-exception-caught
+                value, error = None, exc
+
+
+class Watchdog:
+    """Detect event loop lag and slow handlers.
+
+    A probe sleeps for a short time in a loop, and the time it wakes late is
+    the event loop lag, when something was blocking the loop. A client
+    created with the watchdog times each call of a data, notification or
+    closed handler, and calls over the threshold are attributed to the
+    handler and topic.
+
+    A handler call is slow when it blocks the event loop: the time it runs
+    between awaits is measured separately from the time it waits for the
+    things it awaits, such as I/O, while other tasks run. Only the blocking
+    time is compared with the threshold, and the elapsed time is reported
+    alongside it.
+
+    At each interval the report is passed to the report handler. Without a
+    handler a warning is logged when the lag or a handler call exceeded the
+    threshold.
+    """
+
+    def __init__(
+            self,
+            interval: float = 10.0,
+            threshold: float = 0.01,
+            *,
+            probe_interval: float = 0.05,
+            top: int = 5,
+            on_report: ReportHandler | None = None
+    ) -> None:
+        """Initialise the watchdog.
+
+        Args:
+            interval (float, optional): The number of seconds between
+                reports. Defaults to 10.0.
+            threshold (float, optional): The number of seconds above which
+                lag or a handler call is reported. Defaults to 0.01.
+            probe_interval (float, optional): The number of seconds between
+                lag probes. Defaults to 0.05.
+            top (int, optional): The number of slow handlers reported.
+                Defaults to 5.
+            on_report (ReportHandler | None, optional): Called with each
+                report. Defaults to None, to log reports over the threshold.
+        """
+        self.interval = interval
+        self.threshold_ns = int(threshold * 1e9)
+        self.probe_interval = probe_interval
+        self.top = top
+        self.on_report = on_report
+        self.lag = LatencyHistogram()
+        self._slow: dict[tuple[str, str], list[int]] = {}
+        self._tasks: list[Task[None]] = []
+
+    async def time_handler(
+            self,
+            handler: Any,
+            topic: str | bytes,
+            awaitable: Awaitable[None]
+    ) -> None:
+        """Await a handler call, and record the time it took.
+
+        Args:
+            handler (Any): The handler.
+            topic (str | bytes): The topic name, encoded in bytes mode, or
+                empty for handlers without one.
+            awaitable (Awaitable[None]): The result of calling the handler.
+        """
+        timer = _BlockingTimer(awaitable)
+        started = time.perf_counter_ns()
+        try:
+            await timer
+        finally:
+            self.record_handler(
+                handler,
+                topic,
+                timer.blocking_ns,
+                time.perf_counter_ns() - started
+            )
+
+    def record_handler(
+            self,
+            handler: Any,
+            topic: str | bytes,
+            blocking_ns: int,
+            elapsed_ns: int
+    ) -> None:
+        """Record the time taken by a handler call.
+
+        Args:
+            handler (Any): The handler.
+            topic (str | bytes): The topic name, encoded in bytes mode.
+            blocking_ns (int): The time in nanoseconds the call blocked the
+                event loop.
+            elapsed_ns (int): The time in nanoseconds from the call to its
+                completion, including the time it awaited.
+        """
+        if blocking_ns <= self.threshold_ns:
+            return
+        key = (handler_name(handler), decode_name(topic))
+        stats = self._slow.get(key)
+        if stats is None:
+            self._slow[key] = [1, blocking_ns, blocking_ns, elapsed_ns]
+        else:
+            stats[0] += 1
+            stats[1] += blocking_ns
+            stats[2] = max(stats[2], blocking_ns)
+            stats[3] = max(stats[3], elapsed_ns)
+
+    def record_lag(self, lag_ns: int) -> None:
+        """Record event loop lag.
+
+        Args:
+            lag_ns (int): The time in nanoseconds a probe woke late.
+        """
+        self.lag.record(max(lag_ns, 0))
+
+    def report(self) -> WatchdogReport:
+        """Report the lag and slow handlers, and reset them.
+
+        Returns:
+            WatchdogReport: The report.
+        """
+        slow_handlers = sorted(
+            (
+                SlowHandler(handler, topic, *stats)
+                for (handler, topic), stats in self._slow.items()
+            ),
+            key=lambda slow_handler: slow_handler.max_ns,
+            reverse=True
+        )[:self.top]
+        report = WatchdogReport(
+            self.interval,
+            self.lag.max,
+            self.lag.percentile(99),
+            slow_handlers
+        )
+        self.lag.reset()
+        self._slow.clear()
+        return report
+
+    def start(self) -> None:
+        """Start probing and reporting"""
+        if self._tasks:
+            return
+        self._tasks = [
+            asyncio.create_task(self._probe()),
+            asyncio.create_task(self._report()),
+        ]
+
+    def stop(self) -> None:
+        """Stop probing and reporting"""
+        for task in self._tasks:
+            task.cancel()
+        self._tasks = []
+
+    async def _probe(self) -> None:
+        while True:
+            expected = time.monotonic_ns() + int(self.probe_interval * 1e9)
+            await asyncio.sleep(self.probe_interval)
+            self.record_lag(time.monotonic_ns() - expected)
+
+    async def _report(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            report = self.report()
+            try:
+                if self.on_report is not None:
+                    await self.on_report(report)
+                else:
+                    self._log(report)
+            except:  # pylint: disable=bare-except
+                LOG.exception("Failed to report")
+
+    def _log(self, report: WatchdogReport) -> None:
+        if report.max_lag_ns > self.threshold_ns:
+            LOG.warning(
+                "event loop lag max %.1fms p99 %.1fms",
+                report.max_lag_ns / 1e6,
+                report.lag_p99_ns / 1e6
+            )
+        for slow_handler in report.slow_handlers:
+            LOG.warning(
+                "handler %s on topic %s blocked over the threshold %d times, "
+                "max %.1fms total %.1fms, max elapsed %.1fms",
+                slow_handler.handler,
+                slow_handler.topic,
+                slow_handler.calls,
+                slow_handler.max_ns / 1e6,
+                slow_handler.total_ns / 1e6,
+                slow_handler.max_elapsed_ns / 1e6
+            )
@@ -6,6 +6,7 @@ from pathlib import Path
 from ssl import SSLContext
 
 from .callback_client import CallbackClient
+from .client_options import ClientOptions
 from .utils import make_ssl_context
 from .websocket_stream import WebsocketStream
 
@@ -20,6 +21,7 @@ class WebsocketClient(CallbackClient):
             port: int = 8559,
             *,
             credentials: tuple[str, str] | None = None,
+            options: ClientOptions | None = None,
             ssl: SSLContext | str | Path | bool | None = None,
             auto_start: bool = True
     ) -> WebsocketClient:
@@ -31,6 +33,8 @@ class WebsocketClient(CallbackClient):
             credentials (tuple[str, str] | None, optional): Optional credentials.
                 If specified this is a tuple of the username and password.
                 Defaults to None.
+            options (ClientOptions | None, optional): The optional features
+                of the client. Defaults to None.
             ssl (SSLContext | str | Path | bool | None, optional): An optional ssl
                 parameter. If None or false, TLS is not used. If true a default
                 ssl context is made. A string is used as the path to a bundle,
@@ -39,15 +43,34 @@ class WebsocketClient(CallbackClient):
             auto_start (bool, optional): If true automatically start the client.
                 Defaults to True.
 
+        Raises:
+            ValueError: If the options set a maximum in-memory frame size, as
+                websocket frames are always read into memory.
+
         Returns:
             SquawkbusClient: The squawkbus client
         """
+        if options is None:
+            options = ClientOptions()
+        if options.max_memory_frame_size is not None:
+            raise ValueError(
+                "websocket frames cannot be spilled to a file: "
+                "max_memory_frame_size is only supported by socket clients"
+            )
         scheme = 'ws' if ssl is None else 'wss'
         uri = f"{scheme}://{host}:{port}"
 
-        stream = await WebsocketStream.create(uri, make_ssl_context(ssl))
+        stream = await WebsocketStream.create(
+            uri,
+            make_ssl_context(ssl),
+            max_frame_size=options.max_frame_size
+        )
 
-        client = cls(stream, credentials=credentials)
+        client = cls(
+            stream,
+            credentials=credentials,
+            options=options
+        )
         if auto_start:
             await client.start()
 
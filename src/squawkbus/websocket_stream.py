@@ -10,6 +10,8 @@ except ImportError:
     # The websocket client is optional.
     pass
 
+from .socket_stream import DEFAULT_MAX_FRAME_SIZE
+
 
 class WebsocketStream:
 
@@ -21,12 +23,28 @@ class WebsocketStream:
             cls,
             uri: str = 'ws://localhost:8533',
             ssl: SSLContext | None = None,
+            *,
+            max_frame_size: int | None = DEFAULT_MAX_FRAME_SIZE
     ) -> WebsocketStream:
-        websocket = await connect(uri, ssl=ssl)
+        """Connect to a websocket server.
+
+        Args:
+            uri (str, optional): The server address. Defaults to
+                'ws://localhost:8533'.
+            ssl (SSLContext | None, optional): The TLS context. Defaults to
+                None.
+            max_frame_size (int | None, optional): The size in bytes above
+                which a received frame is rejected, or None for no limit.
+                Defaults to DEFAULT_MAX_FRAME_SIZE.
+
+        Returns:
+            WebsocketStream: The stream.
+        """
+        websocket = await connect(uri, ssl=ssl, max_size=max_frame_size)
 
         return WebsocketStream(websocket)
 
-    async def write(self, buf: bytes) -> None:
+    async def write(self, buf: bytes | bytearray) -> None:
         await self._websocket.send(buf, text=False)
 
     async def read(self) -> bytes:
@@ -0,0 +1,42 @@
+"""Mock streams"""
+
+import asyncio
+
+
+class NullStream:
+    """A message stream that discards writes, and never reads"""
+
+    async def write(self, buf: bytes) -> None:
+        pass
+
+    async def read(self) -> bytes:
+        raise EOFError()
+
+    async def close(self) -> None:
+        pass
+
+
+class ReplayStream(NullStream):
+    """A message stream that reads the given frames, then ends"""
+
+    def __init__(self, frames: list[bytes]) -> None:
+        self.frames = list(frames)
+
+    async def read(self) -> bytes:
+        if not self.frames:
+            raise EOFError()
+        return self.frames.pop(0)
+
+
+class QueueStream(NullStream):
+    """A message stream that reads frames from a queue, and records writes"""
+
+    def __init__(self) -> None:
+        self.frames: asyncio.Queue[bytes] = asyncio.Queue()
+        self.written: list[bytes] = []
+
+    async def write(self, buf: bytes) -> None:
+        self.written.append(bytes(buf))
+
+    async def read(self) -> bytes:
+        return await self.frames.get()
@@ -0,0 +1,195 @@
+"""Allocation budgets for the hot paths.
+
+Each test traces the memory allocated while a message is serialized,
+deserialized, or passed through the client's read or write pipeline, and
+checks it against a budget. The peak bytes allocated per message are
+budgeted as a number of copies of the payload plus a fixed overhead, so an
+extra copy of the payload fails. The blocks still allocated per decoded
+message are budgeted by message type, so extra objects fail.
+
+When a change is intended to allocate more, update the budget.
+"""
+
+import asyncio
+import gc
+import tracemalloc
+from typing import Any, Awaitable, Callable
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_packet import DataPacket
+from squawkbus.data_reader import DataReader
+from squawkbus.messages import (
+    AuthenticationRequest,
+    AuthenticationResponse,
+    ForwardedMulticastData,
+    ForwardedSubscriptionRequest,
+    ForwardedUnicastData,
+    Message,
+    MessageType,
+    MulticastData,
+    NotificationRequest,
+    SubscriptionRequest,
+    UnicastData,
+)
+from squawkbus.string_cache import StringCache
+
+from tests.mock_streams import QueueStream
+
+PAYLOAD_SIZE = 64 * 1024
+ITERATIONS = 20
+
+CODEC_OVERHEAD_BYTES = 4 * 1024
+PIPELINE_OVERHEAD_BYTES = 8 * 1024
+
+# The blocks held by the result of serializing and deserializing one
+# message of each type.
+BLOCK_BUDGETS = {
+    MessageType.AUTHENTICATION_REQUEST: (3, 5),
+    MessageType.AUTHENTICATION_RESPONSE: (3, 4),
+    MessageType.FORWARDED_SUBSCRIPTION_REQUEST: (4, 4),
+    MessageType.NOTIFICATION_REQUEST: (3, 4),
+    MessageType.SUBSCRIPTION_REQUEST: (3, 4),
+    MessageType.MULTICAST_DATA: (4, 13),
+    MessageType.UNICAST_DATA: (4, 13),
+    MessageType.FORWARDED_MULTICAST_DATA: (4, 13),
+    MessageType.FORWARDED_UNICAST_DATA: (4, 13),
+}
+
+
+def make_messages() -> list[Message]:
+    packets = [DataPacket({1, 2}, {b'key': b'value'}, bytes(PAYLOAD_SIZE))]
+    return [
+        AuthenticationRequest('basic', b'user:password'),
+        AuthenticationResponse('client-id'),
+        ForwardedSubscriptionRequest('host', 'user', 'client-id', 'topic', 1),
+        NotificationRequest('topic.*', True),
+        SubscriptionRequest('topic', True),
+        MulticastData('topic', packets),
+        UnicastData('client-id', 'topic', packets),
+        ForwardedMulticastData('host', 'user', 'topic', packets),
+        ForwardedUnicastData('host', 'user', 'client-id', 'topic', packets),
+    ]
+
+
+def is_data(message: Message) -> bool:
+    return isinstance(
+        message,
+        (MulticastData, UnicastData, ForwardedMulticastData, ForwardedUnicastData)
+    )
+
+
+def measure(func: Callable[[], Any]) -> tuple[float, int]:
+    """Measure the blocks held by the results, and the peak bytes per call"""
+    func()
+    results = []
+    peak_bytes = 0
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        before = tracemalloc.take_snapshot()
+        for _ in range(ITERATIONS):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            results.append(func())
+            _, peak = tracemalloc.get_traced_memory()
+            peak_bytes = max(peak_bytes, peak - current)
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+
+    blocks = sum(stat.count_diff for stat in after.compare_to(before, 'filename'))
+    return blocks / ITERATIONS, peak_bytes
+
+
+async def measure_async(func: Callable[[], Awaitable[None]]) -> int:
+    """Measure the peak bytes per call"""
+    for _ in range(5):
+        await func()
+    peak_bytes = 0
+    gc.collect()
+    gc.disable()
+    tracemalloc.start()
+    try:
+        for _ in range(ITERATIONS):
+            current, _ = tracemalloc.get_traced_memory()
+            tracemalloc.reset_peak()
+            await func()
+            _, peak = tracemalloc.get_traced_memory()
+            peak_bytes = max(peak_bytes, peak - current)
+    finally:
+        tracemalloc.stop()
+        gc.enable()
+    return peak_bytes
+
+
+@pytest.mark.parametrize('message', make_messages(), ids=lambda message: message.message_type.name)
+def test_serialize_budget(message: Message):
+    """Test serializing into a buffer copies the payload once"""
+    blocks, peak_bytes = measure(message.serialize_buffer)
+
+    copies = 1 if is_data(message) else 0
+    assert peak_bytes <= copies * PAYLOAD_SIZE + CODEC_OVERHEAD_BYTES
+    assert blocks <= BLOCK_BUDGETS[message.message_type][0]
+
+
+@pytest.mark.parametrize('message', make_messages(), ids=lambda message: message.message_type.name)
+def test_deserialize_budget(message: Message):
+    """Test deserializing copies the payload once, or not at all"""
+    buf = bytes(message.serialize())
+    cache = StringCache()
+    blocks, peak_bytes = measure(lambda: Message.read(DataReader(buf, string_cache=cache)))
+
+    copies = 1 if is_data(message) else 0
+    assert peak_bytes <= copies * PAYLOAD_SIZE + CODEC_OVERHEAD_BYTES
+    assert blocks <= BLOCK_BUDGETS[message.message_type][1]
+
+    _, peak_bytes = measure(
+        lambda: Message.read(DataReader(buf, copy_data=False, string_cache=cache))
+    )
+    assert peak_bytes <= CODEC_OVERHEAD_BYTES
+
+
+@pytest.mark.asyncio
+async def test_pipeline_budget():
+    """Test the read and write pipelines copy the payload once"""
+    stream = QueueStream()
+    client = CallbackClient(stream)
+    handled = asyncio.Event()
+    written: list[int] = []
+
+    async def on_data(_user, _host, _topic, _data_packets):
+        handled.set()
+
+    async def write(buf) -> None:
+        written.append(len(buf))
+
+    stream.write = write  # type: ignore
+    client.data_handlers.append(on_data)
+    await stream.frames.put(bytes(AuthenticationResponse('client').serialize()))
+    await client.start()
+
+    packets = [DataPacket({1, 2}, {b'key': b'value'}, bytes(PAYLOAD_SIZE))]
+    frame = bytes(ForwardedMulticastData('host', 'user', 'topic', packets).serialize())
+
+    async def read_one() -> None:
+        handled.clear()
+        await stream.frames.put(frame)
+        await handled.wait()
+
+    async def write_one() -> None:
+        count = len(written)
+        await client.publish('topic', packets)
+        while len(written) == count:
+            await asyncio.sleep(0)
+
+    read_bytes = await measure_async(read_one)
+    write_bytes = await measure_async(write_one)
+    client.close()
+    await client.wait_closed()
+
+    assert read_bytes <= PAYLOAD_SIZE + PIPELINE_OVERHEAD_BYTES
+    assert write_bytes <= PAYLOAD_SIZE + PIPELINE_OVERHEAD_BYTES
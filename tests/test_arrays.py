@@ -0,0 +1,47 @@
+"""Tests for array payloads"""
+
+import pytest
+
+from squawkbus.arrays import array_to_data_packet, data_packet_to_array
+from squawkbus.data_reader import DataReader
+from squawkbus.messages import Message, MulticastData
+
+np = pytest.importorskip('numpy')
+
+
+def test_round_trip_without_copy():
+    """Test an array is sent as a view and received as a read-only view"""
+    source = np.arange(12, dtype='<f8').reshape(3, 4)
+    packet = array_to_data_packet(source)
+    assert isinstance(packet.data, memoryview)
+    assert np.shares_memory(np.frombuffer(packet.data, dtype='<f8'), source)
+
+    buf = bytes(MulticastData('topic', [packet]).serialize())
+    message = Message.read(DataReader(buf, copy_data=False))
+    assert isinstance(message, MulticastData)
+
+    array = data_packet_to_array(message.data_packets[0])
+    assert array.shape == (3, 4)
+    assert array.dtype == np.dtype('<f8')
+    assert not array.flags.writeable
+    assert np.array_equal(array, source)
+    assert np.shares_memory(array, np.frombuffer(buf, dtype=np.uint8))
+
+
+def test_scalar_and_non_contiguous():
+    """Test scalars and non-contiguous arrays"""
+    scalar = np.array(3.5)
+    assert data_packet_to_array(array_to_data_packet(scalar)) == 3.5
+
+    source = np.arange(10, dtype='<i4')[::2]
+    assert np.array_equal(
+        data_packet_to_array(array_to_data_packet(source)),
+        source
+    )
+
+
+def test_missing_numpy(monkeypatch):
+    """Test a clear error is raised when numpy is not installed"""
+    monkeypatch.setattr('squawkbus.arrays.np', None)
+    with pytest.raises(ImportError, match=r'squawkbus\[numpy\]'):
+        array_to_data_packet([1, 2, 3])
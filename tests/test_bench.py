@@ -0,0 +1,52 @@
+"""Tests for the load generator"""
+
+import asyncio
+import threading
+
+import pytest
+
+from squawkbus.bench import _count_dropped, _publish, _subscribe
+from squawkbus.broker import Broker
+
+
+@pytest.mark.asyncio
+async def test_publish_and_subscribe():
+    """Test the subscriber receives everything the publisher sends"""
+    async with Broker() as broker:
+        await broker.start('127.0.0.1', 0)
+        options = {
+            'host': '127.0.0.1',
+            'port': broker.port,
+            'transport': 'socket',
+            'credentials': None,
+            'topics': 3,
+            'topic_prefix': 'bench',
+            'rate': 200,
+            'payload_size': 16,
+            'packets': 2,
+            'duration': 0.2,
+            'notification_batch_window': None,
+            'compression': 'zlib',
+            'compression_threshold': 16,
+            'copy_data': False,
+            'bytes_mode': False,
+            'max_write_queue_depth': 1_000,
+            'max_frame_size': None,
+            'max_memory_frame_size': None,
+        }
+        barrier = threading.Barrier(2)
+        subscriber, publisher = await asyncio.gather(
+            _subscribe(options, 0, barrier),
+            _publish(options, 0, barrier),
+        )
+
+    assert publisher['messages'] > 0
+    assert subscriber['messages'] == publisher['messages']
+    _count_dropped([subscriber, publisher])
+    assert subscriber['dropped'] == 0
+    assert subscriber['topics'] == publisher['topics']
+
+    subscriber['topics']['bench.0'] -= 2
+    _count_dropped([subscriber, publisher])
+    assert subscriber['dropped'] == 2
+    assert subscriber['latency_max_us'] > 0
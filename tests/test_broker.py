@@ -0,0 +1,207 @@
+"""Tests for the stand-in broker"""
+
+import asyncio
+
+import pytest
+
+from squawkbus import broker as broker_module
+from squawkbus.broker import Broker, PatternIndex
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.socket_client import SocketClient
+from squawkbus.websocket_client import WebsocketClient
+
+
+class Recorder:
+    """Record the data and notifications received by a client"""
+
+    def __init__(self, client) -> None:
+        self.data: list[tuple[str, str, list[DataPacket]]] = []
+        self.notifications: list[tuple[str, str, int]] = []
+        self.event = asyncio.Event()
+        client.data_handlers.append(self.on_data)
+        client.notification_handlers.append(self.on_notification)
+
+    async def on_data(self, user, _host, topic, data_packets) -> None:
+        self.data.append((user, topic, data_packets))
+        self.event.set()
+
+    async def on_notification(self, client_id, _user, _host, topic, count) -> None:
+        self.notifications.append((client_id, topic, count))
+        self.event.set()
+
+    async def wait(self, count: int, attr: str = 'data') -> None:
+        async with asyncio.timeout(5):
+            while len(getattr(self, attr)) < count:
+                self.event.clear()
+                await self.event.wait()
+
+
+def test_pattern_index():
+    """Test literal and regular expression patterns are matched"""
+    index = PatternIndex[str]()
+    assert index.add('AAPL', 'a') == 1
+    assert index.add('AAPL', 'a') == 2
+    index.add('A.*', 'b')
+    index.add('MSFT', 'c')
+    assert index.match('AAPL') == ['a', 'b']
+    assert index.match('AMZN') == ['b']
+    assert index.remove('AAPL', 'a') == 1
+    assert index.remove('AAPL', 'a') == 0
+    assert index.match('AAPL') == ['b']
+    assert index.patterns('b') == [('A.*', 1)]
+
+
+
+def test_pattern_index_dotted_literals():
+    """Test dotted topics are literal, and changes only invalidate their topics"""
+    index = PatternIndex[str]()
+    index.add('quote.T5', 'a')
+    index.add('quote\\..*', 'b')
+    index.add('trade.*', 'c')
+    assert index.match('quote.T5') == ['a', 'b']
+    assert index.match('quoteXT5') == []
+    assert index.match('trade.T5') == ['c']
+    assert index.match('tradeXT5') == ['c']
+
+    cached = index.match('trade.T5')
+    index.add('quote.T6', 'd')
+    assert index.match('trade.T5') is cached
+    assert index.match('quote.T6') == ['d', 'b']
+    index.add('trade\\.T.', 'e')
+    assert index.match('trade.T5') == ['c', 'e']
+    assert index.match('quote.T5') == ['a', 'b']
+    index.remove('quote\\..*', 'b')
+    assert index.match('quote.T5') == ['a']
+    assert index.match('quote.T6') == ['d']
+    assert index.match('trade.T5') == ['c', 'e']
+
+
+def test_pattern_index_cache_is_bounded():
+    """Test only the most recently matched topics are cached"""
+    # pylint: disable=protected-access
+    index = PatternIndex[str](max_cached_topics=2)
+    index.add('T.*', 'a')
+    cached = index.match('T1')
+    assert index.match('X1') == []
+    assert index.match('T1') is cached
+    assert index.match('T2') == ['a']
+    assert list(index._cache) == ['T1', 'T2']
+    assert index.match('T1') is cached
+
+
+@pytest.mark.asyncio
+async def test_publish_subscribe():
+    """Test subscriptions, notifications and entitlement filtering"""
+    async with Broker(entitlements={'alice': {1, 2}, 'bob': {1}}) as broker:
+        await broker.start('127.0.0.1', 0)
+        notifier = await SocketClient.create('127.0.0.1', broker.port)
+        notifications = Recorder(notifier)
+        await notifier.add_notification('prices.*')
+
+        alice = await SocketClient.create('127.0.0.1', broker.port, credentials=('alice', ''))
+        bob = await SocketClient.create('127.0.0.1', broker.port, credentials=('bob', ''))
+        alice_data, bob_data = Recorder(alice), Recorder(bob)
+        await alice.add_subscription('prices\\..*')
+        await bob.add_subscription('prices.AAPL')
+        await notifications.wait(2, 'notifications')
+        assert sorted(topic for _, topic, _ in notifications.notifications) == [
+            'prices.AAPL', 'prices\\..*'
+        ]
+
+        await notifier.publish('prices.AAPL', [
+            DataPacket({1}, {}, b'public'),
+            DataPacket({1, 2}, {}, b'private'),
+        ])
+        await alice_data.wait(1)
+        await bob_data.wait(1)
+        assert [packet.data for packet in alice_data.data[0][2]] == [b'public', b'private']
+        assert [packet.data for packet in bob_data.data[0][2]] == [b'public']
+
+        assert bob.client_id is not None
+        await alice.send(bob.client_id, 'direct', [DataPacket({1}, {}, b'hello')])
+        await bob_data.wait(2)
+        assert bob_data.data[1][:2] == ('alice', 'direct')
+
+        await bob.remove_subscription('prices.AAPL')
+        await notifications.wait(3, 'notifications')
+        assert notifications.notifications[-1][1:] == ('prices.AAPL', 0)
+
+        for client in (notifier, alice, bob):
+            client.close()
+            await client.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_authentication():
+    """Test clients without valid credentials are refused"""
+    async with Broker(passwords={'alice': 'secret'}) as broker:
+        await broker.start('127.0.0.1', 0)
+        client = await SocketClient.create(
+            '127.0.0.1', broker.port, credentials=('alice', 'secret')
+        )
+        assert client.client_id is not None
+        client.close()
+        await client.wait_closed()
+
+        with pytest.raises(Exception):
+            await SocketClient.create('127.0.0.1', broker.port, credentials=('alice', 'wrong'))
+
+
+@pytest.mark.asyncio
+async def test_cancelled_handler_propagates():
+    """Test a cancelled client handler disconnects and stays cancelled"""
+    # pylint: disable=protected-access
+    async with Broker() as broker:
+        await broker.start('127.0.0.1', 0)
+        client = await SocketClient.create('127.0.0.1', broker.port)
+        while broker.client_count < 1:
+            await asyncio.sleep(0)
+        handler, = broker._handlers
+        handler.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await handler
+        assert broker.client_count == 0
+        await client.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_websocket():
+    """Test websocket clients are served"""
+    pytest.importorskip('websockets')
+    async with Broker() as broker:
+        await broker.start('127.0.0.1', None, websocket_port=0)
+        subscriber = await WebsocketClient.create('127.0.0.1', broker.websocket_port)
+        publisher = await WebsocketClient.create('127.0.0.1', broker.websocket_port)
+        recorder = Recorder(subscriber)
+        await subscriber.add_subscription('topic')
+        while broker.client_count < 2:
+            await asyncio.sleep(0)
+        await asyncio.sleep(0.05)
+        await publisher.publish('topic', [DataPacket({0}, {}, b'data')])
+        await recorder.wait(1)
+        assert recorder.data[0][2][0].data == b'data'
+
+        # Frames above the websockets default of 1MiB are within the limit.
+        await publisher.publish('topic', [DataPacket({0}, {}, bytes(2 * 1024 * 1024))])
+        await recorder.wait(2)
+        assert len(recorder.data[1][2][0].data) == 2 * 1024 * 1024
+        for client in (subscriber, publisher):
+            client.close()
+            await client.wait_closed()
+
+        with pytest.raises(ValueError):
+            await WebsocketClient.create(
+                '127.0.0.1',
+                broker.websocket_port,
+                options=ClientOptions(max_memory_frame_size=1024)
+            )
+
+
+@pytest.mark.asyncio
+async def test_websocket_requires_websockets(monkeypatch):
+    """Test a websocket server without websockets installed is reported"""
+    monkeypatch.setattr(broker_module, 'serve', None)
+    async with Broker() as broker:
+        with pytest.raises(ImportError, match='squawkbus\\[websockets\\]'):
+            await broker.start('127.0.0.1', None, websocket_port=0)
@@ -0,0 +1,71 @@
+"""Tests for bytes mode"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.data_reader import DataReader
+from squawkbus.messages import ForwardedMulticastData, Message, MulticastData
+
+from tests.mock_streams import ReplayStream
+
+
+def test_raw_strings():
+    """Test strings are read as bytes, and bytes are written unchanged"""
+    packets = [DataPacket({0}, {}, b'data')]
+    buf = bytes(ForwardedMulticastData('host', 'user', 'topic', packets).serialize())
+
+    message = Message.read(DataReader(buf, raw_strings=True))
+    assert isinstance(message, ForwardedMulticastData)
+    assert (message.host, message.user, message.topic) == (b'host', b'user', b'topic')
+
+    relayed = ForwardedMulticastData(
+        message.host,
+        message.user,
+        message.topic,
+        message.data_packets
+    ).serialize()
+    assert relayed == buf
+
+
+@pytest.mark.asyncio
+async def test_bytes_mode_client():
+    """Test a bytes mode client receives and publishes bytes topics"""
+    packets = [DataPacket({0}, {}, b'data')]
+    stream = ReplayStream([
+        bytes(ForwardedMulticastData('host', 'user', 'topic', packets).serialize())
+    ])
+    client = CallbackClient(stream, options=ClientOptions(bytes_mode=True))
+    await client._read()  # pylint: disable=protected-access
+    message = client._read_queue.get_nowait()  # pylint: disable=protected-access
+    assert message.topic == b'topic'
+
+    await client.publish(message.topic, message.data_packets)
+    sent = client._write_queue.get_nowait()  # pylint: disable=protected-access
+    assert sent.serialize() == MulticastData('topic', packets).serialize()
+
+
+@pytest.mark.asyncio
+async def test_bytes_data_handlers():
+    """Test bytes handlers receive the names as bytes, and data handlers as strings"""
+    packets = [DataPacket({0}, {}, b'data')]
+    stream = ReplayStream([
+        bytes(ForwardedMulticastData('host', 'user', 'topic', packets).serialize())
+    ])
+    client = CallbackClient(stream, options=ClientOptions(bytes_mode=True))
+    received: list[tuple] = []
+
+    async def on_bytes_data(user, host, topic, _data_packets):
+        received.append((user, host, topic))
+
+    async def on_data(user, host, topic, _data_packets):
+        received.append((user, host, topic))
+
+    client.bytes_data_handlers.append(on_bytes_data)
+    client.data_handlers.append(on_data)
+    await client._read()  # pylint: disable=protected-access
+    await client._dispatch(  # pylint: disable=protected-access
+        client._read_queue.get_nowait()  # pylint: disable=protected-access
+    )
+    assert received == [(b'user', b'host', b'topic'), ('user', 'host', 'topic')]
@@ -0,0 +1,207 @@
+"""Tests for chunking"""
+
+import asyncio
+import io
+import time
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.chunking import (
+    CHUNK_INDEX_HEADER,
+    CHUNK_OFFSET_HEADER,
+    ChunkAssembler,
+    ChunkStream,
+    ChunkStreamer,
+    is_chunk,
+    split_data_packet,
+)
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import Message, MulticastData
+
+from tests.mock_streams import NullStream
+
+DATA = bytes(range(256)) * 40
+
+
+def test_split_and_assemble():
+    """Test a packet is split and reassembled"""
+    packet = DataPacket({1}, {b'content-type': b'application/octet-stream'}, DATA)
+    chunks = split_data_packet(packet, 1000)
+    assert len(chunks) == 11
+    assert all(is_chunk(chunk) for chunk in chunks)
+    assert max(len(chunk.payload) for chunk in chunks) == 1000
+
+    assembler = ChunkAssembler()
+    results = [assembler.add('topic', chunk) for chunk in reversed(chunks)]
+    assert results[:-1] == [None] * 10
+    assert results[-1] == packet
+    assert assembler.outstanding_bytes == 0
+
+    assert split_data_packet(packet, len(DATA)) == [packet]
+
+
+def test_outstanding_limit():
+    """Test transfers beyond the outstanding limit are dropped"""
+    assembler = ChunkAssembler(max_outstanding_bytes=len(DATA) - 1)
+    chunks = split_data_packet(DataPacket({0}, {}, DATA), 1000)
+    assert all(assembler.add('topic', chunk) is None for chunk in chunks)
+    assert assembler.outstanding_bytes == 0
+
+
+@pytest.mark.asyncio
+async def test_publish_chunked():
+    """Test publishing sends a message per chunk"""
+    client = CallbackClient(NullStream())
+    await client.publish_chunked('topic', [DataPacket({0}, {}, DATA)], chunk_size=4096)
+    queue = client._write_queue  # pylint: disable=protected-access
+    messages = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert len(messages) == 3
+
+    received = []
+
+    async def on_data(_user, _host, _topic, data_packets):
+        received.extend(data_packets)
+
+    handler = ChunkAssembler().wrap(on_data)
+    for message in messages:
+        forwarded = Message.deserialize(message.serialize())
+        assert isinstance(forwarded, MulticastData)
+        await handler('user', 'host', 'topic', forwarded.data_packets)
+    assert len(received) == 1
+    assert received[0].data == DATA
+
+
+@pytest.mark.asyncio
+async def test_default_chunks_fit_websocket_frames():
+    """Test a default sized chunk and its headers fit in a 1MiB frame"""
+    client = CallbackClient(NullStream())
+    headers = {b'content-type': b'application/octet-stream'}
+    await client.publish_chunked('topic', [DataPacket({0}, headers, bytes(3 * 1024 * 1024))])
+    queue = client._write_queue  # pylint: disable=protected-access
+    frames = [queue.get_nowait().serialize() for _ in range(queue.qsize())]
+    assert len(frames) == 4
+    assert max(len(frame) for frame in frames) <= 1024 * 1024
+
+
+@pytest.mark.asyncio
+async def test_stream_to_file():
+    """Test streaming chunks to a file"""
+    file = io.BytesIO()
+    done = asyncio.Event()
+
+    async def on_stream(stream: ChunkStream) -> None:
+        await stream.write_to(file)
+        done.set()
+
+    streamer = ChunkStreamer(on_stream, max_buffered_bytes=2000)
+    for chunk in split_data_packet(DataPacket({0}, {}, DATA), 1000):
+        assert await streamer.add('topic', chunk) is None
+    await asyncio.wait_for(done.wait(), 1)
+    assert file.getvalue() == DATA
+
+
+def test_incomplete_transfers_expire():
+    """Test incomplete transfers are dropped when old or to make room"""
+    chunks = split_data_packet(DataPacket({0}, {}, DATA), 1000, b'joined-late')
+    assembler = ChunkAssembler(max_age=0.05)
+    for chunk in chunks[1:]:
+        assert assembler.add('topic', chunk) is None
+    assert assembler.outstanding_bytes == len(DATA)
+    time.sleep(0.06)
+    complete = [assembler.add('topic', chunk) for chunk in split_data_packet(DataPacket({0}, {}, DATA), 1000)]
+    assert complete[-1] is not None
+    assert assembler.outstanding_bytes == 0
+    # Chunks of the expired transfer are ignored.
+    assert assembler.add('topic', chunks[0]) is None
+    assert assembler.outstanding_bytes == 0
+
+    assembler = ChunkAssembler(max_outstanding_bytes=len(DATA) * 3 // 2)
+    for chunk in chunks[1:]:
+        assembler.add('topic', chunk)
+    complete = [assembler.add('topic', chunk) for chunk in split_data_packet(DataPacket({0}, {}, DATA), 1000)]
+    assert complete[-1] is not None
+    assert assembler.outstanding_bytes == 0
+
+
+def test_invalid_and_repeated_chunks():
+    """Test chunks outside the transfer and repeated chunks are ignored"""
+    chunks = split_data_packet(DataPacket({0}, {}, DATA), 1000)
+    assembler = ChunkAssembler()
+    bad_offset = DataPacket(
+        {0},
+        {**chunks[0].headers, CHUNK_OFFSET_HEADER: str(len(DATA) - 10).encode()},
+        chunks[0].payload
+    )
+    bad_index = DataPacket({0}, {**chunks[0].headers, CHUNK_INDEX_HEADER: b'11'}, chunks[0].payload)
+    assert assembler.add('topic', bad_offset) is None
+    assert assembler.add('topic', bad_index) is None
+    assert assembler.outstanding_bytes == 0
+
+    results = [assembler.add('topic', chunk) for chunk in [chunks[0]] + chunks[:-1]]
+    assert results == [None] * 11
+    packet = assembler.add('topic', chunks[-1])
+    assert packet is not None
+    assert bytes(packet.payload) == DATA
+
+
+@pytest.mark.asyncio
+async def test_stream_handler_stops_early():
+    """Test the streamer does not wait for a handler which has finished"""
+    async def on_stream(stream: ChunkStream) -> None:
+        async for _ in stream:
+            raise RuntimeError("stop")
+
+    streamer = ChunkStreamer(on_stream, max_buffered_bytes=1000)
+    chunks = split_data_packet(DataPacket({0}, {}, DATA), 1000)
+    for chunk in chunks:
+        assert await asyncio.wait_for(streamer.add('topic', chunk), 1) is None
+    assert not streamer._streams  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_abandoned_streams_expire():
+    """Test a transfer which stops sending chunks fails its stream"""
+    errors: list[Exception] = []
+    done = asyncio.Event()
+
+    async def on_stream(stream: ChunkStream) -> None:
+        try:
+            async for _ in stream:
+                pass
+        except TimeoutError as error:
+            errors.append(error)
+        done.set()
+
+    streamer = ChunkStreamer(on_stream, max_age=0.05)
+    chunks = split_data_packet(DataPacket({0}, {}, DATA), 1000, b'abandoned')
+    await streamer.add('topic', chunks[0])
+    await asyncio.wait_for(done.wait(), 1)
+    assert len(errors) == 1
+
+    # The next chunk received expires the abandoned transfer.
+    await asyncio.sleep(0.06)
+    await streamer.add('other', split_data_packet(DataPacket({0}, {}, DATA), 1000)[0])
+    assert [topic for topic, _ in streamer._streams] == ['other']  # pylint: disable=protected-access
+
+
+@pytest.mark.asyncio
+async def test_stream_out_of_order():
+    """Test an out of order chunk fails the stream rather than the caller"""
+    errors: list[Exception] = []
+    done = asyncio.Event()
+
+    async def on_stream(stream: ChunkStream) -> None:
+        try:
+            await stream.write_to(io.BytesIO())
+        except ValueError as error:
+            errors.append(error)
+        done.set()
+
+    streamer = ChunkStreamer(on_stream)
+    chunks = split_data_packet(DataPacket({0}, {}, DATA), 1000)
+    assert await streamer.add('topic', chunks[0]) is None
+    assert await streamer.add('topic', chunks[2]) is None
+    assert await streamer.add('topic', chunks[1]) is None
+    await asyncio.wait_for(done.wait(), 1)
+    assert len(errors) == 1
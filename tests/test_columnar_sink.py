@@ -0,0 +1,143 @@
+"""Tests for the columnar sink"""
+
+import asyncio
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.columnar_sink import ColumnarBatch, ColumnarSink
+from squawkbus.data_packet import DataPacket
+from squawkbus.record_schema import RecordSchema
+
+from tests.mock_streams import NullStream
+
+np = pytest.importorskip('numpy')
+
+
+@pytest.mark.asyncio
+async def test_batches_by_row_count():
+    """Test batches are handed over at the row limit"""
+    batches: list[ColumnarBatch] = []
+
+    async def on_batch(batch: ColumnarBatch) -> None:
+        batches.append(batch)
+
+    sink = ColumnarSink(
+        [('bid', 'f8'), ('ask', 'f8')],
+        on_batch,
+        max_rows=3,
+        initial_capacity=2
+    )
+    client = CallbackClient(NullStream())
+    sink.attach(client)
+
+    for i in range(4):
+        packet = DataPacket(
+            {0},
+            {b'content-type': b'application/json'},
+            f'{{"bid": {i}, "ask": {i + 1}}}'.encode()
+        )
+        await client.on_data('user', 'host', f'T{i}', [packet])
+
+    assert len(batches) == 1
+    batch = batches[0]
+    assert len(batch) == 3
+    assert np.array_equal(batch['bid'], [0.0, 1.0, 2.0])
+    assert list(batch['topic']) == ['T0', 'T1', 'T2']
+    assert not batch['ask'].flags.writeable
+
+    await sink.detach()
+    assert len(batches) == 2
+    assert np.array_equal(batches[1]['ask'], [4.0])
+    assert not client.data_handlers
+
+
+@pytest.mark.asyncio
+async def test_record_decoder():
+    """Test decoding records to field sequences"""
+    schema = RecordSchema('quote', [('bid', 'float64'), ('ask', 'float64')])
+    batches: list[ColumnarBatch] = []
+
+    async def on_batch(batch: ColumnarBatch) -> None:
+        batches.append(batch)
+
+    sink = ColumnarSink(
+        [('bid', 'f8'), ('ask', 'f8')],
+        on_batch,
+        decode=lambda packet: schema.struct.unpack(packet.data)
+    )
+    await sink.on_data('user', 'host', 'T', [schema.to_data_packet({'bid': 1.0, 'ask': 2.0})])
+    await sink.flush()
+    assert np.array_equal(batches[0]['ask'], [2.0])
+
+
+@pytest.mark.asyncio
+async def test_schema_records_and_missing_fields():
+    """Test records are copied into the columns, and incomplete packets skipped"""
+    schema = RecordSchema('quote', [('bid', 'float64'), ('ask', 'float64')])
+    batches: list[ColumnarBatch] = []
+
+    async def on_batch(batch: ColumnarBatch) -> None:
+        batches.append(batch)
+
+    sink = ColumnarSink([('bid', 'f8'), ('ask', 'f8')], on_batch, schema=schema, initial_capacity=1)
+    await sink.on_data('user', 'host', 'T', [
+        schema.to_data_packet({'bid': 1.0, 'ask': 2.0}, {'bid': 3.0, 'ask': 4.0}),
+        DataPacket({0}, {b'content-type': b'application/json'}, b'{"bid": 5.0}'),
+        DataPacket({0}, {b'content-type': b'application/json'}, b'{"bid": 5.0, "ask": 6.0}'),
+    ])
+    assert sink.skipped == 1
+    await sink.flush()
+    assert np.array_equal(batches[0]['bid'], [1.0, 3.0, 5.0])
+    assert np.array_equal(batches[0]['ask'], [2.0, 4.0, 6.0])
+    assert list(batches[0]['topic']) == ['T', 'T', 'T']
+
+    with pytest.raises(ValueError):
+        ColumnarSink([('size', 'u4')], on_batch, schema=schema)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize('payload', [
+    b'{"size": null, "price": 1.0}',
+    b'{"size": {"a": 1}, "price": 1.0}',
+    b'42',
+    b'"text"',
+], ids=['null', 'nested', 'scalar', 'string'])
+async def test_undecodable_values_are_skipped(payload: bytes):
+    """Test values which do not fit the columns are skipped, not raised"""
+    batches: list[ColumnarBatch] = []
+
+    async def on_batch(batch: ColumnarBatch) -> None:
+        batches.append(batch)
+
+    sink = ColumnarSink([('size', 'i8'), ('price', 'f8')], on_batch)
+    headers = {b'content-type': b'application/json'}
+    await sink.on_data('user', 'host', 'T', [
+        DataPacket({0}, headers, payload),
+        DataPacket({0}, headers, b'{"size": 2, "price": 3.0}'),
+    ])
+    assert sink.skipped == 1
+    await sink.flush()
+    assert np.array_equal(batches[0]['size'], [2])
+
+
+@pytest.mark.asyncio
+async def test_null_float_is_skipped():
+    """Test a null is not stored as NaN in a float column"""
+    sink = ColumnarSink([('price', 'f8')], lambda _batch: asyncio.sleep(0))
+    await sink.on_data('user', 'host', 'T', [
+        DataPacket({0}, {b'content-type': b'application/json'}, b'{"price": null}'),
+    ])
+    assert sink.skipped == 1
+    assert len(sink.take()) == 0
+
+
+def test_missing_numpy(monkeypatch):
+    """Test a clear error is raised when numpy is not installed"""
+    monkeypatch.setattr('squawkbus.columnar_sink.np', None)
+
+    async def on_batch(_batch):
+        pass
+
+    with pytest.raises(ImportError, match=r'squawkbus\[numpy\]'):
+        ColumnarSink([('bid', 'f8')], on_batch)
@@ -0,0 +1,60 @@
+"""Tests for field level deltas"""
+
+import json
+from typing import NamedTuple
+
+from squawkbus.delta import (
+    UPDATE_TYPE_DELTA,
+    UPDATE_TYPE_HEADER,
+    UPDATE_TYPE_IMAGE,
+    DeltaApplier,
+    DeltaEncoder,
+)
+
+
+class Quote(NamedTuple):
+    ticker: str
+    bid: float
+    ask: float
+
+
+def test_image_then_delta():
+    """Test the first update is an image and later updates are deltas"""
+    encoder = DeltaEncoder()
+    applier = DeltaApplier()
+
+    image = encoder.update('AAPL', Quote('AAPL', 100.0, 101.0))
+    assert image is not None
+    assert image[0].headers[UPDATE_TYPE_HEADER] == UPDATE_TYPE_IMAGE
+    assert applier.apply('AAPL', image) == {'ticker': 'AAPL', 'bid': 100.0, 'ask': 101.0}
+
+    delta = encoder.update('AAPL', Quote('AAPL', 100.5, 101.0))
+    assert delta is not None
+    assert delta[0].headers[UPDATE_TYPE_HEADER] == UPDATE_TYPE_DELTA
+    assert json.loads(delta[0].data) == {'bid': 100.5}
+    assert applier.apply('AAPL', delta) == {'ticker': 'AAPL', 'bid': 100.5, 'ask': 101.0}
+
+    assert encoder.update('AAPL', Quote('AAPL', 100.5, 101.0)) is None
+
+
+def test_removed_fields_send_image():
+    """Test removing a field sends an image"""
+    encoder = DeltaEncoder()
+    encoder.update('topic', {'a': 1, 'b': 2})
+    packets = encoder.update('topic', {'a': 1})
+    assert packets is not None
+    assert packets[0].headers[UPDATE_TYPE_HEADER] == UPDATE_TYPE_IMAGE
+    assert json.loads(packets[0].data) == {'a': 1}
+
+
+def test_delta_before_image_is_ignored():
+    """Test a delta received before an image is ignored"""
+    encoder = DeltaEncoder()
+    encoder.update('topic', {'a': 1, 'b': 2})
+    delta = encoder.update('topic', {'a': 2, 'b': 2})
+    assert delta is not None
+    applier = DeltaApplier()
+    assert applier.apply('topic', delta) is None
+    image = encoder.image('topic')
+    assert image is not None
+    assert applier.apply('topic', image) == {'a': 2, 'b': 2}
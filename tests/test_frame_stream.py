@@ -1,9 +1,16 @@
 """Test Serialization"""
 
 from asyncio import IncompleteReadError, StreamReader, StreamWriter
+from mmap import mmap
+import struct
+import tempfile
+
 import pytest
 
-from squawkbus.socket_stream import SocketStream
+from squawkbus.data_packet import DataPacket
+from squawkbus.data_reader import DataReader
+from squawkbus.messages import Message, MulticastData
+from squawkbus.socket_stream import DEFAULT_MAX_FRAME_SIZE, SocketStream
 
 # from tests.mock_streams import MockStreamReader, MockStreamWriter
 
@@ -45,3 +52,69 @@ async def test_roundtrip():
     await frame_stream.write(buf_in)
     buf_out = await frame_stream.read()
     assert buf_in == buf_out
+
+
+@pytest.mark.asyncio
+async def test_large_frame_is_memory_mapped():
+    """Test frames above the in-memory limit are read into a mapped file"""
+
+    buf = bytearray()
+    reader, writer = MockStreamReader(buf), MockStreamWriter(buf)
+    frame_stream = SocketStream(reader, writer, max_memory_frame_size=16)
+    buf_in = bytes(range(256)) * 10_000
+    await frame_stream.write(buf_in)
+    buf_out = await frame_stream.read()
+    assert isinstance(buf_out, mmap)
+    assert buf_out[:] == buf_in
+
+    await frame_stream.write(b'small')
+    assert await frame_stream.read() == b'small'
+
+
+@pytest.mark.asyncio
+async def test_oversized_frame_is_rejected():
+    """Test the length prefix is checked against the maximum frame size"""
+
+    buf = bytearray()
+    reader, writer = MockStreamReader(buf), MockStreamWriter(buf)
+    frame_stream = SocketStream(reader, writer, max_frame_size=16)
+    await frame_stream.write(b'This is too long for the stream')
+    with pytest.raises(ValueError):
+        await frame_stream.read()
+
+    buf = bytearray(struct.pack('>i', -1))
+    frame_stream = SocketStream(MockStreamReader(buf), MockStreamWriter(buf))
+    with pytest.raises(ValueError):
+        await frame_stream.read()
+
+    # Frames are limited by default, before any of the frame is read.
+    buf = bytearray(struct.pack('>i', DEFAULT_MAX_FRAME_SIZE + 1))
+    frame_stream = SocketStream(MockStreamReader(buf), MockStreamWriter(buf))
+    with pytest.raises(ValueError):
+        await frame_stream.read()
+
+    # The limit can be removed.
+    buf = bytearray()
+    frame_stream = SocketStream(MockStreamReader(buf), MockStreamWriter(buf), max_frame_size=None)
+    await frame_stream.write(b'unlimited')
+    assert await frame_stream.read() == b'unlimited'
+
+
+def test_memory_mapped_frame_data_is_not_copied():
+    """Test packets read from a mapped frame are views over it"""
+
+    message = MulticastData(
+        'topic',
+        [DataPacket({0}, {}, b'x' * 100)]
+    )
+    frame = message.serialize()
+    with tempfile.TemporaryFile() as file:
+        file.write(frame)
+        file.flush()
+        buf = mmap(file.fileno(), len(frame))
+
+    result = Message.read(DataReader(buf))
+    assert isinstance(result, MulticastData)
+    packet = result.data_packets[0]
+    assert isinstance(packet.data, memoryview)
+    assert packet.data == b'x' * 100
@@ -0,0 +1,93 @@
+"""Tests for header filters"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_packet import DataPacket
+from squawkbus.data_reader import DataReader
+from squawkbus.header_filters import header_equals, header_present
+from squawkbus.messages import ForwardedMulticastData, Message
+
+from tests.mock_streams import ReplayStream
+
+
+def _frame(topic: str, *sources: bytes) -> bytes:
+    return bytes(ForwardedMulticastData(
+        'host',
+        'user',
+        topic,
+        [DataPacket({0}, {b'source': source}, source * 4) for source in sources]
+    ).serialize())
+
+
+def test_packet_filter():
+    """Test rejected packets are skipped by the reader"""
+    reader = DataReader(
+        _frame('topic', b'a', b'b', b'a'),
+        packet_filter=lambda topic, headers: headers.get(b'source') == b'a'
+    )
+    message = Message.read(reader)
+    assert isinstance(message, ForwardedMulticastData)
+    assert [packet.data for packet in message.data_packets] == [b'aaaa', b'aaaa']
+    assert reader.skipped_packets == 1
+    assert reader.offset == len(reader.buf)
+
+
+def test_header_filters():
+    """Test the header filter helpers"""
+    headers = {b'source': b'a'}
+    assert header_equals(b'source', b'a', b'b')(headers)
+    assert not header_equals(b'source', b'c')(headers)
+    assert header_present(b'source')(headers)
+    assert not header_present(b'content-type')(headers)
+
+
+@pytest.mark.asyncio
+async def test_subscription_header_filter():
+    """Test a subscription filter drops messages with no accepted packets"""
+    stream = ReplayStream([
+        _frame('filtered', b'b'),
+        _frame('filtered', b'a', b'b'),
+        _frame('unfiltered', b'b'),
+    ])
+    client = CallbackClient(stream)
+    await client.add_subscription('filtered', header_filter=header_equals(b'source', b'a'))
+    queue = client._read_queue  # pylint: disable=protected-access
+
+    for _ in range(3):
+        await client._read()  # pylint: disable=protected-access
+
+    messages = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert [
+        (message.topic, len(message.data_packets))
+        for message in messages
+    ] == [('filtered', 1), ('unfiltered', 1)]
+
+    await client.remove_subscription('filtered')
+    stream.frames.append(_frame('filtered', b'b'))
+    await client._read()  # pylint: disable=protected-access
+    assert queue.qsize() == 1
+
+
+@pytest.mark.asyncio
+async def test_pattern_subscription_header_filter():
+    """Test a filter on a pattern subscription applies to the topics it matches"""
+    stream = ReplayStream([
+        _frame('prices.AAPL', b'a', b'b'),
+        _frame('pricesXAAPL', b'a', b'b'),
+        _frame('quotes.AAPL', b'a', b'b'),
+    ])
+    client = CallbackClient(stream)
+    await client.add_subscription('prices\\..*', header_filter=header_equals(b'source', b'a'))
+    await client.add_subscription('quotes\\..*', header_filter=header_equals(b'source', b'a'))
+    await client.add_subscription('quotes.AAPL')
+    queue = client._read_queue  # pylint: disable=protected-access
+
+    for _ in range(3):
+        await client._read()  # pylint: disable=protected-access
+
+    messages = [queue.get_nowait() for _ in range(queue.qsize())]
+    assert [
+        (message.topic, len(message.data_packets))
+        for message in messages
+    ] == [('prices.AAPL', 1), ('pricesXAAPL', 2), ('quotes.AAPL', 2)]
@@ -0,0 +1,88 @@
+"""Tests for heavy hitter topics"""
+
+import asyncio
+import random
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.heavy_hitters import SpaceSaving, TopTopics
+from squawkbus.messages import AuthenticationResponse, ForwardedMulticastData
+from squawkbus.metrics import ClientMetrics
+
+from tests.mock_streams import QueueStream
+
+
+def test_space_saving():
+    """Test the frequent keys are found within the error bound"""
+    rng = random.Random(42)
+    sketch = SpaceSaving(capacity=50)
+    exact: dict[str, int] = {}
+    for _ in range(20_000):
+        if rng.random() < 0.5:
+            key = f'hot-{rng.randrange(5)}'
+        else:
+            key = f'cold-{rng.randrange(5_000)}'
+        sketch.add(key)
+        exact[key] = exact.get(key, 0) + 1
+
+    assert len(sketch) == 50
+    assert sketch.total == 20_000
+    top = sketch.top(5)
+    assert {hitter.key for hitter in top} == {f'hot-{i}' for i in range(5)}
+    for hitter in top:
+        assert hitter.estimate - hitter.error <= exact[hitter.key] <= hitter.estimate
+        assert hitter.error <= sketch.total / sketch.capacity
+
+    sketch.reset()
+    assert len(sketch) == 0
+    assert not sketch.top(5)
+
+
+def test_space_saving_weights():
+    """Test weighted counts"""
+    sketch = SpaceSaving(capacity=2)
+    sketch.add('a', 100)
+    sketch.add('b', 1)
+    sketch.add('c', 5)
+    assert sketch.top(2) == [('a', 100, 0), ('c', 6, 1)]
+
+
+@pytest.mark.asyncio
+async def test_client_top_topics():
+    """Test the client counts data traffic by topic"""
+    top_topics = TopTopics(capacity=10, top=2)
+    stream = QueueStream()
+    client = CallbackClient(
+        stream,
+        options=ClientOptions(metrics=ClientMetrics(top_topics=top_topics))
+    )
+    received = asyncio.Event()
+
+    async def on_data(_user, _host, topic, _data_packets):
+        if topic == 'last':
+            received.set()
+
+    client.data_handlers.append(on_data)
+    await stream.frames.put(bytes(AuthenticationResponse('client').serialize()))
+    await client.start()
+    for topic in ('big', 'small', 'small', 'last'):
+        payload = bytes(1000 if topic == 'big' else 10)
+        await stream.frames.put(bytes(
+            ForwardedMulticastData('host', 'user', topic, [DataPacket({0}, {}, payload)]).serialize()
+        ))
+    await client.publish('out', [DataPacket({0}, {}, b'data')])
+    await asyncio.wait_for(received.wait(), 1)
+    while not stream.written:
+        await asyncio.sleep(0)
+    client.close()
+    await client.wait_closed()
+
+    report = top_topics.report()
+    assert [hitter.key for hitter in report.messages_in] == ['small', 'big']
+    assert report.messages_in[0].estimate == 2
+    assert [hitter.key for hitter in report.bytes_in] == ['big', 'small']
+    assert [hitter.key for hitter in report.messages_out] == ['out']
+    assert not top_topics.report().messages_in
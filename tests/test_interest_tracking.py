@@ -0,0 +1,72 @@
+"""Tests for interest tracking"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import ForwardedSubscriptionRequest
+
+from tests.mock_streams import NullStream
+
+
+def _request(client_id: str, topic: str, count: int) -> ForwardedSubscriptionRequest:
+    return ForwardedSubscriptionRequest('host', 'user', client_id, topic, count)
+
+
+@pytest.mark.asyncio
+async def test_publish_suppression():
+    """Test publishing is suppressed for topics without subscribers"""
+    client = CallbackClient(NullStream(), options=ClientOptions(suppress_uninterested=True))
+    queue = client._write_queue  # pylint: disable=protected-access
+    packets = [DataPacket({0}, {}, b'data')]
+
+    await client.publish('topic', packets)
+    assert queue.empty()
+
+    await client._raise_forwarded_subscription_request(  # pylint: disable=protected-access
+        _request('c1', 'topic', 1)
+    )
+    assert client.has_interest('topic')
+    await client.publish('topic', packets)
+    assert queue.qsize() == 1
+
+    await client._raise_forwarded_subscription_request(  # pylint: disable=protected-access
+        _request('c1', 'topic', 0)
+    )
+    assert not client.has_interest('topic')
+
+
+@pytest.mark.asyncio
+async def test_send_is_not_suppressed():
+    """Test data sent to a client is not suppressed without subscribers"""
+    client = CallbackClient(NullStream(), options=ClientOptions(suppress_uninterested=True))
+    queue = client._write_queue  # pylint: disable=protected-access
+
+    await client.send('c1', 'reply', [DataPacket({0}, {}, b'data')])
+    await client.send_value('c1', 'reply', {'value': 1})
+    assert queue.qsize() == 2
+
+
+def test_untracked_interest():
+    """Test interest is assumed when it is not tracked"""
+    client = CallbackClient(NullStream())
+    assert client.interest is None
+    assert client.has_interest('topic')
+
+
+@pytest.mark.asyncio
+async def test_suppressed_values_are_not_encoded():
+    """Test values for topics without subscribers are discarded before encoding"""
+    client = CallbackClient(NullStream(), options=ClientOptions(suppress_uninterested=True))
+    queue = client._write_queue  # pylint: disable=protected-access
+    unencodable = object()
+
+    await client.publish_value('topic', unencodable)
+    assert queue.empty()
+
+    await client._raise_forwarded_subscription_request(  # pylint: disable=protected-access
+        _request('c1', 'topic', 1)
+    )
+    with pytest.raises(TypeError):
+        await client.publish_value('topic', unencodable)
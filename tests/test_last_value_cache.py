@@ -0,0 +1,120 @@
+"""Tests for the last value cache"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.last_value_cache import LastValueCache, data_packets_size
+from squawkbus.messages import ForwardedMulticastData
+
+from tests.mock_streams import NullStream
+
+
+def _packets(data: bytes) -> list[DataPacket]:
+    return [DataPacket({0}, {}, data)]
+
+
+def test_lru_eviction():
+    """Test the least recently used topics are evicted"""
+    size = data_packets_size(_packets(b'0123456789'))
+    cache = LastValueCache(size * 2)
+    cache.put('a', 'user', 'host', _packets(b'0123456789'))
+    cache.put('b', 'user', 'host', _packets(b'0123456789'))
+    assert cache.get('a') is not None
+    cache.put('c', 'user', 'host', _packets(b'0123456789'))
+    assert 'a' in cache
+    assert 'b' not in cache
+    assert 'c' in cache
+    assert cache.size == size * 2
+
+
+def test_replace_and_oversized():
+    """Test values are replaced, and oversized values are not cached"""
+    cache = LastValueCache(100)
+    cache.put('a', 'user', 'host', _packets(b'first'))
+    cache.put('a', 'user', 'host', _packets(b'second'))
+    entry = cache.get('a')
+    assert entry is not None and entry.data_packets[0].data == b'second'
+    cache.put('a', 'user', 'host', _packets(b'x' * 200))
+    assert 'a' not in cache
+    assert cache.size == 0
+
+
+@pytest.mark.asyncio
+async def test_client_cache_and_replay():
+    """Test the client caches data and replays it to new handlers"""
+    client = CallbackClient(
+        NullStream(),
+        options=ClientOptions(last_value_cache=LastValueCache(1000))
+    )
+    packets = _packets(b'data')
+    await client._raise_multicast_data(  # pylint: disable=protected-access
+        ForwardedMulticastData('host', 'user', 'topic', packets)
+    )
+    assert client.get_last('topic') is packets
+
+    received = []
+
+    async def on_data(user, host, topic, data_packets):
+        received.append((user, host, topic, data_packets))
+
+    await client.add_data_handler(on_data, replay=True)
+    assert received == [('user', 'host', 'topic', packets)]
+
+    assert client.data_handlers == [on_data]
+
+    await client.remove_subscription('topic')
+    assert client.get_last('topic') is None
+
+
+@pytest.mark.asyncio
+async def test_replay_before_live_data():
+    """Test data cached during a replay is replayed before the handler is added"""
+    client = CallbackClient(
+        NullStream(),
+        options=ClientOptions(last_value_cache=LastValueCache(1000))
+    )
+    first, second = _packets(b'first'), _packets(b'second')
+    await client._raise_multicast_data(  # pylint: disable=protected-access
+        ForwardedMulticastData('host', 'user', 'topic', first)
+    )
+
+    received = []
+
+    async def on_data(_user, _host, _topic, data_packets):
+        if data_packets is first:
+            # New data arrives while the handler awaits.
+            await client._raise_multicast_data(  # pylint: disable=protected-access
+                ForwardedMulticastData('host', 'user', 'topic', second)
+            )
+        received.append(data_packets)
+
+    await client.add_data_handler(on_data, replay=True)
+    assert received == [first, second]
+    assert client.data_handlers == [on_data]
+
+
+@pytest.mark.asyncio
+async def test_pattern_unsubscribe():
+    """Test removing a pattern discards the values no other subscription covers"""
+    client = CallbackClient(
+        NullStream(),
+        options=ClientOptions(last_value_cache=LastValueCache(1000))
+    )
+    await client.add_subscription('quote.*')
+    await client.add_subscription('quote.A')
+    await client.add_subscription('trade.A')
+    for topic in ('quote.A', 'quote.B', 'trade.A'):
+        await client._raise_multicast_data(  # pylint: disable=protected-access
+            ForwardedMulticastData('host', 'user', topic, _packets(topic.encode()))
+        )
+
+    # The pattern still covers the literal topic.
+    await client.remove_subscription('quote.A')
+    assert client.get_last('quote.A') is not None
+
+    await client.remove_subscription('quote.*')
+    assert client.get_last('quote.A') is None
+    assert client.get_last('quote.B') is None
+    assert client.get_last('trade.A') is not None
@@ -0,0 +1,111 @@
+"""Tests for latency measurement"""
+
+import asyncio
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_packet import DataPacket
+from squawkbus.client_options import ClientOptions
+from squawkbus.latency import (
+    RTT_TOPIC,
+    SEND_TS_HEADER,
+    LatencyMonitor,
+    LatencyStamper,
+    RttProbe,
+)
+from squawkbus.messages import (
+    AuthenticationResponse,
+    ForwardedUnicastData,
+    Message,
+    UnicastData,
+)
+
+from tests.mock_streams import QueueStream
+
+
+def test_stamp_and_monitor():
+    """Test the latency and sequence gaps of stamped packets are recorded"""
+    stamper = LatencyStamper(source=b'pub')
+    monitor = LatencyMonitor()
+    packet = DataPacket({0}, {b'content-type': b'text/plain'}, b'data')
+
+    stamped = [stamper.stamp('topic', [packet])[0] for _ in range(5)]
+    assert packet.headers == {b'content-type': b'text/plain'}
+    assert stamped[0].headers[SEND_TS_HEADER].endswith(b':1:pub')
+
+    timestamp = int(stamped[-1].headers[SEND_TS_HEADER].split(b':')[0])
+    monitor.record('topic', stamped[:2], timestamp + 1000)
+    monitor.record('topic', stamped[4:], timestamp + 1000)
+    monitor.record('topic', stamped[2:3], timestamp + 1000)
+
+    assert monitor.latency.count == 4
+    assert monitor.topic_latency['topic'].count == 4
+    assert monitor.gaps == 1
+    assert monitor.missing == 2
+    assert monitor.out_of_order == 1
+
+
+def test_partial_messages_are_not_gaps():
+    """Test receiving only some packets of each message is not a gap"""
+    stamper = LatencyStamper(source=b'pub')
+    monitor = LatencyMonitor()
+    packets = [DataPacket({1}, {}, b'one'), DataPacket({2}, {}, b'two')]
+
+    messages = [stamper.stamp('topic', packets) for _ in range(3)]
+    assert messages[0][0].headers[SEND_TS_HEADER] == messages[0][1].headers[SEND_TS_HEADER]
+
+    # A subscriber entitled to the second packet only.
+    for stamped in messages:
+        monitor.record('topic', stamped[1:], 0)
+    monitor.record('topic', messages[2], 0)
+    assert monitor.gaps == 0
+    assert monitor.out_of_order == 0
+
+
+@pytest.mark.asyncio
+async def test_rtt_probe():
+    """Test the probe records the round trip of a packet sent to itself"""
+    stream = QueueStream()
+    client = CallbackClient(stream)
+    await stream.frames.put(bytes(AuthenticationResponse('me').serialize()))
+    await client.start()
+
+    probe = RttProbe(client, interval=60)
+    probe.start()
+    while not stream.written[1:]:
+        await asyncio.sleep(0)
+
+    # Act as the broker, returning the probe to the client.
+    sent = Message.deserialize(stream.written[1])
+    await stream.frames.put(bytes(ForwardedUnicastData(
+        'host', 'user', sent.client_id, sent.topic, sent.data_packets
+    ).serialize()))
+    while probe.rtt.count == 0:
+        await asyncio.sleep(0)
+
+    probe.stop()
+    client.close()
+    await client.wait_closed()
+    assert probe.rtt.count == 1
+    assert not client.data_handlers
+
+
+@pytest.mark.asyncio
+async def test_rtt_probe_is_not_suppressed():
+    """Test probes are sent when publishing to topics without subscribers is suppressed"""
+    stream = QueueStream()
+    client = CallbackClient(stream, options=ClientOptions(suppress_uninterested=True))
+    await stream.frames.put(bytes(AuthenticationResponse('me').serialize()))
+    await client.start()
+    assert not client.has_interest(RTT_TOPIC)
+
+    await RttProbe(client).send_probe()
+    while not stream.written[1:]:
+        await asyncio.sleep(0)
+    client.close()
+    await client.wait_closed()
+
+    sent = Message.deserialize(stream.written[1])
+    assert isinstance(sent, UnicastData)
+    assert sent.topic == RTT_TOPIC
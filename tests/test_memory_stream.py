@@ -0,0 +1,122 @@
+"""Tests for in-memory message streams"""
+
+import asyncio
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import (
+    AuthenticationResponse,
+    ForwardedMulticastData,
+    Message,
+    MessageType,
+    MulticastData,
+)
+from squawkbus.memory_stream import MemoryStream
+
+
+@pytest.mark.asyncio
+async def test_frames_are_not_copied():
+    """Test frames are passed to the peer in order without copying"""
+    left, right = MemoryStream.pair()
+    first, second = b'first', bytearray(b'second')
+    await left.write(first)
+    await left.write(second)
+    assert right.queued == 2
+    assert await right.read() is first
+    assert await right.read() is second
+    assert left.frames_written == 2
+    assert left.bytes_written == 11
+
+
+@pytest.mark.asyncio
+async def test_latency_and_bandwidth():
+    """Test frames are delayed by the latency and the bandwidth"""
+    loop = asyncio.get_running_loop()
+    left, right = MemoryStream.pair(latency=0.05)
+    start = loop.time()
+    await left.write(b'frame')
+    await right.read()
+    assert loop.time() - start >= 0.05
+
+    left, right = MemoryStream.pair(bandwidth=10_000)
+    start = loop.time()
+    for _ in range(5):
+        await left.write(bytes(200))
+    assert loop.time() - start < 0.05
+    for _ in range(5):
+        await right.read()
+    assert loop.time() - start >= 0.1
+
+
+@pytest.mark.asyncio
+async def test_backpressure():
+    """Test writes block while the reader has the maximum queued"""
+    left, right = MemoryStream.pair(max_queued=2)
+    await left.write(b'1')
+    await left.write(b'2')
+    blocked = asyncio.create_task(left.write(b'3'))
+    await asyncio.sleep(0.01)
+    assert not blocked.done()
+    assert await right.read() == b'1'
+    await asyncio.wait_for(blocked, 1)
+    assert right.queued == 2
+
+
+@pytest.mark.asyncio
+async def test_disconnect():
+    """Test queued frames are read before the end of the stream"""
+    left, right = MemoryStream.pair(max_queued=1)
+    await left.write(b'frame')
+    blocked = asyncio.create_task(left.write(b'blocked'))
+    await asyncio.sleep(0)
+    await right.close()
+
+    assert not left.is_connected
+    with pytest.raises(ConnectionResetError):
+        await blocked
+    with pytest.raises(ConnectionResetError):
+        await right.write(b'frame')
+    assert await right.read() == b'frame'
+    with pytest.raises(EOFError):
+        await right.read()
+    with pytest.raises(EOFError):
+        await left.read()
+
+
+@pytest.mark.asyncio
+async def test_client_fault():
+    """Test a client sees an injected fault as a faulted connection"""
+    client_end, server_end = MemoryStream.pair()
+    client_end.fail_after = 2
+    client = CallbackClient(client_end)
+    closed: list[bool] = []
+    received = asyncio.Event()
+
+    async def on_closed(is_faulted: bool) -> None:
+        closed.append(is_faulted)
+
+    async def on_data(_user, _host, _topic, _data_packets) -> None:
+        received.set()
+
+    client.closed_handlers.append(on_closed)
+    client.data_handlers.append(on_data)
+    await server_end.write(AuthenticationResponse('client').serialize())
+    await client.start()
+    assert Message.deserialize(await server_end.read()).message_type == MessageType.AUTHENTICATION_REQUEST
+
+    packets = [DataPacket({0}, {}, b'data')]
+    await server_end.write(ForwardedMulticastData('host', 'user', 'topic', packets).serialize())
+    await asyncio.wait_for(received.wait(), 1)
+
+    await client.publish('topic', packets)
+    message = Message.deserialize(await server_end.read())
+    assert isinstance(message, MulticastData)
+    assert message.topic == 'topic'
+
+    await client.publish('topic', packets)
+    await asyncio.wait_for(client.wait_closed(), 1)
+    assert closed == [True]
+    with pytest.raises(EOFError):
+        await server_end.read()
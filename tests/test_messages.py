@@ -125,3 +125,13 @@ def test_forwarded_unicast_data():
     )
     dest = Message.deserialize(source.serialize())
     assert source == dest
+
+
+def test_serialize_returns_bytes():
+    """Test serialize returns bytes, and serialize_buffer the same bytes uncopied"""
+    source = MulticastData('topic', [DataPacket({0}, {}, b'data')])
+    buf = source.serialize()
+    assert type(buf) is bytes  # pylint: disable=unidiomatic-typecheck
+    assert hash(buf) == hash(source.serialize())
+    assert source.serialize_buffer() == buf
+    assert isinstance(source.serialize_buffer(), bytearray)
@@ -0,0 +1,52 @@
+"""Tests for client metrics"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import ForwardedMulticastData
+from squawkbus.metrics import ClientMetrics, Histogram, render_prometheus
+
+from tests.mock_streams import ReplayStream
+
+
+def test_histogram():
+    """Test values are counted in the bucket of their upper bound"""
+    histogram = Histogram([10, 100])
+    for value in (1, 10, 11, 1000):
+        histogram.observe(value)
+    snapshot = histogram.snapshot()
+    assert snapshot.counts == (2, 1, 1)
+    assert snapshot.samples == 4
+    assert snapshot.total == 1022
+
+
+@pytest.mark.asyncio
+async def test_client_metrics():
+    """Test the client records reads and writes"""
+    frame = bytes(
+        ForwardedMulticastData('host', 'user', 'topic', [DataPacket({0}, {}, b'data')]).serialize()
+    )
+    metrics = ClientMetrics()
+    client = CallbackClient(ReplayStream([frame]), options=ClientOptions(metrics=metrics))
+
+    await client._read()  # pylint: disable=protected-access
+    await client.publish('topic', [DataPacket({0}, {}, b'data')])
+    await client._write()  # pylint: disable=protected-access
+
+    snapshot = metrics.snapshot()
+    assert snapshot.messages_in['FORWARDED_MULTICAST_DATA'] == 1
+    assert snapshot.bytes_in['FORWARDED_MULTICAST_DATA'] == len(frame)
+    assert snapshot.messages_out['MULTICAST_DATA'] == 1
+    assert snapshot.gauges['read_queue_depth'] == 1
+    assert snapshot.histograms['decode'].samples == 1
+    assert snapshot.histograms['write'].samples == 1
+
+    text = render_prometheus(snapshot)
+    assert 'squawkbus_messages_received_total{message_type="FORWARDED_MULTICAST_DATA"} 1\n' in text
+    assert 'squawkbus_read_queue_depth 1\n' in text
+    assert 'squawkbus_decode_seconds_count 1\n' in text
+
+    metrics.reset()
+    assert metrics.snapshot().messages_in['FORWARDED_MULTICAST_DATA'] == 0
@@ -0,0 +1,127 @@
+"""Tests for batched notifications"""
+
+import asyncio
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import (
+    AuthenticationResponse,
+    ForwardedMulticastData,
+    ForwardedSubscriptionRequest,
+)
+
+from tests.mock_streams import NullStream, QueueStream
+
+
+def _request(client_id: str, topic: str, count: int) -> ForwardedSubscriptionRequest:
+    return ForwardedSubscriptionRequest('host', 'user', client_id, topic, count)
+
+
+@pytest.mark.asyncio
+async def test_batches_are_netted():
+    """Test requests in the batch window are netted and delivered together"""
+    stream = QueueStream()
+    client = CallbackClient(
+        stream,
+        options=ClientOptions(notification_batch_window=0.01)
+    )
+    batches: list[list[ForwardedSubscriptionRequest]] = []
+    singles: list[tuple[str, str, int]] = []
+
+    async def on_batch(messages):
+        batches.append(messages)
+
+    async def on_notification(client_id, _user, _host, topic, count):
+        singles.append((client_id, topic, count))
+
+    client.notification_batch_handlers.append(on_batch)
+    client.notification_handlers.append(on_notification)
+    await stream.frames.put(bytes(AuthenticationResponse('client').serialize()))
+    await client.start()
+
+    for message in [
+            _request('c1', 'A', 1),
+            _request('c2', 'A', 1),
+            _request('c1', 'A', 0),
+            _request('c1', 'B', 1),
+    ]:
+        await stream.frames.put(bytes(message.serialize()))
+    await asyncio.sleep(0)
+    assert not batches
+
+    await asyncio.sleep(0.05)
+    assert batches == [[
+        _request('c2', 'A', 1),
+        _request('c1', 'A', 0),
+        _request('c1', 'B', 1),
+    ]]
+    assert singles == [('c2', 'A', 1), ('c1', 'A', 0), ('c1', 'B', 1)]
+    client.close()
+    await client.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_resubscribe_is_kept():
+    """Test a removal and re-add are both delivered, before later data"""
+    stream = QueueStream()
+    client = CallbackClient(
+        stream,
+        options=ClientOptions(notification_batch_window=10)
+    )
+    events: list[object] = []
+
+    async def on_batch(messages):
+        events.append(messages)
+
+    async def on_data(_user, _host, topic, _data_packets):
+        events.append(topic)
+
+    client.notification_batch_handlers.append(on_batch)
+    client.data_handlers.append(on_data)
+    await stream.frames.put(bytes(AuthenticationResponse('client').serialize()))
+    await client.start()
+
+    for message in [
+            _request('c1', 'A', 1),
+            _request('c1', 'A', 0),
+            _request('c1', 'A', 1),
+            _request('c1', 'A', 2),
+            _request('c2', 'B', 0),
+            _request('c2', 'B', 1),
+            _request('c2', 'B', 0),
+            ForwardedMulticastData('host', 'user', 'A', [DataPacket({0}, {}, b'image')]),
+    ]:
+        await stream.frames.put(bytes(message.serialize()))
+    async with asyncio.timeout(1):
+        while len(events) < 2:
+            await asyncio.sleep(0.001)
+
+    assert events == [
+        [
+            _request('c1', 'A', 0),
+            _request('c1', 'A', 2),
+            _request('c2', 'B', 0),
+        ],
+        'A',
+    ]
+    client.close()
+    await client.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_unbatched():
+    """Test requests are delivered immediately without a batch window"""
+    client = CallbackClient(NullStream())
+    batches: list[list[ForwardedSubscriptionRequest]] = []
+
+    async def on_batch(messages):
+        batches.append(messages)
+
+    client.notification_batch_handlers.append(on_batch)
+    await client._raise_forwarded_subscription_request(  # pylint: disable=protected-access
+        _request('c1', 'A', 1)
+    )
+    assert batches == [[_request('c1', 'A', 1)]]
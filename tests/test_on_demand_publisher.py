@@ -0,0 +1,80 @@
+"""Tests for the on demand publisher"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_packet import DataPacket
+from squawkbus.interest_table import InterestTable
+from squawkbus.messages import (
+    ForwardedSubscriptionRequest,
+    Message,
+    MulticastData,
+    UnicastData,
+)
+from squawkbus.on_demand_publisher import OnDemandPublisher
+
+from tests.mock_streams import NullStream
+
+
+def _drain(client: CallbackClient) -> list[Message]:
+    messages = []
+    while not client._write_queue.empty():  # pylint: disable=protected-access
+        messages.append(
+            client._write_queue.get_nowait()  # pylint: disable=protected-access
+        )
+    return messages
+
+
+def test_interest_table():
+    """Test the interest table indexes by topic and client"""
+    table = InterestTable()
+    assert table.update('c1', 't1', 1)
+    assert not table.update('c1', 't1', 2)
+    assert table.update('c1', 't2', 1)
+    assert table.update('c2', 't1', 1)
+    assert table.subscription_count('t1') == 3
+    assert set(table.clients('t1')) == {'c1', 'c2'}
+    assert table.remove_client('c1') == {'t1', 't2'}
+    assert set(table.clients('t1')) == {'c2'}
+    assert not table.has_interest('t2')
+    table.update('c2', 't1', 0)
+    assert len(table) == 0
+
+
+@pytest.mark.asyncio
+async def test_images_and_deltas():
+    """Test images are sent on first interest and deltas only with interest"""
+    client = CallbackClient(NullStream())
+    image = [DataPacket({0}, {}, b'image')]
+    requested: list[str] = []
+
+    def get_image(topic: str) -> list[DataPacket]:
+        requested.append(topic)
+        return image
+
+    publisher = OnDemandPublisher(client, get_image)
+    await publisher.start('quote.*')
+    _drain(client)
+
+    await client.on_forwarded_subscription_requests([
+        ForwardedSubscriptionRequest('host', 'user', 'c1', 'quote.A', 1),
+        ForwardedSubscriptionRequest('host', 'user', 'c2', 'quote.A', 1),
+        ForwardedSubscriptionRequest('host', 'user', 'c2', 'quote.B', 1),
+        ForwardedSubscriptionRequest('host', 'user', 'c2', 'quote.B', 0),
+    ])
+    await publisher.flush()
+
+    assert requested == ['quote.A']
+    assert _drain(client) == [
+        UnicastData('c1', 'quote.A', image),
+        UnicastData('c2', 'quote.A', image),
+    ]
+
+    delta = [DataPacket({0}, {}, b'delta')]
+    assert await publisher.publish('quote.A', delta)
+    assert not await publisher.publish('quote.B', delta)
+    assert _drain(client) == [MulticastData('quote.A', delta)]
+
+    publisher.remove_client('c1')
+    publisher.remove_client('c2')
+    assert not publisher.has_interest('quote.A')
@@ -0,0 +1,71 @@
+"""Tests for payload codecs"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import MulticastData
+from squawkbus.payload_codecs import (
+    CONTENT_TYPE_HEADER,
+    CodecRegistry,
+    JsonCodec,
+    MsgpackCodec,
+    TextCodec,
+)
+
+from tests.mock_streams import NullStream
+
+
+class CountingCodec(JsonCodec):
+
+    def __init__(self) -> None:
+        super().__init__('json')
+        self.decodes = 0
+
+    def decode(self, data: bytes):
+        self.decodes += 1
+        return super().decode(data)
+
+
+def test_registry_ignores_parameters():
+    """Test content type parameters are ignored"""
+    registry = CodecRegistry()
+    codec = TextCodec()
+    registry.register(b'text/plain', codec)
+    assert registry.get(b'text/plain; charset=utf-8') is codec
+    assert registry.decode({CONTENT_TYPE_HEADER: b'text/plain'}, b'hello') == 'hello'
+    with pytest.raises(ValueError):
+        registry.get(b'application/unknown')
+
+
+def test_value_is_decoded_once(monkeypatch):
+    """Test the packet value is decoded lazily and cached"""
+    codec = CountingCodec()
+    registry = CodecRegistry()
+    registry.register(b'application/json', codec)
+    monkeypatch.setattr('squawkbus.data_packet.DEFAULT_CODECS', registry)
+
+    packet = DataPacket({0}, {CONTENT_TYPE_HEADER: b'application/json'}, b'{"a":1}')
+    assert codec.decodes == 0
+    assert packet.value == {'a': 1}
+    assert packet.value == {'a': 1}
+    assert codec.decodes == 1
+
+
+def test_msgpack():
+    """Test the msgpack codec"""
+    pytest.importorskip('msgpack')
+    codec = MsgpackCodec()
+    assert codec.decode(codec.encode({'a': [1, 2]})) == {'a': [1, 2]}
+
+
+@pytest.mark.asyncio
+async def test_publish_value():
+    """Test publishing a value encodes it with the codec"""
+    client = CallbackClient(NullStream())
+    await client.publish_value('topic', {'a': 1})
+    message = client._write_queue.get_nowait()  # pylint: disable=protected-access
+    assert isinstance(message, MulticastData)
+    packet = message.data_packets[0]
+    assert packet.headers[CONTENT_TYPE_HEADER] == b'application/json'
+    assert packet.value == {'a': 1}
@@ -0,0 +1,138 @@
+"""Tests for payload compression"""
+
+import zlib
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import ForwardedMulticastData, Message, MulticastData
+from squawkbus.metrics import ClientMetrics, render_prometheus
+from squawkbus.payload_compression import (
+    CONTENT_ENCODING_DEFLATE,
+    CONTENT_ENCODING_HEADER,
+    PayloadCompression,
+    PayloadDecompression,
+)
+
+from tests.mock_streams import NullStream, ReplayStream
+
+
+def test_threshold():
+    """Test only data above the threshold is compressed"""
+    compression = PayloadCompression(threshold=100)
+    headers = {b'content-type': b'text/plain'}
+
+    small = b'x' * 100
+    assert compression.compress(headers, small) == (headers, small)
+
+    large = b'x' * 1000
+    compressed_headers, compressed = compression.compress(headers, large)
+    assert compressed_headers[CONTENT_ENCODING_HEADER] == CONTENT_ENCODING_DEFLATE
+    assert CONTENT_ENCODING_HEADER not in headers
+    assert len(compressed) < len(large)
+    assert compression.stats.count == 1
+    assert compression.stats.ratio > 1
+
+
+@pytest.mark.asyncio
+async def test_round_trip():
+    """Test compressed packets are decompressed transparently"""
+    client = CallbackClient(
+        NullStream(),
+        options=ClientOptions(compression=PayloadCompression(threshold=10))
+    )
+    data = b'0123456789' * 100
+    await client.publish('topic', [DataPacket({0}, {}, data)])
+    message = client._write_queue.get_nowait()  # pylint: disable=protected-access
+    assert isinstance(message, MulticastData)
+
+    received = Message.deserialize(message.serialize())
+    assert isinstance(received, MulticastData)
+    packet = received.data_packets[0]
+    assert packet.headers[CONTENT_ENCODING_HEADER] == CONTENT_ENCODING_DEFLATE
+    assert len(packet.payload) < len(data)
+    assert packet.data == data
+
+    # Forwarding the packet sends the compressed payload unchanged.
+    forwarded = Message.deserialize(MulticastData('topic', [packet]).serialize())
+    assert forwarded == received
+
+
+def test_max_length():
+    """Test data which decompresses above the limit is rejected"""
+    compressed = zlib.compress(bytes(1000))
+    decompression = PayloadDecompression(max_length=999)
+    with pytest.raises(ValueError):
+        decompression.decompress(CONTENT_ENCODING_DEFLATE, compressed)
+    assert decompression.stats.count == 0
+
+    assert PayloadDecompression(max_length=1000).decompress(
+        CONTENT_ENCODING_DEFLATE,
+        compressed
+    ) == bytes(1000)
+    assert PayloadDecompression(max_length=None).decompress(
+        CONTENT_ENCODING_DEFLATE,
+        compressed
+    ) == bytes(1000)
+
+
+@pytest.mark.asyncio
+async def test_client_decompression():
+    """Test each client limits and reports its own decompression"""
+    headers = {CONTENT_ENCODING_HEADER: CONTENT_ENCODING_DEFLATE}
+    frame = bytes(
+        ForwardedMulticastData(
+            'host',
+            'user',
+            'topic',
+            [DataPacket({0}, headers, zlib.compress(bytes(1000)))]
+        ).serialize()
+    )
+    metrics = ClientMetrics()
+    client = CallbackClient(
+        ReplayStream([frame]),
+        options=ClientOptions(metrics=metrics, max_decompressed_size=1000)
+    )
+    other = CallbackClient(
+        ReplayStream([frame]),
+        options=ClientOptions(max_decompressed_size=999)
+    )
+
+    message = await client._read_message()  # pylint: disable=protected-access
+    assert isinstance(message, ForwardedMulticastData)
+    assert message.data_packets[0].data == bytes(1000)
+    snapshot = metrics.snapshot().decompression
+    assert snapshot.operations == 1
+    assert snapshot.bytes_out == 1000
+
+    message = await other._read_message()  # pylint: disable=protected-access
+    assert isinstance(message, ForwardedMulticastData)
+    with pytest.raises(ValueError):
+        _ = message.data_packets[0].data
+    assert other.decompression.stats.count == 0
+    assert metrics.snapshot().decompression.operations == 1
+
+
+@pytest.mark.asyncio
+async def test_client_compression_metrics():
+    """Test the data a client compresses is reported in its metrics"""
+    metrics = ClientMetrics()
+    client = CallbackClient(
+        NullStream(),
+        options=ClientOptions(
+            compression=PayloadCompression(threshold=10),
+            metrics=metrics
+        )
+    )
+    await client.publish('topic', [DataPacket({0}, {}, b'0123456789' * 100)])
+    await client.publish('topic', [DataPacket({0}, {}, bytes(range(256)))])
+
+    snapshot = metrics.snapshot().compression
+    assert snapshot.operations == 1
+    assert snapshot.skipped == 1
+    assert snapshot.bytes_in == 1000
+    text = render_prometheus(metrics.snapshot())
+    assert 'squawkbus_compressions_total 1\n' in text
+    assert 'squawkbus_compression_skipped_total 1\n' in text
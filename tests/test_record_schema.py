@@ -0,0 +1,67 @@
+"""Tests for record schemas"""
+
+from typing import NamedTuple
+
+import pytest
+
+from squawkbus.data_packet import DataPacket
+from squawkbus.record_schema import RecordSchema
+
+QUOTE = RecordSchema(
+    'quote',
+    [
+        ('ticker', 'str8'),
+        ('bid', 'float64'),
+        ('ask', 'float64'),
+        ('size', 'uint32'),
+    ]
+)
+
+
+class Quote(NamedTuple):
+    ticker: str
+    bid: float
+    ask: float
+    size: int
+
+
+def test_encode_decode():
+    """Test a record round trips"""
+    record = {'ticker': 'AAPL', 'bid': 100.25, 'ask': 100.5, 'size': 300}
+    data = QUOTE.encode(record)
+    assert len(data) == QUOTE.size == 8 + 8 + 8 + 4
+    assert QUOTE.decode(data) == record
+    assert QUOTE.encode(Quote(**record)) == data
+
+
+def test_decode_packet():
+    """Test a packet holding several records"""
+    packet = QUOTE.to_data_packet(
+        Quote('AAPL', 1.0, 2.0, 1),
+        Quote('MSFT', 3.0, 4.0, 2),
+    )
+    assert QUOTE.matches(packet)
+    assert [record['ticker'] for record in QUOTE.decode_packet(packet)] == ['AAPL', 'MSFT']
+
+
+def test_decode_batch():
+    """Test decoding a batch of packets into a structured array"""
+    np = pytest.importorskip('numpy')
+    packets = [
+        QUOTE.to_data_packet(Quote(f'T{i}', float(i), float(i + 1), i))
+        for i in range(10)
+    ]
+    packets.append(DataPacket({0}, {}, b'not a record'))
+    array = QUOTE.decode_batch(packets)
+    assert array.shape == (10,)
+    assert np.array_equal(array['bid'], np.arange(10, dtype='<f8'))
+    assert array['ticker'][3] == b'T3'
+    assert not array.flags.writeable
+
+
+def test_missing_numpy(monkeypatch):
+    """Test a clear error is raised when numpy is not installed"""
+    monkeypatch.setattr('squawkbus.record_schema.np', None)
+    schema = RecordSchema('point', [('x', 'float64')])
+    with pytest.raises(ImportError, match=r'squawkbus\[numpy\]'):
+        schema.decode_batch([])
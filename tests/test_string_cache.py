@@ -0,0 +1,61 @@
+"""Tests for the string cache"""
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.data_reader import DataReader
+from squawkbus.messages import ForwardedUnicastData, Message
+from squawkbus.string_cache import StringCache
+
+from tests.mock_streams import ReplayStream
+
+
+def test_decode():
+    """Test repeated strings are shared"""
+    cache = StringCache()
+    first = cache.decode(memoryview(b'xx topic.name')[3:])
+    second = cache.decode(memoryview(b'topic.name').toreadonly())
+    assert first == 'topic.name'
+    assert first is second
+
+    key = cache.intern_bytes(memoryview(bytearray(b'content-type')))
+    assert key == b'content-type'
+    assert cache.intern_bytes(memoryview(b'content-type')) is key
+
+
+def test_eviction():
+    """Test the least recently used strings are evicted"""
+    cache = StringCache(max_entries=2, max_length=4)
+    cache.decode(memoryview(b'a'))
+    cache.decode(memoryview(b'b'))
+    cache.decode(memoryview(b'a'))
+    cache.decode(memoryview(b'c'))
+    cache.decode(memoryview(b'too long'))
+    assert len(cache) == 2
+    assert set(cache._strings) == {b'a', b'c'}  # pylint: disable=protected-access
+
+
+def test_reader_uses_cache():
+    """Test messages read with a cache share their identifiers"""
+    buf = bytes(ForwardedUnicastData('host', 'user', 'client', 'topic', []).serialize())
+    cache = StringCache()
+    first = Message.read(DataReader(buf, string_cache=cache))
+    second = Message.read(DataReader(buf, string_cache=cache))
+    assert first == second
+    assert isinstance(first, ForwardedUnicastData)
+    assert isinstance(second, ForwardedUnicastData)
+    assert first.topic is second.topic
+    assert first.client_id is second.client_id
+
+
+@pytest.mark.asyncio
+async def test_client_caches():
+    """Test each client reads with its own cache"""
+    buf = bytes(ForwardedUnicastData('host', 'user', 'client', 'topic', []).serialize())
+    first = CallbackClient(ReplayStream([buf]))
+    second = CallbackClient(ReplayStream([buf]))
+    assert first.string_cache is not second.string_cache
+
+    await first._read_message()  # pylint: disable=protected-access
+    assert len(first.string_cache) > 0
+    assert len(second.string_cache) == 0
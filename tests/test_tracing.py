@@ -0,0 +1,104 @@
+"""Tests for pipeline tracing"""
+
+import asyncio
+import gc
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import (
+    AuthenticationResponse,
+    ForwardedMulticastData,
+    MulticastData,
+)
+from squawkbus.metrics import LatencyHistogram
+from squawkbus.tracing import StageLatencyTracer, TraceStage
+
+from tests.mock_streams import QueueStream
+
+
+def test_latency_histogram():
+    """Test percentiles are within the relative error"""
+    histogram = LatencyHistogram(significant_bits=7)
+    for value in range(1, 100_001):
+        histogram.record(value)
+    assert histogram.count == 100_000
+    assert histogram.min == 1
+    assert histogram.max == 100_000
+    for percentile in (50, 90, 99):
+        expected = 1000 * percentile
+        assert abs(histogram.percentile(percentile) - expected) <= expected / 64
+    assert histogram.percentile(100) == 100_000
+
+    other = LatencyHistogram(significant_bits=7)
+    other.record(5)
+    histogram.merge(other)
+    assert histogram.count == 100_001
+
+
+@pytest.mark.asyncio
+async def test_client_tracing():
+    """Test each stage of the pipelines is traced"""
+    stages: list[TraceStage] = []
+    latencies = StageLatencyTracer()
+
+    def tracer(stage, message, timestamp):
+        stages.append(stage)
+        latencies(stage, message, timestamp)
+
+    stream = QueueStream()
+    client = CallbackClient(stream, options=ClientOptions(tracer=tracer))
+    received = asyncio.Event()
+
+    async def on_data(_user, _host, topic, data_packets):
+        await client.publish(topic, data_packets)
+        received.set()
+
+    client.data_handlers.append(on_data)
+    await stream.frames.put(bytes(AuthenticationResponse('client').serialize()))
+    await client.start()
+    await stream.frames.put(bytes(
+        ForwardedMulticastData('host', 'user', 'topic', [DataPacket({0}, {}, b'data')]).serialize()
+    ))
+    await asyncio.wait_for(received.wait(), 1)
+    while len(stream.written) < 2:
+        await asyncio.sleep(0)
+    client.close()
+    await client.wait_closed()
+
+    assert [stage for stage in stages if stage.value in (
+        'received', 'decoded', 'dequeued', 'handler_started', 'handler_finished', 'dispatched'
+    )] == [
+        TraceStage.RECEIVED,
+        TraceStage.DECODED,
+        TraceStage.DEQUEUED,
+        TraceStage.HANDLER_STARTED,
+        TraceStage.HANDLER_FINISHED,
+        TraceStage.DISPATCHED,
+    ]
+    assert stages.count(TraceStage.WRITTEN) == 1
+    summary = latencies.summary()
+    assert summary['handler_finished']['count'] == 1
+    assert summary['written']['count'] == 1
+    assert 'received' not in summary
+
+
+def test_dropped_messages_are_released():
+    """Test messages which never reach a final stage do not leak entries"""
+    latencies = StageLatencyTracer()
+    kept = MulticastData('topic', [])
+    latencies(TraceStage.PUBLISHED, kept, 0)
+    dropped = MulticastData('topic', [])
+    latencies(TraceStage.PUBLISHED, dropped, 0)
+    assert latencies.pending == 2
+
+    del dropped
+    gc.collect()
+    assert latencies.pending == 1
+
+    latencies(TraceStage.WRITE_DEQUEUED, kept, 10)
+    latencies(TraceStage.WRITTEN, kept, 30)
+    assert latencies.pending == 0
+    assert latencies.histograms[TraceStage.WRITE_DEQUEUED].max == 10
@@ -0,0 +1,116 @@
+"""Tests for the watchdog"""
+
+import asyncio
+import time
+
+import pytest
+
+from squawkbus.callback_client import CallbackClient
+from squawkbus.client_options import ClientOptions
+from squawkbus.data_packet import DataPacket
+from squawkbus.messages import AuthenticationResponse, ForwardedMulticastData
+from squawkbus.watchdog import Watchdog, WatchdogReport
+
+from tests.mock_streams import NullStream, QueueStream
+
+
+@pytest.mark.asyncio
+async def test_slow_handler_attribution():
+    """Test slow handler calls are attributed to the handler and topic"""
+    watchdog = Watchdog(threshold=0.005)
+    stream = QueueStream()
+    client = CallbackClient(stream, options=ClientOptions(watchdog=watchdog))
+    topics: list[str] = []
+    received = asyncio.Event()
+
+    async def fast_handler(_user, _host, _topic, _data_packets):
+        pass
+
+    async def slow_handler(_user, _host, topic, _data_packets):
+        if topic == 'slow':
+            time.sleep(0.02)
+        topics.append(topic)
+        if len(topics) == 3:
+            received.set()
+
+    client.data_handlers.extend((fast_handler, slow_handler))
+    await stream.frames.put(bytes(AuthenticationResponse('client').serialize()))
+    await client.start()
+    for topic in ('fast', 'slow', 'slow'):
+        await stream.frames.put(bytes(
+            ForwardedMulticastData('host', 'user', topic, [DataPacket({0}, {}, b'data')]).serialize()
+        ))
+    await asyncio.wait_for(received.wait(), 1)
+    client.close()
+    await client.wait_closed()
+
+    report = watchdog.report()
+    assert len(report.slow_handlers) == 1
+    slow = report.slow_handlers[0]
+    assert slow.handler.endswith('slow_handler')
+    assert slow.topic == 'slow'
+    assert slow.calls == 2
+    assert slow.max_ns >= 20_000_000
+    assert not watchdog.report().slow_handlers
+
+
+@pytest.mark.asyncio
+async def test_awaited_time_is_not_blocking():
+    """Test only the time a handler runs between awaits counts as slow"""
+    watchdog = Watchdog(threshold=0.015)
+
+    async def waiting_handler():
+        await asyncio.sleep(0.03)
+
+    async def blocking_handler():
+        time.sleep(0.01)
+        await asyncio.sleep(0.03)
+        time.sleep(0.01)
+
+    await watchdog.time_handler(waiting_handler, 'topic', waiting_handler())
+    await watchdog.time_handler(blocking_handler, 'topic', blocking_handler())
+
+    report = watchdog.report()
+    assert len(report.slow_handlers) == 1
+    slow = report.slow_handlers[0]
+    assert slow.handler.endswith('blocking_handler')
+    assert 20_000_000 <= slow.max_ns < 30_000_000
+    assert slow.max_elapsed_ns >= 50_000_000
+
+
+@pytest.mark.asyncio
+async def test_notification_handlers_are_timed():
+    """Test notification handlers are timed as well as data handlers"""
+    watchdog = Watchdog(threshold=0.005)
+    client = CallbackClient(NullStream(), options=ClientOptions(watchdog=watchdog))
+
+    async def on_notification(_client_id, _user, _host, _topic, _count):
+        time.sleep(0.01)
+
+    client.notification_handlers.append(on_notification)
+    await client.on_forwarded_subscription_request('client', 'user', 'host', 'topic', 1)
+
+    report = watchdog.report()
+    assert [(slow.handler.split('.')[-1], slow.topic) for slow in report.slow_handlers] == [
+        ('on_notification', 'topic')
+    ]
+
+
+@pytest.mark.asyncio
+async def test_event_loop_lag():
+    """Test blocking the event loop is reported as lag"""
+    reports: list[WatchdogReport] = []
+
+    async def on_report(report: WatchdogReport) -> None:
+        reports.append(report)
+
+    watchdog = Watchdog(0.2, probe_interval=0.01, on_report=on_report)
+    watchdog.start()
+    await asyncio.sleep(0.05)
+    time.sleep(0.05)
+    while not reports:
+        await asyncio.sleep(0.01)
+    watchdog.stop()
+
+    assert reports[0].max_lag_ns >= 40_000_000
+    assert reports[0].lag_p99_ns > 0